@@ -6,6 +6,12 @@ across single files or directories.
 
 Usage:
     python app.py --task=comment --path="queries/" --backup --log --dry-run
+    python app.py --task=comment --path="queries/" --recursive --submit-batch=batch.jsonl
+    python app.py --task=comment --ingest-batch=results.jsonl --batch-manifest=batch.jsonl.manifest.json
+    python app.py --task=analyze --query-log=query_store.csv --top=20 --path=hot_shapes/
+    python app.py --task=comment --resume=<run-id>
+    python app.py --task=analyze --path="queries/" --recursive --shard=3/20 --structured --findings-report=shard-3.json
+    python app.py --task=analyze --merge journals/*.jsonl shard-*.json
 """
 
 import argparse
@@ -17,12 +23,25 @@ from utils.file_utils import (
     read_sql_file,
     write_sql_file,
     backup_sql_file,
-    get_sql_files_in_directory
+    iter_sql_files,
+    IGNORE_FILES
 )
 from core.config_loader import Config
 from utils.sanitizer import clean_output
 from utils.prompt_manager import PromptManager
 from core.base_ai_client import AIClient
+from core.metrics import run_metrics
+from core.sql_task_base import SQLTask
+from utils.batch_jobs import hash_text, load_manifest, read_batch_results, write_batch_file
+from utils.refactor_verifier import format_speedup_table
+from utils.sql_fingerprint import group_by_fingerprint, text_fingerprint_file
+from utils.query_log import RANK_BY, aggregate_query_log_parallel, format_shape_table, top_shapes
+from utils.findings import read_findings_report, write_findings_report
+from utils.pii_catalog import PIICatalog, build_pii_catalog, catalog_path_for
+from utils.job_journal import JobJournal, is_completed, journal_path, load_journal, merge_journals
+from utils.sharding import estimated_tokens, iter_shard, parse_shard, shard_files
+from core.cpu_pool import map_cpu_bound
+from core.logger import get_run_id, set_run_id
 
 # Task imports
 from tasks.sql_commenter import SQLCommenter
@@ -35,7 +54,7 @@ from tasks.sql_performance_benchmark import SQLPerformanceBenchmark
 from tasks.sql_query_validator import SQLQueryValidator
 from tasks.natural_language_to_sql import NaturalLanguageToSQL
 from tasks.sql_data_masker import SQLDataMasker
-from tasks.sql_style_enforcer import SQLStyleEnforcer
+from tasks.sql_style_enforcer import SQLStyleEnforcer, StyleCache
 from utils.dynamic_sql_detector import DynamicSQLDetector
 
 # Add the project root directory to the Python path
@@ -58,6 +77,15 @@ TASKS = {
     "dynamic_sql": DynamicSQLDetector,  # Dynamic SQL Detection
 }
 
+# Report tasks whose result depends only on the SQL text, so --dedupe can share it between copies
+DEDUPE_TASKS = {"analyze", "audit", "explain", "validate", "benchmark"}
+
+# Report tasks with a structured findings mode (--structured)
+STRUCTURED_TASKS = {"analyze", "audit", "validate"}
+
+# Tasks that can be run on the hottest query shapes of a query log (--query-log)
+QUERY_LOG_TASKS = {"analyze", "benchmark"}
+
 
 async def process_sql_file(filepath, task_class, backup=False, dry_run=False, sanitize=False, output_path=None, git=False, **kwargs):
     print(f"🔍 Processing: {filepath}")
@@ -67,14 +95,23 @@ async def process_sql_file(filepath, task_class, backup=False, dry_run=False, sa
     ai_client = AIClient()
     prompt_manager = PromptManager("prompts/index.yaml")
 
-    # Special logic for SQLDataMasker
+    # Special logic for SQLDataMasker (local: patterns plus the schema's PII catalog, no LLM call)
     if task_class == SQLDataMasker:
-        task = task_class()
+        task = task_class(catalog=load_pii_catalog(kwargs.get("schema_path"), kwargs.get("pii_catalog")))
         result = task.mask_sensitive_data(sql_code)
     elif task_class == SQLStyleEnforcer:
-        # Handle specific logic for SQL Style Enforcement
-        task = task_class(ai_client, prompt_manager)
-        result = await task.enforce_style(sql_code, kwargs.get("sql_dialect", "generic"))
+        # Formatting rules are applied locally; the LLM only checks naming with --style-llm
+        task = task_class(
+            ai_client if kwargs.get("style_llm") else None,
+            prompt_manager,
+            style_overrides=ai_client.config.get("SQL_STYLE"),
+            cache=StyleCache.shared() if kwargs.get("style_llm") else None,
+        )
+        task.patch = kwargs.get("patch", False)
+        result = await task.enforce_style(sql_code, kwargs.get("sql_dialect") or "generic")
+        if result == sql_code:
+            print(f"⏭️ Already styled: {filepath}")
+            return
     elif task_class == NaturalLanguageToSQL:
         # Handle specific logic for NaturalLanguageToSQL
         nl_query = sql_code  # Treat the file content as the natural language query
@@ -82,18 +119,327 @@ async def process_sql_file(filepath, task_class, backup=False, dry_run=False, sa
         sql_dialect = kwargs.get("sql_dialect", "generic")
 
         task = task_class(schema_file=schema_path)
-        result = await task.run(nl_query, sql_dialect=sql_dialect)
+        result = await task.run(nl_query, sql_dialect=sql_dialect, candidates=kwargs.get("candidates", 1))
     elif task_class == DynamicSQLDetector:
         # Handle specific logic for Dynamic SQL Detection
         task = task_class(ai_client, prompt_manager)
         if kwargs.get("detect_only", False):
-            result = await task.detect_dynamic_sql(sql_code)
+            result = (await task.detect_dynamic_sql(sql_code))["dynamic_sql_analysis"]
         else:
             result = await task.analyze_risks_and_optimization(sql_code)
+    elif task_class == SQLPerformanceBenchmark and kwargs.get("db_path"):
+        # Real execution against a local SQLite database
+        task = task_class(db_path=kwargs["db_path"], warmup=kwargs.get("warmup", 1), repetitions=kwargs.get("repetitions", 5))
+        task.minify = kwargs.get("minify", False)
+        result = await task.run(sql_code)
+    elif task_class == SQLRefactorer and kwargs.get("db_path"):
+        # Keep the refactor only if it returns the same rows and isn't slower
+        task = task_class(db_path=kwargs["db_path"], warmup=kwargs.get("warmup", 1), repetitions=kwargs.get("repetitions", 5))
+        task.patch = kwargs.get("patch", False)
+        result = await task.run(sql_code)
+        if task.last_verification is not None and kwargs.get("verification_report") is not None:
+            kwargs["verification_report"].append((filepath, task.last_verification))
+        if not task.last_verification or not task.last_verification.keep:
+            print(f"⏭️ Refactor not kept for {filepath}: {task.last_verification.reason if task.last_verification else 'not verified'}")
+            return
+    elif task_class == SQLQueryValidator:
+        # Resolve tables/columns locally when a schema file is available
+        schema_path = kwargs.get("schema_path")
+        task = task_class(schema_path=schema_path if schema_path and os.path.isfile(schema_path) else None)
+        task.minify = kwargs.get("minify", False)
+        configure_structured(task, kwargs)
+        result = await task.run(sql_code)
     else:
         task = task_class()
+        task.minify = kwargs.get("minify", False)  # Only applied by minifiable (report-style) tasks
+        task.patch = kwargs.get("patch", False)  # Only applied by tasks with a patch prompt
+        configure_structured(task, kwargs)
         result = await task.run(sql_code)
 
+    # --structured: collect findings for the corpus report
+    findings_report = kwargs.get("findings_report")
+    if findings_report is not None and getattr(task, "last_findings", None) is not None:
+        for file in [filepath] + list(kwargs.get("duplicates", ())):
+            findings_report.append((file, task.last_findings))
+
+    write_task_output(filepath, result, backup, dry_run, sanitize, output_path, git)
+
+    # --dedupe: copies of the same SQL get the same result
+    for duplicate in kwargs.get("duplicates", ()):
+        print(f"♻️ Reusing result for: {duplicate}")
+        write_task_output(duplicate, result, backup, dry_run, sanitize, None, git)
+
+
+_pii_catalogs = {}
+
+
+def load_pii_catalog(schema_path=None, catalog_path=None):
+    """
+    The PII catalog for masking (--pii-catalog, or the one next to --schema_path), if built.
+    Loaded once per run.
+    """
+    path = catalog_path or (catalog_path_for(schema_path) if schema_path else None)
+    if not path:
+        return None
+    if path not in _pii_catalogs:
+        _pii_catalogs[path] = PIICatalog.load(path)
+        if _pii_catalogs[path] is None:
+            print(f"ℹ️ No PII catalog at {path}; masking by literal patterns only (build one with --build-pii-catalog)")
+    return _pii_catalogs[path]
+
+
+async def build_catalog(schema_path, catalog_path=None):
+    """
+    Builds or incrementally updates the PII column catalog of a schema JSON.
+    """
+    if not os.path.isfile(schema_path):
+        print(f"❌ Schema file not found: {schema_path}")
+        return
+    catalog_path = catalog_path or catalog_path_for(schema_path)
+    catalog, stats = await build_pii_catalog(schema_path, AIClient(), catalog_path)
+    print(
+        f"🛡️ PII catalog {catalog_path} (revision {catalog.revision}): {len(catalog.pii_columns)} PII columns; "
+        f"{stats['classified']} classified, {stats['kept']} unchanged, {stats['removed']} removed"
+    )
+
+
+def configure_structured(task, kwargs):
+    """
+    Applies --structured and --max-output-tokens to tasks that have a findings prompt.
+    """
+    if kwargs.get("structured") and getattr(task, "structured_prompt_key", None):
+        task.structured = True
+        if kwargs.get("max_output_tokens"):
+            task.max_output_tokens = kwargs["max_output_tokens"]
+
+
+async def dedupe_sql_files(sql_files) -> list:
+    """
+    Groups copies of the same SQL (computed in the CPU pool). Only exact copies are grouped,
+    not files that differ in literals: results quote values and line numbers, and --db
+    benchmark timings depend on how selective the predicates are.
+
+    :return: [(representative file, [duplicate files]), ...]
+    """
+    groups = group_by_fingerprint(sql_files, await map_cpu_bound(text_fingerprint_file, sql_files))
+    saved = len(sql_files) - len(groups)
+    run_metrics.increment("dedupe.calls_saved", saved)
+    print(f"🧬 Dedupe: {len(sql_files)} files, {len(groups)} distinct queries, {saved} LLM calls saved")
+    return [(files[0], files[1:]) for files in groups.values()]
+
+
+async def prioritize_query_log(log_path, shapes_dir, top=20, rank_by="duration", log_format=None) -> list:
+    """
+    Aggregates a query log by normalized shape (in the CPU pool) and writes the `top`
+    costliest shapes to `shapes_dir` as SQL files headed by their runtime cost.
+
+    :return: Paths of the written shape files, costliest first
+    """
+    shapes = await aggregate_query_log_parallel(log_path, log_format)
+    ranked = top_shapes(shapes, top, rank_by)
+    total = sum(shape.cost(rank_by) for shape in shapes.values())
+    covered = sum(shape.cost(rank_by) for shape in ranked) / total if total else 0.0
+    run_metrics.increment("query_log.statements", sum(shape.rows for shape in shapes.values()))
+    run_metrics.increment("query_log.shapes", len(shapes))
+    print(f"🔥 Query log: {len(shapes)} distinct query shapes; top {len(ranked)} account for {covered:.1%} of total {rank_by}")
+    print(format_shape_table(ranked, total, rank_by))
+
+    os.makedirs(shapes_dir, exist_ok=True)
+    paths = []
+    for rank, shape in enumerate(ranked, 1):
+        path = os.path.join(shapes_dir, f"shape_{rank:03d}_{shape.fingerprint}.sql")
+        write_sql_file(path, shape.header() + shape.sample_sql + "\n")
+        paths.append(path)
+    return paths
+
+
+def prompt_version_for(task_class):
+    """
+    Version of the task's prompt in prompts/index.yaml, if it has one.
+    """
+    if issubclass(task_class, SQLTask) and task_class.prompt_key:
+        return PromptManager.get_metadata(task_class.prompt_key).get("version")
+    return None
+
+
+def shard_arg(value):
+    """
+    argparse type for --shard i/N.
+    """
+    try:
+        parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def select_shard(sql_files, root, shard, balance=False):
+    """
+    Narrows the discovered files to this runner's shard (--shard i/N). Hash sharding
+    filters the discovery lazily; balancing has to see every file first.
+    """
+    index, count = parse_shard(shard)
+    if not balance:
+        print(f"🧩 Shard {shard} (hash partition)")
+        return iter_shard(sql_files, root, index, count)
+    sql_files = list(sql_files)
+    selected = shard_files(sql_files, root, index, count, balance)
+    tokens = sum(estimated_tokens(file) for file in selected)
+    print(f"🧩 Shard {shard}: {len(selected)} of {len(sql_files)} files (~{tokens} tokens)")
+    return selected
+
+
+def discovery_options(args) -> dict:
+    """
+    Ignore files, globs and size limit for directory discovery.
+    """
+    return dict(
+        ignore_files=IGNORE_FILES + tuple(args.ignore_file or ()),
+        include=args.include or (),
+        exclude=args.exclude or (),
+        max_size=args.max_file_size * 1024 if args.max_file_size else None,
+    )
+
+
+async def run_work_queue(work, handle, workers=1) -> int:
+    """
+    Runs `await handle(file, duplicates)` for each work item on `workers` concurrent
+    workers. Items are taken from `work` as it produces them, so with a lazy discovery
+    the first files are processed while the rest of the tree is still being walked.
+    The first exception stops the run and is raised once the workers have finished.
+
+    :return: Number of items processed
+    """
+    queue = asyncio.Queue(maxsize=workers * 2)
+    errors = []
+    processed = 0
+
+    async def worker():
+        nonlocal processed
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            if errors:
+                continue  # Drain after a failure
+            try:
+                await handle(*item)
+                processed += 1
+            except Exception as e:
+                errors.append(e)
+
+    tasks = [asyncio.ensure_future(worker()) for _ in range(max(1, workers))]
+    try:
+        for item in work:
+            if errors:
+                break
+            await queue.put(item)
+        for _ in tasks:
+            await queue.put(None)
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    if errors:
+        raise errors[0]
+    return processed
+
+
+def merge_shards(task_name, paths, findings_path):
+    """
+    Combines the per-shard journals (.jsonl) and findings reports (.json) of a sharded run
+    into one journal and one findings report.
+    """
+    journals = [path for path in paths if path.endswith(".jsonl")]
+    reports = [path for path in paths if path.endswith(".json")]
+    missing = [path for path in paths if not os.path.isfile(path)]
+    if missing:
+        print(f"❌ Not found: {', '.join(missing)}")
+        return
+    if not journals and not reports:
+        print("⚠️ Nothing to merge: expected journals (.jsonl) or findings reports (.json).")
+        return
+
+    if journals:
+        try:
+            path, statuses = merge_journals(journals, get_run_id(), task=task_name)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+        counts = ", ".join(f"{count} {status}" for status, count in sorted(statuses.items(), key=lambda item: str(item[0])))
+        print(f"🧾 Merged {len(journals)} journals into {path} ({counts or 'no files'}; resume with --resume {get_run_id()})")
+
+    if reports:
+        entries = {}
+        for path in reports:
+            task, results = read_findings_report(path)
+            if task != task_name:
+                print(f"❌ {path} is a '{task}' report, not '{task_name}'.")
+                return
+            entries.update(results)
+        report = write_findings_report(findings_path, task_name, entries.items())
+        print(f"🗂️ Merged {len(reports)} findings reports into {findings_path} ({report['findings']} findings in {report['files']} files)")
+
+
+def open_journal(task_name, path, recursive, sql_files, resume=None, shard=None, shard_balance=False, discovery=None):
+    """
+    Opens the journal of a directory run. When resuming, files the journal already
+    records as completed (and unchanged since) are dropped from `sql_files` as they
+    are discovered (counted as journal.skipped_done).
+
+    :return: (JobJournal, files still to process)
+    """
+    if resume:
+        _, states = load_journal(journal_path(resume))
+        set_run_id(resume)
+        print(f"⏩ Resuming run {resume}: skipping files already done")
+        journal = JobJournal(resume, root=path)
+        journal.record("resume", task=task_name)
+
+        def pending(files):
+            for file in files:
+                # Keys are relative to --path (absolute in journals of older runs)
+                state = states.get(journal.key(file)) or states.get(os.path.abspath(file))
+                if is_completed(state, task_name, hash_text(read_sql_file(file))):
+                    run_metrics.increment("journal.skipped_done")
+                else:
+                    yield file
+
+        sql_files = pending(sql_files)
+    else:
+        journal = JobJournal(get_run_id(), root=path)
+        journal.start_run(task=task_name, path=os.path.abspath(path), recursive=recursive, shard=shard, shard_balance=shard_balance,
+                          discovery=discovery)
+    print(f"🧾 Journal: {journal.path} (resume with --resume {journal.run_id})")
+    return journal, sql_files
+
+
+async def process_journaled(journal, task_name, filepath, task_class, **kwargs):
+    """
+    process_sql_file for a journaled directory run: progress is recorded for the file
+    and its --dedupe duplicates, and a failure is journaled instead of ending the run.
+    """
+    files = [filepath] + list(kwargs.get("duplicates", ()))
+    prompt_version = prompt_version_for(task_class)
+    for file in files:
+        journal.started(file, task_name, hash_text(read_sql_file(file)), prompt_version)
+
+    try:
+        await process_sql_file(filepath, task_class, **kwargs)
+    except Exception as e:
+        print(f"❌ Failed: {filepath}: {e}")
+        for file in files:
+            journal.failed(file, str(e))
+        return
+
+    for file in files:
+        journal.done(file, os.path.abspath(file), hash_text(read_sql_file(file)))
+
+
+def write_task_output(filepath, result, backup=False, dry_run=False, sanitize=False, output_path=None, git=False):
+    """
+    Applies --sanitize, --dry-run, --backup, --output and --git to a task result.
+    """
     if sanitize:
         result = clean_output(result)
 
@@ -122,10 +468,96 @@ async def process_sql_file(filepath, task_class, backup=False, dry_run=False, sa
             print(f"⚠️ Git stage failed: {e}")
 
 
+def submit_batch(task_name, task_class, path, recursive, batch_path, shard=None, shard_balance=False, discovery=None,
+                 minify=False):
+    """
+    Renders the prompt for every SQL file into a batch input JSONL file (plus manifest)
+    for the provider's batch interface. Nothing is sent to the LLM.
+    """
+    if not (issubclass(task_class, SQLTask) and task_class.prompt_key):
+        print(f"❌ Task '{task_name}' does not support batch mode.")
+        return
+
+    sql_files = [path] if os.path.isfile(path) else iter_sql_files(path, recursive=recursive, **(discovery or {}))
+    if shard and os.path.isdir(path):
+        sql_files = select_shard(sql_files, path, shard, shard_balance)
+    sql_files = list(sql_files)
+    if not sql_files:
+        print("⚠️ No SQL files found.")
+        return
+
+    task = task_class()
+    task.minify = minify  # Only applied by minifiable (report-style) tasks
+    prompt_version = PromptManager.get_metadata(task.prompt_key).get("version")
+
+    def entries():
+        for filepath in sql_files:
+            sql_code = read_sql_file(filepath)
+            yield {
+                "filepath": os.path.abspath(filepath),
+                "task": task_name,
+                "prompt_key": task.prompt_key,
+                "prompt_version": prompt_version,
+                "prompt": task.build_prompt(sql_code),
+                "temperature": task.temperature,
+                "input_hash": hash_text(sql_code),
+                "minify": minify and task.minifiable,
+            }
+
+    config = Config.load()
+    model = config.get("AOPAI_BATCH_DEPLOYMENT", config["AOPAI_DEPLOY_MODEL"])
+    manifest_path = write_batch_file(batch_path, entries(), model)
+    print(f"📦 Batch file written: {batch_path} ({len(sql_files)} requests)")
+    print(f"🗂️ Manifest written: {manifest_path}")
+
+
+def ingest_batch(task_name, task_class, results_path, manifest_path, backup=False, dry_run=False, sanitize=False, git=False):
+    """
+    Reads a batch results file and writes each result exactly as process_sql_file would.
+    """
+    if not (issubclass(task_class, SQLTask) and task_class.prompt_key):
+        print(f"❌ Task '{task_name}' does not support batch mode.")
+        return
+
+    manifest = load_manifest(manifest_path)
+    task = task_class()
+    applied = skipped = 0
+
+    for custom_id, content, error in read_batch_results(results_path):
+        entry = manifest["requests"].get(custom_id)
+        if entry is None:
+            print(f"⚠️ Skipping unknown batch request: {custom_id} {error or ''}")
+            skipped += 1
+            continue
+        filepath = entry["filepath"]
+        if entry["task"] != task_name:
+            print(f"⚠️ Skipping {filepath}: submitted for task '{entry['task']}', not '{task_name}'")
+            skipped += 1
+            continue
+        if error:
+            print(f"❌ Batch request failed for {filepath}: {error}")
+            skipped += 1
+            continue
+        sql_code = read_sql_file(filepath) if os.path.isfile(filepath) else None
+        if sql_code is None or hash_text(sql_code) != entry["input_hash"]:
+            print(f"⚠️ Skipping {filepath}: file changed since the batch was submitted")
+            skipped += 1
+            continue
+
+        print(f"🔍 Processing: {filepath}")
+        # A minified prompt was answered with minified line numbers: rebuild the line map
+        task.minify = entry.get("minify", False)
+        task.prompt_sql(sql_code)
+        write_task_output(filepath, task.postprocess(content), backup, dry_run, sanitize, None, git)
+        applied += 1
+
+    print(f"📥 Batch ingested: {applied} applied, {skipped} skipped")
+
+
 async def main():
     parser = argparse.ArgumentParser(description="Run GenAI SQL tools.")
     parser.add_argument("--task", required=True, choices=TASKS.keys(), help="Task to perform")
-    parser.add_argument("--path", required=True, help="SQL file, directory path, or natural language query")
+    parser.add_argument("--path", help="SQL file, directory path, or natural language query")
     parser.add_argument("--recursive", action="store_true", help="Recursively process folders")
     parser.add_argument("--backup", action="store_true", help="Backup files before modifying")
     parser.add_argument("--dry-run", action="store_true", help="Preview changes without saving")
@@ -135,11 +567,106 @@ async def main():
     parser.add_argument("--sql_dialect", required=False, help="SQL dialect to use (e.g., T-SQL, PostgreSQL).")
     parser.add_argument("--schema_path", help="Path to the JSON schema file.", default="schema.json")  # Default to 'schema.json'
     parser.add_argument("--detect_only", action="store_true", help="Only detect dynamic SQL patterns without analyzing risks or optimizations (specific to 'dynamic_sql' task).")
+    parser.add_argument("--candidates", type=int, default=1, help="Concurrent candidates to generate and compile-check (specific to 'nl_to_sql' task)")
+    parser.add_argument("--minify", action="store_true", help="Strip comments and whitespace from the SQL sent to the LLM (analyze, audit, explain, validate, benchmark)")
+    parser.add_argument("--structured", action="store_true", help="Return compact JSON-schema findings instead of prose and merge them into a corpus report (analyze, audit, validate)")
+    parser.add_argument("--max-output-tokens", type=int, help="Output token cap per file with --structured (default: per task)")
+    parser.add_argument("--findings-report", default="findings_report.json", help="Corpus report written with --structured")
+    parser.add_argument("--dedupe", action="store_true", help="Analyze each distinct query once and reuse the result for exact copies (analyze, audit, explain, validate, benchmark)")
+    parser.add_argument("--db", help="SQLite database to execute queries against ('benchmark'; verifies 'refactor' output)")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed warmup runs per statement with --db")
+    parser.add_argument("--repetitions", type=int, default=5, help="Timed runs per statement with --db")
+    parser.add_argument("--submit-batch", metavar="BATCH_FILE", help="Render prompts for --path into a batch JSONL file instead of calling the LLM")
+    parser.add_argument("--ingest-batch", metavar="RESULTS_FILE", help="Apply a batch results JSONL file (requires --batch-manifest)")
+    parser.add_argument("--batch-manifest", help="Manifest written by --submit-batch (<batch file>.manifest.json)")
+    parser.add_argument("--resume", metavar="RUN_ID", help="Resume a journaled directory run: skip completed files, retry failed and pending ones")
+    parser.add_argument("--query-log", help="Query-log export (CSV/TSV/JSONL from Query Store, Extended Events, pg_stat_statements); runs the task on its costliest query shapes, written to --path (default: hot_shapes/)")
+    parser.add_argument("--log-format", choices=["csv", "tsv", "jsonl"], help="Query-log format (default: from the file extension)")
+    parser.add_argument("--top", type=int, default=20, help="Query shapes to process with --query-log")
+    parser.add_argument("--rank-by", choices=RANK_BY, default="duration", help="Cost used to rank query shapes with --query-log")
+    parser.add_argument("--shard", type=shard_arg, metavar="I/N", help="Process only shard I of N of a directory run (stable hash partition, e.g. 3/20)")
+    parser.add_argument("--shard-balance", action="store_true", help="Balance shards by estimated token load instead of pure hashing")
+    parser.add_argument("--include", action="append", metavar="GLOB", help="Only process files matching this glob, relative to --path (repeatable, e.g. 'procs/**/*.sql')")
+    parser.add_argument("--exclude", action="append", metavar="GLOB", help="Skip files and directories matching this glob, .gitignore-style (repeatable)")
+    parser.add_argument("--ignore-file", action="append", metavar="NAME", help=f"Additional ignore-file name to honor besides {', '.join(IGNORE_FILES)} (repeatable)")
+    parser.add_argument("--max-file-size", type=int, metavar="KB", help="Skip SQL files larger than this (e.g. vendored dumps)")
+    parser.add_argument("--workers", type=int, default=1, help="Files processed concurrently in directory runs")
+    parser.add_argument("--build-pii-catalog", action="store_true", help="Classify every column of --schema_path as PII or not (batched LLM calls) and store the catalog used by 'mask'")
+    parser.add_argument("--pii-catalog", help="PII catalog file (default: <schema>.pii.json next to --schema_path)")
+    parser.add_argument("--patch", action="store_true", help="Ask for a unified diff instead of the whole file, applied locally with a full-text fallback (comment, refactor, style_enforce)")
+    parser.add_argument("--style-llm", action="store_true", help="After local formatting, ask the LLM to enforce naming conventions ('style_enforce'; files already enforced are skipped)")
+    parser.add_argument("--merge", nargs="+", metavar="FILE", help="Merge per-shard journals (.jsonl) and findings reports (.json, written to --findings-report)")
 
     args = parser.parse_args()
 
     task_class = TASKS[args.task]
 
+    # Offline batch mode
+    if args.ingest_batch:
+        if not args.batch_manifest:
+            parser.error("--ingest-batch requires --batch-manifest")
+        ingest_batch(args.task, task_class, args.ingest_batch, args.batch_manifest, args.backup, args.dry_run, args.sanitize, args.git)
+        return
+
+    # Precompute the PII column catalog once per schema
+    if args.build_pii_catalog:
+        await build_catalog(args.schema_path, args.pii_catalog)
+        return
+
+    # Combine the results of a sharded run
+    if args.merge:
+        merge_shards(args.task, args.merge, args.findings_report)
+        return
+
+    # Query-log mode: spend LLM calls on the shapes that actually cost the most
+    if args.query_log:
+        if args.task not in QUERY_LOG_TASKS:
+            parser.error(f"--query-log supports: {', '.join(sorted(QUERY_LOG_TASKS))}")
+        if not os.path.isfile(args.query_log):
+            print("❌ Query log does not exist.")
+            return
+        shape_files = await prioritize_query_log(args.query_log, args.path or "hot_shapes", args.top, args.rank_by, args.log_format)
+        for file in shape_files:
+            # Keep the shape SQL; the report goes next to it
+            await process_sql_file(
+                file,
+                task_class,
+                dry_run=args.dry_run,
+                sanitize=args.sanitize,
+                output_path=f"{os.path.splitext(file)[0]}.{args.task}.txt",
+                minify=args.minify,
+                db_path=args.db,
+                warmup=args.warmup,
+                repetitions=args.repetitions
+            )
+        return
+    discovery = discovery_options(args)
+    if args.resume:
+        if not os.path.isfile(journal_path(args.resume)):
+            print(f"❌ No journal found for run {args.resume}.")
+            return
+        # The directory, --recursive and sharding default to the original run's
+        header, _ = load_journal(journal_path(args.resume))
+        if header and header.get("task") != args.task:
+            print(f"❌ Run {args.resume} was a '{header.get('task')}' run, not '{args.task}'.")
+            return
+        if header:
+            args.path = args.path or header.get("path")
+            args.recursive = args.recursive or header.get("recursive", False)
+            args.shard = args.shard or header.get("shard")
+            args.shard_balance = args.shard_balance or header.get("shard_balance", False)
+            # Discovery is the original run's, so files it excluded are not picked up
+            discovery = header.get("discovery") or discovery
+    if not args.path:
+        parser.error("--path is required")
+    if args.submit_batch:
+        if not os.path.exists(args.path):
+            print("❌ Provided path does not exist.")
+            return
+        submit_batch(args.task, task_class, args.path, args.recursive, args.submit_batch, args.shard, args.shard_balance, discovery,
+                     args.minify)
+        return
+
     # Special handling for NaturalLanguageToSQL
     if args.task == "nl_to_sql":
         schema_path = args.schema_path
@@ -160,7 +687,7 @@ async def main():
 
         # Instantiate the NaturalLanguageToSQL task
         task_instance = task_class(schema_file=schema_path)
-        result = await task_instance.run(nl_query, sql_dialect=sql_dialect)
+        result = await task_instance.run(nl_query, sql_dialect=sql_dialect, candidates=args.candidates)
 
         # Output result
         if args.dry_run:
@@ -177,6 +704,8 @@ async def main():
         return
 
     # For other tasks
+    verification_report = []  # (file, Verification) for refactors checked with --db
+    findings_report = [] if args.structured and args.task in STRUCTURED_TASKS else None  # (file, [Finding])
     if os.path.exists(args.path):
         if os.path.isfile(args.path):
             await process_sql_file(
@@ -188,30 +717,93 @@ async def main():
                 args.output, 
                 args.git, 
                 schema_path=args.schema_path, 
+                pii_catalog=args.pii_catalog,
                 sql_dialect=args.sql_dialect, 
-                detect_only=args.detect_only
+                style_llm=args.style_llm,
+                patch=args.patch,
+                detect_only=args.detect_only,
+                candidates=args.candidates,
+                minify=args.minify,
+                db_path=args.db,
+                warmup=args.warmup,
+                repetitions=args.repetitions,
+                verification_report=verification_report,
+                structured=args.structured,
+                max_output_tokens=args.max_output_tokens,
+                findings_report=findings_report
             )
         elif os.path.isdir(args.path):
-            sql_files = get_sql_files_in_directory(args.path, recursive=args.recursive)
-            if not sql_files:
-                print("⚠️ No SQL files found.")
-                return
-            for file in sql_files:
-                await process_sql_file(
-                    file, 
-                    task_class, 
-                    args.backup, 
-                    args.dry_run, 
-                    args.sanitize, 
-                    None, 
-                    args.git, 
-                    schema_path=args.schema_path, 
-                    sql_dialect=args.sql_dialect, 
-                    detect_only=args.detect_only
+            # Discovery is lazy: the first files are processed while the tree is still being walked
+            sql_files = iter_sql_files(args.path, recursive=args.recursive, **discovery)
+            if args.shard:
+                sql_files = select_shard(sql_files, args.path, args.shard, args.shard_balance)
+            # Record progress so an interrupted run can be resumed (dry runs write nothing)
+            journal = None
+            if not args.dry_run:
+                journal, sql_files = open_journal(args.task, args.path, args.recursive, sql_files, args.resume, args.shard, args.shard_balance,
+                                                  discovery)
+            if args.dedupe and args.task in DEDUPE_TASKS:
+                # Grouping needs every file up front
+                sql_files = list(sql_files)
+                work = await dedupe_sql_files(sql_files) if sql_files else []
+            else:
+                work = ((file, []) for file in sql_files)
+
+            async def handle(file, duplicates):
+                options = dict(
+                    backup=args.backup,
+                    dry_run=args.dry_run,
+                    sanitize=args.sanitize,
+                    git=args.git,
+                    schema_path=args.schema_path,
+                    pii_catalog=args.pii_catalog,
+                    sql_dialect=args.sql_dialect,
+                    style_llm=args.style_llm,
+                    patch=args.patch,
+                    detect_only=args.detect_only,
+                    candidates=args.candidates,
+                    minify=args.minify,
+                    db_path=args.db,
+                    warmup=args.warmup,
+                    repetitions=args.repetitions,
+                    verification_report=verification_report,
+                    structured=args.structured,
+                    max_output_tokens=args.max_output_tokens,
+                    findings_report=findings_report,
+                    duplicates=duplicates
                 )
+                if journal is None:
+                    await process_sql_file(file, task_class, **options)
+                else:
+                    await process_journaled(journal, args.task, file, task_class, **options)
+
+            try:
+                processed = await run_work_queue(work, handle, args.workers)
+                if journal is not None:
+                    journal.record("finished", files=processed)
+            finally:
+                if journal is not None:
+                    journal.close()
+            if not processed:
+                print("⚠️ No SQL files found." if not args.resume else "✅ Nothing left to process.")
     else:
         print("❌ Provided path does not exist.")
 
+    # Per-file speedups of verified refactors
+    if verification_report:
+        print("\n📊 Refactor verification:")
+        print(format_speedup_table(verification_report))
+
+    # Merged findings of every file (--structured)
+    if findings_report and not args.dry_run:
+        report = write_findings_report(args.findings_report, args.task, findings_report)
+        print(f"🗂️ Findings report written: {args.findings_report} ({report['findings']} findings in {report['files']} files)")
+
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
+
+    # Retries, hedged requests, circuit-breaker trips, ...
+    summary = run_metrics.format_summary()
+    if summary:
+        print(summary)
\ No newline at end of file
@@ -1,35 +1,318 @@
-
 import httpx
 import asyncio
+import json
 import logging
+import time
 from core.config_loader import Config
+from core.metrics import run_metrics
+from core.deployment_pool import get_deployment_pool
+from core.model_routing import RoutingPolicy
+from utils.prompt_manager import prompt_messages
+from core.resilience import (
+    CircuitOpenError,
+    backoff_delay,
+    is_retryable,
+    retry_after_seconds,
+)
 
 class BaseAIClient:
     """
     Asynchronous Azure OpenAI client for executing LLM calls.
+
+    Calls are routed across the configured deployment pool (see `AOPAI_DEPLOYMENTS`),
+    failing over to another deployment when one throttles or errors. Retryable failures
+    (timeouts, transport errors, 429 and 5xx responses) are retried with jittered
+    exponential backoff. Optionally, a duplicate "hedge" request is sent when a call
+    runs past the configured latency percentile, and the first response wins. Each
+    deployment has a circuit breaker shared by every worker, so all of them fail fast
+    while it is down.
+
+    With `LLM_ROUTING` configured, `route()` picks a deployment tier from the complexity of
+    the SQL input for the client's next requests, and fast-tier failures are escalated to
+    the strong tier.
     """
 
     def __init__(self):
         self.config = Config.load()
-        self.headers = {
-            "api-key": self.config["AOPAI_KEY"],
-            "Content-Type": "application/json"
-        }
-        self.endpoint = f"{self.config['API_BASE']}openai/deployments/{self.config['AOPAI_DEPLOY_MODEL']}/chat/completions?api-version={self.config['AOPAI_API_VERSION']}"
+        self.pool = get_deployment_pool(self.config)
+
+        # Primary deployment, kept for callers that inspect the endpoint directly
+        primary = self.pool.deployments[0]
+        self.headers = primary.headers
+        self.endpoint = primary.endpoint
+
+        # Resilience settings (all optional in config)
+        self.timeout = float(self.config.get("LLM_TIMEOUT", 60.0))
+        self.max_retries = int(self.config.get("LLM_MAX_RETRIES", 3))
+        self.backoff_base = float(self.config.get("LLM_BACKOFF_BASE", 0.5))
+        self.backoff_max = float(self.config.get("LLM_BACKOFF_MAX", 20.0))
+        self.hedge_percentile = self.config.get("LLM_HEDGE_PERCENTILE")  # e.g. 95; None disables hedging
+        self.hedge_min_samples = int(self.config.get("LLM_HEDGE_MIN_SAMPLES", 20))
+
+        # Complexity-based tier routing (optional); None sends requests to any deployment
+        self.routing = RoutingPolicy.from_config(self.config)
+        self.tier = None
+
+        # Name under which token usage and prompt-cache hits are reported (e.g. the task class)
+        self.usage_label = None
+
+        # Completion tokens of this client's calls, for per-file measurements
+        self.completion_tokens = 0
+
+    def route(self, sql_code: str) -> str:
+        """
+        Routes this client's subsequent requests by the complexity of `sql_code`.
+
+        :return: The chosen tier, or None when routing is not configured
+        """
+        if self.routing is not None:
+            self.tier = self.routing.choose(sql_code)
+        return self.tier
+
+    def route_strong(self) -> str:
+        """
+        Routes this client's subsequent requests to the strong tier, for inputs that can't
+        be scored as SQL (e.g. a question to turn into SQL against a whole schema).
+
+        :return: The strong tier, or None when routing is not configured
+        """
+        if self.routing is not None:
+            self.tier = self.routing.strong_tier
+            run_metrics.increment(f"route.{self.tier}")
+        return self.tier
+
+    def escalate(self):
+        """
+        Sends this client's subsequent requests to the strong tier (e.g. after a failed
+        attempt whose output didn't pass local checks).
+        """
+        if self.routing is not None and self.tier != self.routing.strong_tier:
+            self.tier = self.routing.strong_tier
+            run_metrics.increment("route.escalations")
 
     async def get_completion(self, prompt: str, temperature: float = 0.3) -> str:
+        """
+        Sends a rendered prompt; a ChatPrompt keeps its system/context/user layout.
+        """
+        return await self.get_chat_completion(prompt_messages(prompt), temperature)
+
+    async def get_chat_completion(self, messages: list, temperature: float = 0.3) -> str:
+        """
+        Sends a full chat message list (system / user / assistant turns).
+        """
         payload = {
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": messages,
             "temperature": temperature
         }
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            try:
-                response = await client.post(self.endpoint, json=payload, headers=self.headers)
-                response.raise_for_status()
+        data = await self._post_with_retries(payload)
+        return data["choices"][0]["message"]["content"]
+
+    async def get_structured_completion(self, prompt: str, schema: dict, name: str, temperature: float = 0.3, max_tokens: int = None) -> dict:
+        """
+        Requests a response constrained to a JSON schema (structured outputs) and returns
+        it decoded.
+
+        :param schema: JSON schema of the response (strict: all properties required)
+        :param name: Schema name reported to the API
+        :param max_tokens: Output token cap; a response cut off by it is an error
+        """
+        payload = {
+            "messages": prompt_messages(prompt),
+            "temperature": temperature,
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {"name": name, "strict": True, "schema": schema}
+            }
+        }
+        if max_tokens:
+            payload["max_tokens"] = max_tokens
+
+        data = await self._post_with_retries(payload)
+        choice = data["choices"][0]
+        if choice.get("finish_reason") == "length":
+            raise RuntimeError(f"Structured response exceeded {max_tokens} output tokens")
+        try:
+            return json.loads(choice["message"]["content"])
+        except (TypeError, json.JSONDecodeError) as e:
+            raise RuntimeError(f"Structured response is not valid JSON: {e}")
+
+    async def generate(self, prompt: str, temperature: float = 0.3) -> str:
+        """
+        Alias of get_completion used by the prompt-driven utilities.
+        """
+        return await self.get_completion(prompt, temperature)
+
+    async def _post_with_retries(self, payload: dict) -> dict:
+        """
+        Sends the payload, failing over between deployments and retrying retryable
+        failures with backoff, and returns the decoded JSON response.
+        """
+        run_metrics.increment("llm.requests")
+
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            attempt = 0
+            failed = set()
+            tier = self.tier
+            while True:
+                deployment = self.pool.select(exclude=failed, tier=tier)
+                if deployment is None:
+                    if self._escalate_request(tier, "circuit open for every deployment"):
+                        tier, attempt = self.routing.strong_tier, 0
+                        continue
+                    run_metrics.increment("llm.circuit_rejections")
+                    raise CircuitOpenError("OpenAI request failed: circuit open for every deployment")
+
+                try:
+                    data = await self._hedged_post(client, deployment, payload)
+
+                except Exception as e:
+                    if not is_retryable(e) or attempt >= self.max_retries:
+                        if self._escalate_request(tier, e):
+                            tier, attempt = self.routing.strong_tier, 0
+                            failed.clear()
+                            continue
+                        run_metrics.increment("llm.failures")
+                        logging.exception("LLM API call failed")
+                        raise RuntimeError(f"OpenAI request failed: {e}")
+
+                    attempt += 1
+                    run_metrics.increment("llm.retries")
+                    failed.add(deployment)
+                    if len(failed) < len(self.pool.candidates(tier)):
+                        # Another deployment is still untried: fail over immediately
+                        run_metrics.increment("llm.failovers")
+                        logging.warning(f"LLM call to {deployment.name} failed ({e}); failing over")
+                        continue
+                    if self._escalate_request(tier, e):
+                        # The fast tier is exhausted: move on instead of backing off
+                        tier = self.routing.strong_tier
+                        failed.clear()
+                        continue
+
+                    delay = retry_after_seconds(e, self.backoff_max)
+                    if delay is None:
+                        delay = backoff_delay(attempt - 1, self.backoff_base, self.backoff_max)
+                    failed.clear()
+                    logging.warning(f"LLM call failed ({e}); retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                    continue
+
+                return data
+
+    def _escalate_request(self, tier: str, reason) -> bool:
+        """
+        True if a request that failed on `tier` should be retried on the strong tier.
+        """
+        if self.routing is None or not self.routing.can_escalate(tier):
+            return False
+        run_metrics.increment("route.escalations")
+        logging.warning(f"LLM call failed on the {tier} tier ({reason}); escalating to {self.routing.strong_tier}")
+        return True
+
+    def _hedge_delay(self, deployment):
+        """
+        Returns the latency (seconds) after which a hedge request is sent, or None
+        when hedging is disabled or there are not enough samples yet.
+        """
+        if self.hedge_percentile is None or len(deployment.latency) < self.hedge_min_samples:
+            return None
+        return deployment.latency.percentile(float(self.hedge_percentile))
+
+    async def _hedged_post(self, client: httpx.AsyncClient, deployment, payload: dict) -> dict:
+        hedge_after = self._hedge_delay(deployment)
+        if hedge_after is None:
+            return await self._timed_post(client, deployment, payload)
+
+        primary = asyncio.ensure_future(self._timed_post(client, deployment, payload))
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        # Prefer a different deployment for the duplicate request
+        hedge_deployment = self.pool.select(exclude={deployment}, tier=deployment.tier if self.tier else None)
+        if hedge_deployment is None:
+            return await primary
+
+        run_metrics.increment("llm.hedged_requests")
+        hedge = asyncio.ensure_future(self._timed_post(client, hedge_deployment, payload))
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            run_metrics.increment("llm.hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _timed_post(self, client: httpx.AsyncClient, deployment, payload: dict) -> dict:
+        """
+        Performs a single HTTP call against `deployment` and updates its latency,
+        quota headroom and circuit-breaker state.
+        """
+        started = time.monotonic()
+        deployment.begin()
+        try:
+            response = await client.post(deployment.endpoint, json=payload, headers=deployment.headers)
+            deployment.update_quota(response.headers)
+            response.raise_for_status()
+            data = response.json()
+
+        except asyncio.CancelledError:
+            # Lost a hedge race (or the caller gave up): no verdict on the deployment
+            deployment.breaker.release_probe()
+            raise
+
+        except Exception as e:
+            if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429:
+                # Throttled, not down: rest this deployment and let others take the load
+                run_metrics.increment("llm.throttled")
+                deployment.throttle(retry_after_seconds(e, self.backoff_max) or self.backoff_base)
+                deployment.breaker.record_success()
+            elif is_retryable(e):
+                if deployment.breaker.record_failure():
+                    run_metrics.increment("llm.circuit_opened")
+                    logging.warning(f"Circuit opened for deployment {deployment.name}")
+            else:
+                # The deployment answered; the request itself was bad
+                deployment.breaker.record_success()
+            raise
+
+        finally:
+            deployment.end()
+
+        elapsed = time.monotonic() - started
+        deployment.breaker.record_success()
+        deployment.latency.record(elapsed)
+        run_metrics.observe("llm.latency", elapsed)
+        usage = data.get("usage") or {}
+        cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+        run_metrics.increment("llm.prompt_tokens", usage.get("prompt_tokens", 0))
+        run_metrics.increment("llm.completion_tokens", usage.get("completion_tokens", 0))
+        self.completion_tokens += usage.get("completion_tokens", 0)
+        run_metrics.increment("llm.cached_tokens", cached_tokens)
+        if self.usage_label:
+            # Provider-side prefix cache hits per task (see prompts/index.yaml layout)
+            run_metrics.increment(f"prompt_cache.{self.usage_label}.prompt_tokens", usage.get("prompt_tokens", 0))
+            run_metrics.increment(f"prompt_cache.{self.usage_label}.cached_tokens", cached_tokens)
+        if deployment.tier:
+            # Per-route latency, tokens and estimated cost
+            run_metrics.observe(f"llm.tier.{deployment.tier}.latency", elapsed)
+            run_metrics.increment(f"llm.tier.{deployment.tier}.requests")
+            run_metrics.increment(f"llm.tier.{deployment.tier}.completion_tokens", usage.get("completion_tokens", 0))
+            cost = deployment.cost(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+            if cost:
+                run_metrics.increment(f"llm.tier.{deployment.tier}.cost_usd", cost)
+        run_metrics.increment(f"llm.deployment.{deployment.name}.requests")
+        return data
 
-                return response.json()["choices"][0]["message"]["content"]
 
-            except Exception as e:
-                logging.exception("LLM API call failed")
-                raise RuntimeError(f"OpenAI request failed: {e}")
+# Name used by the utilities that receive the client as a dependency
+AIClient = BaseAIClient
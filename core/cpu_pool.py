@@ -0,0 +1,129 @@
+"""
+CPU Pool
+
+Process-pool execution for CPU-bound local stages (sqlparse formatting, lexing,
+validation, scanning). Pure-Python parsing holds the GIL, so running it on the event loop
+(or in a thread) stalls the asyncio loop driving the LLM requests; here it runs in worker
+processes instead. Workers are warmed once by an initializer and keep their own caches
+(compiled lexer regexes, loaded schema indexes), so each task only pays for
+pickling its SQL text.
+
+Small inputs are processed inline: below `INLINE_MAX_CHARS` the pickling round-trip
+costs more than the work itself.
+
+Environment overrides:
+    GENAI_SQL_CPU_WORKERS        Worker processes (default: CPU count - 1, at least 1)
+    GENAI_SQL_CPU_CHUNK_SIZE     Items per worker task in map_cpu_bound (default: 16)
+    GENAI_SQL_CPU_INLINE_CHARS   Largest input processed inline (default: 20000)
+"""
+
+import asyncio
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from core.metrics import run_metrics
+
+CPU_WORKERS = int(os.environ.get("GENAI_SQL_CPU_WORKERS", "0")) or max(1, (os.cpu_count() or 2) - 1)
+CHUNK_SIZE = int(os.environ.get("GENAI_SQL_CPU_CHUNK_SIZE", "16"))
+INLINE_MAX_CHARS = int(os.environ.get("GENAI_SQL_CPU_INLINE_CHARS", "20000"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    """
+    Imports the parsing modules (and compiles their regexes) once per worker, so the
+    first task doesn't pay for it.
+    """
+    try:
+        import sqlparse  # noqa: F401
+    except ImportError:
+        pass  # Only format_sql needs it
+    import utils.dynamic_sql_scanner  # noqa: F401
+    import utils.sql_local_validator  # noqa: F401
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Returns the shared process pool, starting it on first use.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=CPU_WORKERS, initializer=_init_worker)
+            atexit.register(shutdown_process_pool)
+        return _pool
+
+
+def shutdown_process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+async def run_cpu_bound(func, *args, size: int = None):
+    """
+    Runs `func(*args)` in the process pool without blocking the event loop.
+    `func` must be a module-level function and its arguments picklable.
+
+    :param size: Input size in characters; inputs up to INLINE_MAX_CHARS run inline
+    """
+    if size is not None and size <= INLINE_MAX_CHARS:
+        run_metrics.increment("cpu_pool.inline")
+        return func(*args)
+
+    run_metrics.increment("cpu_pool.tasks")
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), func, *args)
+
+
+def _run_chunk(func, chunk):
+    return [func(*args) for args in chunk]
+
+
+async def map_cpu_bound(func, items, chunk_size: int = None) -> list:
+    """
+    Applies `func` to every item in the process pool, sending items to the workers in
+    chunks to amortize scheduling and pickling overhead. Results keep the input order.
+
+    :param items: Iterable of argument tuples (or single arguments)
+    :param chunk_size: Items per worker task (default: CHUNK_SIZE)
+    """
+    items = [item if isinstance(item, tuple) else (item,) for item in items]
+    if not items:
+        return []
+    chunk_size = chunk_size or CHUNK_SIZE
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+    run_metrics.increment("cpu_pool.tasks", len(chunks))
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    results = await asyncio.gather(*(loop.run_in_executor(pool, _run_chunk, func, chunk) for chunk in chunks))
+    return [result for chunk_results in results for result in chunk_results]
+
+
+# -- Worker functions ------------------------------------------------------------------
+# Any module-level function can be passed to run_cpu_bound / map_cpu_bound (for example
+# utils.dynamic_sql_scanner.scan_dynamic_sql); these wrap stages that need setup.
+
+def format_sql(sql_query: str) -> str:
+    """
+    sqlparse reindent + uppercase keywords.
+    """
+    import sqlparse
+    return sqlparse.format(sql_query, reindent=True, keyword_case="upper")
+
+
+def validate_sql(sql_query: str, schema_path: str = None) -> list:
+    """
+    Runs the local validator. The schema index is loaded once per worker process
+    (load_schema_index caches it until the file changes).
+    """
+    from utils.schema_index import load_schema_index
+    from utils.sql_local_validator import LocalSQLValidator
+    return LocalSQLValidator(load_schema_index(schema_path) if schema_path else None).validate(sql_query)
@@ -0,0 +1,214 @@
+"""
+Azure OpenAI Deployment Pool
+
+Spreads LLM calls over several deployments (regions / keys / models) so a large run can
+use the combined quota. Requests are routed with least-outstanding-requests or
+latency-weighted selection; deployments that throttle, run out of quota headroom or trip
+their circuit breaker are skipped until they recover.
+"""
+
+import threading
+import time
+
+from core.resilience import CircuitBreaker, get_circuit_breaker, get_latency_tracker
+
+LEAST_OUTSTANDING = "least_outstanding"
+LATENCY_WEIGHTED = "latency_weighted"
+STRATEGIES = (LEAST_OUTSTANDING, LATENCY_WEIGHTED)
+
+# Rate-limit headroom reported by Azure is only trusted for this long (seconds)
+QUOTA_STALE_AFTER = 60.0
+
+
+class Deployment:
+    """
+    A single chat-completions deployment and its live routing state.
+    """
+
+    def __init__(self, name: str, api_base: str, api_key: str, model: str, api_version: str,
+                 weight: float = 1.0, tier: str = None, breaker_threshold: int = 5, breaker_reset: float = 30.0,
+                 input_cost_per_1k: float = 0.0, output_cost_per_1k: float = 0.0):
+        self.name = name
+        self.model = model
+        self.weight = max(float(weight), 0.01)
+        self.tier = tier
+        self.input_cost_per_1k = float(input_cost_per_1k)
+        self.output_cost_per_1k = float(output_cost_per_1k)
+        self.endpoint = f"{api_base}openai/deployments/{model}/chat/completions?api-version={api_version}"
+        self.headers = {
+            "api-key": api_key,
+            "Content-Type": "application/json"
+        }
+        self.breaker = get_circuit_breaker(self.endpoint, breaker_threshold, breaker_reset)
+        self.latency = get_latency_tracker(self.endpoint)
+
+        self.outstanding = 0
+        self.cooldown_until = 0.0
+        self.remaining_requests = None
+        self.remaining_tokens = None
+        self._quota_updated_at = 0.0
+        self._lock = threading.Lock()
+
+    def begin(self):
+        with self._lock:
+            self.outstanding += 1
+
+    def end(self):
+        with self._lock:
+            self.outstanding = max(0, self.outstanding - 1)
+
+    def throttle(self, seconds: float):
+        """
+        Takes the deployment out of rotation for `seconds` (e.g. after a 429).
+        """
+        with self._lock:
+            self.cooldown_until = max(self.cooldown_until, time.monotonic() + seconds)
+
+    def update_quota(self, headers):
+        """
+        Reads Azure's x-ratelimit-remaining-* response headers.
+        """
+        requests = headers.get("x-ratelimit-remaining-requests")
+        tokens = headers.get("x-ratelimit-remaining-tokens")
+        with self._lock:
+            if requests is not None and str(requests).isdigit():
+                self.remaining_requests = int(requests)
+            if tokens is not None and str(tokens).isdigit():
+                self.remaining_tokens = int(tokens)
+            self._quota_updated_at = time.monotonic()
+
+    def is_cooling_down(self) -> bool:
+        return time.monotonic() < self.cooldown_until
+
+    def is_quota_exhausted(self) -> bool:
+        if time.monotonic() - self._quota_updated_at > QUOTA_STALE_AFTER:
+            return False
+        return self.remaining_requests == 0 or self.remaining_tokens == 0
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        """
+        Estimated cost of a call, from the configured per-1K-token prices.
+        """
+        return (prompt_tokens * self.input_cost_per_1k + completion_tokens * self.output_cost_per_1k) / 1000
+
+    def score(self, strategy: str) -> float:
+        """
+        Lower is better.
+        """
+        if strategy == LATENCY_WEIGHTED:
+            typical = self.latency.percentile(50) or 1.0
+            return typical * (self.outstanding + 1) / self.weight
+        return self.outstanding / self.weight
+
+    def __repr__(self):
+        return f"Deployment({self.name!r}, outstanding={self.outstanding})"
+
+
+class DeploymentPool:
+    """
+    Routes requests across a list of deployments.
+    """
+
+    def __init__(self, deployments, strategy: str = LEAST_OUTSTANDING):
+        if not deployments:
+            raise ValueError("DeploymentPool requires at least one deployment")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown routing strategy '{strategy}'. Expected one of {STRATEGIES}")
+        self.deployments = list(deployments)
+        self.strategy = strategy
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "DeploymentPool":
+        """
+        Builds the pool from `AOPAI_DEPLOYMENTS` (a list of dicts with name, api_base,
+        api_key, model, api_version, weight, tier, input_cost_per_1k, output_cost_per_1k).
+        Missing fields fall back to the single-deployment keys; without `AOPAI_DEPLOYMENTS` the pool holds exactly the
+        legacy `API_BASE` / `AOPAI_DEPLOY_MODEL` deployment.
+        """
+        breaker_threshold = int(config.get("LLM_BREAKER_THRESHOLD", 5))
+        breaker_reset = float(config.get("LLM_BREAKER_RESET", 30.0))
+        entries = config.get("AOPAI_DEPLOYMENTS") or [{}]
+
+        deployments = []
+        for index, entry in enumerate(entries):
+            model = entry.get("model", config.get("AOPAI_DEPLOY_MODEL"))
+            deployments.append(Deployment(
+                name=entry.get("name", model if len(entries) == 1 else f"{model}-{index}"),
+                api_base=entry.get("api_base", config.get("API_BASE")),
+                api_key=entry.get("api_key", config.get("AOPAI_KEY")),
+                model=model,
+                api_version=entry.get("api_version", config.get("AOPAI_API_VERSION")),
+                weight=entry.get("weight", 1.0),
+                tier=entry.get("tier"),
+                breaker_threshold=breaker_threshold,
+                breaker_reset=breaker_reset,
+                input_cost_per_1k=entry.get("input_cost_per_1k", 0.0),
+                output_cost_per_1k=entry.get("output_cost_per_1k", 0.0),
+            ))
+        return cls(deployments, config.get("LLM_ROUTING_STRATEGY", LEAST_OUTSTANDING))
+
+    def candidates(self, tier: str = None) -> list:
+        """
+        Deployments of `tier`, or all deployments if none has that tier.
+        """
+        if tier is None:
+            return self.deployments
+        return [d for d in self.deployments if d.tier == tier] or self.deployments
+
+    def select(self, exclude=(), tier: str = None):
+        """
+        Picks the best deployment for the next request.
+
+        Healthy deployments with quota headroom are preferred; deployments in `exclude`
+        (e.g. ones that just failed for this request), cooling down after a 429, or out
+        of quota are only used as a last resort. Deployments whose circuit breaker
+        rejects the call are never returned.
+
+        :param exclude: Deployments to avoid if any alternative exists
+        :param tier: Restrict selection to deployments with this tier (if any match)
+        :return: A Deployment, or None if every circuit is open
+        """
+        candidates = self.candidates(tier)
+        with self._lock:
+            ranked = sorted(
+                candidates,
+                key=lambda d: (
+                    d in exclude,
+                    d.is_cooling_down(),
+                    d.is_quota_exhausted(),
+                    d.breaker.state != CircuitBreaker.CLOSED,
+                    d.score(self.strategy),
+                )
+            )
+            for deployment in ranked:
+                if deployment.breaker.allow_request():
+                    return deployment
+        return None
+
+    def __len__(self):
+        return len(self.deployments)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_deployment_pool(config: dict) -> DeploymentPool:
+    """
+    Returns the process-wide pool for this configuration, so outstanding-request counts
+    and quota headroom are shared by every client instance.
+    """
+    entries = config.get("AOPAI_DEPLOYMENTS") or [{}]
+    key = (
+        config.get("API_BASE"),
+        config.get("AOPAI_DEPLOY_MODEL"),
+        config.get("LLM_ROUTING_STRATEGY", LEAST_OUTSTANDING),
+        tuple((e.get("name"), e.get("api_base"), e.get("model")) for e in entries),
+    )
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = DeploymentPool.from_config(config)
+            _pools[key] = pool
+        return pool
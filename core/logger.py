@@ -1,26 +1,183 @@
+"""
+HIPAA-compliant audit logging.
 
+Loggers returned by `get_logger` only put records on an in-memory queue; a single
+background `QueueListener` thread formats them as structured JSON lines and writes them
+to size-rotated per-logger files under `logs/`, so no disk I/O happens on the event loop.
+Every record carries the run's correlation id. Verbose payloads (full prompts or LLM
+responses, passed as `extra={"payload": ...}`) are sampled and truncated.
+
+Environment overrides:
+    GENAI_SQL_LOG_DIR            Log directory (default: logs)
+    GENAI_SQL_RUN_ID             Correlation id for this run (default: random)
+    GENAI_SQL_LOG_SAMPLE_RATE    Fraction of payloads kept (default: 0.1)
+"""
+
+import atexit
+import json
 import logging
-from datetime import datetime
+import logging.handlers
 import os
+import queue
+import random
+import threading
+import uuid
+from datetime import datetime, timezone
+
+LOG_DIR = os.environ.get("GENAI_SQL_LOG_DIR", "logs")
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+PAYLOAD_SAMPLE_RATE = float(os.environ.get("GENAI_SQL_LOG_SAMPLE_RATE", "0.1"))
+PAYLOAD_MAX_CHARS = 2000
+
+_run_id = os.environ.get("GENAI_SQL_RUN_ID") or uuid.uuid4().hex[:12]
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "run_id"}
+
+
+def get_run_id() -> str:
+    return _run_id
+
+
+def set_run_id(run_id: str):
+    """
+    Sets the correlation id stamped on every subsequent record (e.g. a resumed job's id).
+    """
+    global _run_id
+    _run_id = run_id
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Renders a record as one JSON object per line.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "run_id": getattr(record, "run_id", _run_id),
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and value is not None:
+                entry[key] = value if isinstance(value, (str, int, float, bool, list, dict)) else str(value)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class PayloadSampler(logging.Filter):
+    """
+    Stamps the correlation id and samples verbose payloads on the calling thread.
+    Unsampled payloads are replaced by their length, so the event itself is kept.
+    """
+
+    def __init__(self, rate: float = PAYLOAD_SAMPLE_RATE, max_chars: int = PAYLOAD_MAX_CHARS):
+        super().__init__()
+        self.rate = rate
+        self.max_chars = max_chars
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.run_id = _run_id
+        payload = getattr(record, "payload", None)
+        if payload is not None:
+            payload = str(payload)
+            record.payload_chars = len(payload)
+            if random.random() < self.rate:
+                record.payload = payload[:self.max_chars]
+            else:
+                record.payload = None
+        return True
+
+
+class _PerLoggerFileHandler(logging.Handler):
+    """
+    Routes records to `<log dir>/<logger name>.log`, one rotating file per logger.
+    Runs only on the listener thread.
+    """
+
+    def __init__(self, log_dir: str):
+        super().__init__()
+        self.log_dir = log_dir
+        self._files = {}
+        self._formatter = JSONFormatter()
+
+    def emit(self, record: logging.LogRecord):
+        handler = self._files.get(record.name)
+        if handler is None:
+            os.makedirs(self.log_dir, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                os.path.join(self.log_dir, f"{record.name}.log"),
+                maxBytes=LOG_MAX_BYTES,
+                backupCount=LOG_BACKUP_COUNT,
+                encoding="utf-8",
+                delay=True,
+            )
+            handler.setFormatter(self._formatter)
+            self._files[record.name] = handler
+        handler.handle(record)
+
+    def close(self):
+        for handler in self._files.values():
+            handler.close()
+        self._files.clear()
+        super().close()
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues the record as-is; message formatting is deferred to the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve args now so mutable arguments can't change before the listener runs
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+_log_queue = queue.SimpleQueue()
+_queue_handler = _QueueHandler(_log_queue)
+_queue_handler.addFilter(PayloadSampler())
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _ensure_listener():
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            _listener = logging.handlers.QueueListener(_log_queue, _PerLoggerFileHandler(LOG_DIR))
+            _listener.start()
+            atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """
+    Flushes queued records to disk and stops the listener thread.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
+
 
 def get_logger(name: str) -> logging.Logger:
     """
-    Returns a configured logger with HIPAA-compliant format and file audit.
+    Returns a configured logger with HIPAA-compliant structured format and file audit.
     """
-    log_dir = "logs"
-    os.makedirs(log_dir, exist_ok=True)
-    log_file = os.path.join(log_dir, f"{name}.log")
+    _ensure_listener()
 
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
 
-    fh = logging.FileHandler(log_file)
-    fh.setLevel(logging.INFO)
-
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    fh.setFormatter(formatter)
-
-    if not logger.handlers:
-        logger.addHandler(fh)
+    if _queue_handler not in logger.handlers:
+        logger.addHandler(_queue_handler)
 
     return logger
@@ -0,0 +1,105 @@
+"""
+Run Metrics
+
+Process-wide counters and timings collected during a CLI run (retries, hedged
+requests, circuit-breaker trips, ...) and printed as a summary when the run ends.
+"""
+
+import threading
+from collections import defaultdict
+
+
+class RunMetrics:
+    """
+    Thread-safe registry of named counters and duration samples.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._timings = defaultdict(list)
+
+    def increment(self, name: str, amount=1):
+        """
+        Adds `amount` to the counter `name`.
+        """
+        with self._lock:
+            self._counters[name] += amount
+
+    def observe(self, name: str, seconds: float):
+        """
+        Records a duration sample (in seconds) under `name`.
+        """
+        with self._lock:
+            self._timings[name].append(seconds)
+
+    def get(self, name: str) -> int:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict:
+        """
+        Returns a copy of all counters and timing samples.
+        """
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "timings": {name: list(values) for name, values in self._timings.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+    def format_summary(self) -> str:
+        """
+        Renders the collected metrics as a plain-text summary block.
+        """
+        snapshot = self.snapshot()
+        if not snapshot["counters"] and not snapshot["timings"]:
+            return ""
+
+        lines = ["📊 Run metrics:"]
+        for name in sorted(snapshot["counters"]):
+            value = snapshot["counters"][name]
+            lines.append(f"   {name}: {value:.4f}" if isinstance(value, float) else f"   {name}: {value}")
+        for label, ratio in sorted(cache_hit_ratios(snapshot["counters"]).items()):
+            lines.append(f"   prompt_cache.{label}.hit_ratio: {ratio:.1%}")
+        for mode, tokens in sorted(rewrite_tokens_per_file(snapshot["counters"]).items()):
+            lines.append(f"   rewrite.{mode}.completion_tokens_per_file: {tokens:.0f}")
+        for name in sorted(snapshot["timings"]):
+            values = snapshot["timings"][name]
+            avg = sum(values) / len(values)
+            lines.append(f"   {name}: n={len(values)} avg={avg:.3f}s max={max(values):.3f}s")
+        return "\n".join(lines)
+
+
+def cache_hit_ratios(counters: dict) -> dict:
+    """
+    Share of prompt tokens served from the provider's prompt cache, per usage label,
+    from the prompt_cache.<label>.prompt_tokens / cached_tokens counters.
+    """
+    ratios = {}
+    for name, prompt_tokens in counters.items():
+        if name.startswith("prompt_cache.") and name.endswith(".prompt_tokens") and prompt_tokens:
+            label = name[len("prompt_cache."):-len(".prompt_tokens")]
+            ratios[label] = counters.get(f"prompt_cache.{label}.cached_tokens", 0) / prompt_tokens
+    return ratios
+
+
+def rewrite_tokens_per_file(counters: dict) -> dict:
+    """
+    Average completion tokens per rewritten file, per output mode (full, patch,
+    patch_fallback), from the rewrite.<mode>.completion_tokens / files counters.
+    """
+    averages = {}
+    for name, files in counters.items():
+        if name.startswith("rewrite.") and name.endswith(".files") and files:
+            mode = name[len("rewrite."):-len(".files")]
+            averages[mode] = counters.get(f"rewrite.{mode}.completion_tokens", 0) / files
+    return averages
+
+
+# Shared registry for the current process
+run_metrics = RunMetrics()
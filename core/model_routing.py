@@ -0,0 +1,65 @@
+"""
+Complexity-Based Model Routing
+
+Chooses a deployment tier per request from the local complexity score of the SQL input.
+Simple inputs go to a small, fast deployment and complex ones to the strong model. A
+request that fails on the fast tier is escalated to the strong tier.
+
+Configured with `LLM_ROUTING` in the config, for example:
+
+    "LLM_ROUTING": {"fast_tier": "fast", "strong_tier": "strong", "max_fast_score": 6, "max_fast_tokens": 1500}
+
+Deployments are assigned to tiers with the `tier` field of `AOPAI_DEPLOYMENTS`. Without
+`LLM_ROUTING`, requests are not routed and may use any deployment.
+"""
+
+from core.metrics import run_metrics
+from utils.sql_complexity import score_sql
+
+
+class RoutingPolicy:
+    """
+    Maps a complexity score to a deployment tier.
+    """
+
+    def __init__(self, fast_tier: str = "fast", strong_tier: str = "strong", max_fast_score: float = 6.0,
+                 max_fast_tokens: int = 1500, escalate_on_failure: bool = True):
+        """
+        :param max_fast_score: Highest complexity score routed to the fast tier
+        :param max_fast_tokens: Inputs with more significant tokens always go to the strong tier
+        :param escalate_on_failure: Retry failed fast-tier requests on the strong tier
+        """
+        self.fast_tier = fast_tier
+        self.strong_tier = strong_tier
+        self.max_fast_score = float(max_fast_score)
+        self.max_fast_tokens = int(max_fast_tokens)
+        self.escalate_on_failure = escalate_on_failure
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Builds the policy from `LLM_ROUTING`; returns None when routing is not configured.
+        """
+        settings = config.get("LLM_ROUTING")
+        if not settings:
+            return None
+        return cls(
+            fast_tier=settings.get("fast_tier", "fast"),
+            strong_tier=settings.get("strong_tier", "strong"),
+            max_fast_score=settings.get("max_fast_score", 6.0),
+            max_fast_tokens=settings.get("max_fast_tokens", 1500),
+            escalate_on_failure=settings.get("escalate_on_failure", True),
+        )
+
+    def choose(self, sql_code: str) -> str:
+        """
+        Scores `sql_code` and returns the tier to send it to.
+        """
+        complexity = score_sql(sql_code)
+        simple = complexity.score <= self.max_fast_score and complexity.tokens <= self.max_fast_tokens
+        tier = self.fast_tier if simple else self.strong_tier
+        run_metrics.increment(f"route.{tier}")
+        return tier
+
+    def can_escalate(self, tier: str) -> bool:
+        return self.escalate_on_failure and tier == self.fast_tier
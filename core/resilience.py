@@ -0,0 +1,198 @@
+"""
+Resilience Primitives for LLM Calls
+
+Exponential backoff with jitter, latency percentile tracking (used to decide when to
+hedge a slow request), and a circuit breaker shared by every worker that talks to
+the same endpoint.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+
+# HTTP status codes worth retrying: throttling and transient server-side failures
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised when a call is rejected because the endpoint's circuit breaker is open.
+    """
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Returns True for transport errors, timeouts and retryable HTTP status codes.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (httpx.TransportError, httpx.TimeoutException))
+
+
+def retry_after_seconds(error: Exception, cap: float = None):
+    """
+    Extracts a Retry-After hint (in seconds) from a throttled response, if present.
+
+    :param cap: Upper bound for the hint, so one header can't stall a worker for minutes
+    """
+    if not isinstance(error, httpx.HTTPStatusError):
+        return None
+    seconds = None
+    value = error.response.headers.get("retry-after-ms")
+    if value:
+        try:
+            seconds = float(value) / 1000.0
+        except ValueError:
+            pass
+    value = error.response.headers.get("retry-after")
+    if seconds is None and value:
+        try:
+            seconds = float(value)
+        except ValueError:
+            return None
+    if seconds is None:
+        return None
+    seconds = max(0.0, seconds)
+    return min(seconds, cap) if cap is not None else seconds
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 20.0) -> float:
+    """
+    Full-jitter exponential backoff: a random delay in [0, min(cap, base * 2^attempt)].
+
+    :param attempt: Zero-based retry attempt number
+    :param base: Base delay in seconds
+    :param cap: Maximum delay in seconds
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class LatencyTracker:
+    """
+    Keeps a sliding window of successful call latencies and reports percentiles.
+    """
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, pct: float):
+        """
+        Returns the `pct` percentile (0-100) of recorded latencies, or None if empty.
+        """
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+        return ordered[index]
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive failures; open -> half-open
+    after `reset_timeout` seconds, letting a single probe call through. A successful
+    probe closes the circuit, a failed one re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """
+        Returns True if a call may proceed right now.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # Half-open: only one probe at a time
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """
+        Gives up a call that ended without an outcome (e.g. a cancelled hedge), counting it
+        as neither success nor failure, so a half-open circuit can send another probe.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> bool:
+        """
+        Registers a failed call. Returns True if this failure opened the circuit.
+        """
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                was_open = self.state == self.OPEN
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                return not was_open
+            return False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(key: str, failure_threshold: int = 5, reset_timeout: float = 30.0) -> CircuitBreaker:
+    """
+    Returns the process-wide breaker for `key` (typically the endpoint URL), so all
+    concurrent clients of the same endpoint share one failure view.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(failure_threshold, reset_timeout)
+            _breakers[key] = breaker
+        return breaker
+
+
+_latency_trackers = {}
+
+
+def get_latency_tracker(key: str) -> LatencyTracker:
+    """
+    Returns the process-wide latency tracker for `key`.
+    """
+    with _breakers_lock:
+        tracker = _latency_trackers.get(key)
+        if tracker is None:
+            tracker = LatencyTracker()
+            _latency_trackers[key] = tracker
+        return tracker
@@ -1,11 +1,124 @@
-
 from abc import ABC, abstractmethod
+from core.metrics import run_metrics
+from utils.findings import FINDINGS_SCHEMA, number_lines, parse_findings, remap_findings
+from utils.prompt_manager import PromptManager
+from utils.sanitizer import clean_output
+from utils.sql_minifier import minify_sql, remap_line_references
+from utils.sql_patch import request_rewrite
+from utils.token_utils import estimate_tokens
 
 class SQLTask(ABC):
     """
     Abstract base class for all GenAI SQL tools.
     """
 
+    # Prompt key in prompts/index.yaml and sampling temperature used by run()
+    prompt_key = None
+    temperature = 0.3
+
+    # Report-style tasks only need to understand the SQL, not reproduce it, so their prompts
+    # may carry a minified copy; `minify` turns that on (--minify)
+    minifiable = False
+    minify = False
+    _line_map = None
+
+    # Structured mode (--structured): tasks with a findings prompt answer with a JSON list of
+    # findings instead of prose, capped at `max_output_tokens`
+    structured_prompt_key = None
+    structured = False
+    max_output_tokens = 800
+    last_findings = None
+
+    # Patch mode (--patch): file-rewriting tasks with a patch prompt get unified-diff hunks
+    # instead of the whole file back, falling back to a full-text call when they don't apply
+    patch_prompt_key = None
+    patch = False
+
+    def prompt_sql(self, sql_query: str) -> str:
+        """
+        Returns the SQL to render into the prompt: minified when enabled for this task.
+        The line map is kept so postprocess can restore original line numbers.
+        """
+        self._line_map = None
+        if not (self.minify and self.minifiable):
+            return sql_query
+
+        minified = minify_sql(sql_query)
+        self._line_map = minified.line_map
+        run_metrics.increment("prompt.minified_inputs")
+        run_metrics.increment("prompt.tokens_saved", max(0, estimate_tokens(sql_query) - estimate_tokens(minified.text)))
+        return minified.text
+
+    def prepare_client(self, sql_query: str):
+        """
+        Per-request client setup: picks the deployment tier for this input by its complexity
+        (when LLM_ROUTING is set) and attributes token usage to this task.
+        """
+        client = getattr(self, "client", None)
+        if client is not None and hasattr(client, "route"):
+            client.usage_label = type(self).__name__
+            client.route(sql_query)
+
+    def prompt_inputs(self, sql_query: str) -> dict:
+        """
+        Values rendered into the task prompt.
+        """
+        return {"sql_query": self.prompt_sql(sql_query)}
+
+    def build_prompt(self, sql_query: str) -> str:
+        """
+        Renders the task prompt for the given SQL query.
+        """
+        self.prepare_client(sql_query)
+        return PromptManager.load_prompt(self.prompt_key, **self.prompt_inputs(sql_query))
+
+    def build_patch_prompt(self, sql_query: str) -> str:
+        """
+        Renders the patch prompt: the same inputs, with the SQL line-numbered.
+        """
+        self.prepare_client(sql_query)
+        inputs = dict(self.prompt_inputs(sql_query), sql_query=number_lines(sql_query))
+        return PromptManager.load_prompt(self.patch_prompt_key, **inputs)
+
+    async def rewrite(self, sql_query: str) -> str:
+        """
+        Gets the rewritten file from the model: as a patch in patch mode, otherwise (or when
+        the patch doesn't apply) as full text. Output tokens and wall time are recorded per file.
+        """
+        async def full_text():
+            prompt = self.build_prompt(sql_query)
+            return self.postprocess(await self.client.get_completion(prompt, temperature=self.temperature))
+
+        patch_prompt = self.build_patch_prompt(sql_query) if self.patch and self.patch_prompt_key else None
+        return await request_rewrite(
+            self.client, sql_query, full_text, patch_prompt, self.temperature, getattr(self, "logger", None)
+        )
+
+    def postprocess(self, result: str) -> str:
+        """
+        Turns the raw LLM response into the task output.
+        """
+        cleaned = clean_output(result)
+        if self._line_map:
+            cleaned = remap_line_references(cleaned, self._line_map)
+        return cleaned
+
+    async def run_structured(self, sql_query: str) -> list:
+        """
+        Runs the findings prompt and returns Finding tuples with original line numbers.
+        Sets `last_findings`.
+        """
+        self.prepare_client(sql_query)
+        prompt = PromptManager.load_prompt(self.structured_prompt_key, sql_query=number_lines(self.prompt_sql(sql_query)))
+        data = await self.client.get_structured_completion(
+            prompt, FINDINGS_SCHEMA, "sql_findings", temperature=self.temperature, max_tokens=self.max_output_tokens
+        )
+        findings = parse_findings(data)
+        if self._line_map:
+            findings = remap_findings(findings, self._line_map)
+        self.last_findings = findings
+        return findings
+
     @abstractmethod
     async def run(self, sql_query: str) -> str:
         """
@@ -0,0 +1,115 @@
+"""
+Bounded Conversation Memory for SQL Learning Mode
+
+Keeps recent chat turns verbatim within a token budget and folds older turns into a
+rolling summary in the background, so per-turn prompt size stays flat over long sessions.
+"""
+
+import asyncio
+
+from core.logger import get_logger
+from utils.token_utils import estimate_message_tokens
+
+
+class ConversationMemory:
+    """
+    Token-bounded multi-turn context with rolling summarization.
+
+    :param summarize: Async callable taking text and returning a short summary
+    :param max_tokens: Token budget for the summary plus verbatim history (excluding
+                       the system prompt and the new user message)
+    """
+
+    def __init__(self, summarize, max_tokens: int = 1500):
+        self.summarize = summarize
+        self.max_tokens = max_tokens
+        self.summary = ""
+        self.turns = []  # Turns not yet folded into the summary: [{"user": ..., "assistant": ...}]
+        self._compaction = None
+
+    @staticmethod
+    def _turn_messages(turn) -> list:
+        return [
+            {"role": "user", "content": turn["user"]},
+            {"role": "assistant", "content": turn["assistant"]},
+        ]
+
+    def _turn_tokens(self, turn) -> int:
+        return estimate_message_tokens(self._turn_messages(turn))
+
+    def _summary_messages(self) -> list:
+        if not self.summary:
+            return []
+        return [{"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"}]
+
+    def _history_budget(self) -> int:
+        return max(0, self.max_tokens - estimate_message_tokens(self._summary_messages()))
+
+    def _recent_turns(self) -> list:
+        """
+        Newest turns that fit in the budget, oldest first.
+        """
+        budget = self._history_budget()
+        selected = []
+        for turn in reversed(self.turns):
+            cost = self._turn_tokens(turn)
+            if cost > budget:
+                break
+            budget -= cost
+            selected.append(turn)
+        return list(reversed(selected))
+
+    def build_messages(self, system_prompt: str, user_query: str) -> list:
+        """
+        Assembles the chat messages for the next request.
+        """
+        messages = [{"role": "system", "content": system_prompt}]
+        messages.extend(self._summary_messages())
+        for turn in self._recent_turns():
+            messages.extend(self._turn_messages(turn))
+        messages.append({"role": "user", "content": user_query})
+        return messages
+
+    def add_turn(self, user_query: str, response: str):
+        """
+        Records a completed turn and, if the verbatim history no longer fits the budget,
+        starts folding the oldest turns into the summary in the background.
+        """
+        self.turns.append({"user": user_query, "assistant": response})
+
+        if len(self._recent_turns()) < len(self.turns) and not self.is_compacting():
+            self._compaction = asyncio.ensure_future(self._compact())
+
+    def is_compacting(self) -> bool:
+        return self._compaction is not None and not self._compaction.done()
+
+    async def _compact(self):
+        # Fold everything older than what currently fits, plus one extra turn of slack
+        keep = max(0, len(self._recent_turns()) - 1)
+        cut = len(self.turns) - keep
+        folded = self.turns[:cut]
+        if not folded:
+            return
+
+        transcript = "\n".join(f"User: {t['user']}\nAgent: {t['assistant']}" for t in folded)
+        content = f"{self.summary}\n{transcript}" if self.summary else transcript
+        try:
+            summary = (await self.summarize(content)).strip()
+        except Exception as e:
+            get_logger("learn_mode").error(f"Conversation summarization failed: {e}")
+            return
+
+        # Turns added while the summary was being generated are kept after the cut
+        self.summary = summary
+        self.turns = self.turns[cut:]
+
+    async def close(self):
+        """
+        Cancels any in-flight background summarization.
+        """
+        if self.is_compacting():
+            self._compaction.cancel()
+            try:
+                await self._compaction
+            except asyncio.CancelledError:
+                pass
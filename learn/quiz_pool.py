@@ -0,0 +1,128 @@
+"""
+Quiz Question Pool for SQL Learning Mode
+
+Safe parsing of LLM-generated quiz questions and a local, de-duplicated question pool
+that is persisted between sessions, so questions can be served without waiting on the LLM.
+"""
+
+import ast
+import json
+import os
+import random
+import re
+
+DEFAULT_POOL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "quiz_pool.json")
+REQUIRED_KEYS = ("question", "options", "answer", "concept")
+
+
+def normalize_concept(concept: str) -> str:
+    return " ".join(str(concept).split()).upper()
+
+
+def parse_quiz_response(raw: str) -> dict:
+    """
+    Parses a quiz question returned by the LLM without evaluating it as code.
+
+    Accepts JSON or a Python-style dict literal, optionally wrapped in markdown fences
+    or surrounded by prose.
+
+    :param raw: LLM response text
+    :return: Dict with question, options, answer (single lowercase letter) and concept
+    :raises ValueError: If no valid quiz question can be extracted
+    """
+    match = re.search(r"\{.*\}", raw or "", re.DOTALL)
+    if not match:
+        raise ValueError("No quiz object found in response")
+    text = match.group(0)
+
+    try:
+        quiz = json.loads(text)
+    except json.JSONDecodeError:
+        try:
+            quiz = ast.literal_eval(text)
+        except (ValueError, SyntaxError) as e:
+            raise ValueError(f"Unparseable quiz object: {e}")
+
+    if not isinstance(quiz, dict) or any(key not in quiz for key in REQUIRED_KEYS):
+        raise ValueError(f"Quiz object must contain {REQUIRED_KEYS}")
+    if not isinstance(quiz["options"], list) or len(quiz["options"]) < 2:
+        raise ValueError("Quiz options must be a list of at least two choices")
+
+    answer = str(quiz["answer"]).strip().lower()[:1]
+    if not answer.isalpha():
+        raise ValueError(f"Invalid quiz answer: {quiz['answer']!r}")
+
+    return {
+        "question": str(quiz["question"]).strip(),
+        "options": [str(option).strip() for option in quiz["options"]],
+        "answer": answer,
+        "concept": str(quiz["concept"]).strip(),
+    }
+
+
+class QuizQuestionPool:
+    """
+    Local question pool, de-duplicated by question text, persisted as JSON.
+    """
+
+    def __init__(self, path: str = DEFAULT_POOL_PATH, max_size: int = 500):
+        self.path = path
+        self.max_size = max_size
+        self.questions = []
+        self._seen = set()
+        self._dirty = False
+        self.load()
+
+    @staticmethod
+    def _key(question: dict) -> str:
+        return " ".join(question["question"].lower().split())
+
+    def load(self):
+        if not self.path or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        for question in stored.get("questions", []):
+            try:
+                self.add(parse_quiz_response(json.dumps(question)))
+            except ValueError:
+                continue
+        self._dirty = False
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "questions": self.questions}, f, indent=2)
+        self._dirty = False
+
+    def add(self, question: dict) -> bool:
+        """
+        Adds a question unless an identical one is already pooled.
+
+        :return: True if the question was added
+        """
+        key = self._key(question)
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        self.questions.append(question)
+        if len(self.questions) > self.max_size:
+            dropped = self.questions.pop(0)
+            self._seen.discard(self._key(dropped))
+        self._dirty = True
+        return True
+
+    def pick(self, excluded_concepts) -> dict:
+        """
+        Returns a random pooled question whose concept is not in `excluded_concepts`
+        (normalized), or None.
+        """
+        candidates = [q for q in self.questions if normalize_concept(q["concept"]) not in excluded_concepts]
+        return random.choice(candidates) if candidates else None
+
+    def __len__(self):
+        return len(self.questions)
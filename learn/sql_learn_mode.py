@@ -14,22 +14,50 @@
 
 import sys
 import os
-import logging
 import asyncio
 
 # Add the parent directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from core.base_ai_client import BaseAIClient
+from core.logger import get_logger
+from core.resilience import backoff_delay
+from learn.conversation_memory import ConversationMemory
+from learn.quiz_pool import QuizQuestionPool, normalize_concept, parse_quiz_response
 from utils.prompt_manager import PromptManager  # Assuming this manages prompts
 
-# Logging setup
-LOG_FILE = "learn_mode.log"
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+# Logging setup (queued, structured, written off the event loop)
+logger = get_logger("learn_mode")
+
+# Token budget for conversation memory (rolling summary + recent turns)
+CHAT_CONTEXT_TOKENS = 1500
+
+# Number of quiz questions generated ahead of the user
+QUIZ_PREFETCH = 3
+# Seconds to wait for a question before giving up on this round
+QUIZ_WAIT_TIMEOUT = 90
+
+# Predefined fallback questions, used when the LLM cannot produce one
+FALLBACK_QUIZ_QUESTIONS = [
+    {
+        "question": "What does the SQL SELECT statement do?",
+        "options": ["a) Inserts data", "b) Deletes data", "c) Retrieves data", "d) Updates data"],
+        "answer": "c",
+        "concept": "SELECT"
+    },
+    {
+        "question": "Which SQL clause is used to filter records?",
+        "options": ["a) WHERE", "b) GROUP BY", "c) HAVING", "d) ORDER BY"],
+        "answer": "a",
+        "concept": "WHERE"
+    },
+    {
+        "question": "What is the purpose of the SQL JOIN clause?",
+        "options": ["a) Combine rows from multiple tables", "b) Create a new table", "c) Filter data", "d) Update data"],
+        "answer": "a",
+        "concept": "JOIN"
+    },
+]
 
 class SQLLearnMode:
     """
@@ -41,117 +69,139 @@ class SQLLearnMode:
         # Initialize the AI client and prompt manager
         self.ai_client = BaseAIClient()  # Replace with actual key
         self.prompt_manager = PromptManager()
-        self.conversation_history = []
+        self.memory = ConversationMemory(self._summarize, max_tokens=CHAT_CONTEXT_TOKENS)
+        self.quiz_pool = QuizQuestionPool()  # Persisted across sessions
 
-    def log_event(self, message):
-        """Log user interactions and system events."""
-        logging.info(message)
+    def log_event(self, message, payload=None):
+        """Log user interactions and system events. Verbose payloads are sampled."""
+        if payload is None:
+            logger.info(message)
+        else:
+            logger.info(message, extra={"payload": payload})
+
+    async def _summarize(self, content):
+        """Compress older conversation turns with the shared summarization prompt."""
+        prompt = self.prompt_manager.load_prompt("summarization.short_intro", content=content)
+        return await self.ai_client.get_completion(prompt, temperature=0.2)
 
     async def ask_agent(self, user_query, system_prompt="You are a T-SQL expert who provides detailed and accurate SQL guidance to users."):
         """
         Query the conversational agent with a dynamic system prompt and user input.
+        Earlier turns are sent along as bounded conversation memory.
         """
         try:
-            # Construct the full prompt
-            full_prompt = f"{system_prompt}\n{user_query}"
-            
+            # Construct the chat messages: system prompt, rolling summary, recent turns, new query
+            messages = self.memory.build_messages(system_prompt, user_query)
+
             # Use the BaseAIClient to get a completion
-            response = await self.ai_client.get_completion(full_prompt)
-            
+            response = await self.ai_client.get_chat_completion(messages)
+            self.memory.add_turn(user_query, response.strip())
+
             # Log and return results
-            self.log_event(f"User Query: {user_query}")
-            self.log_event(f"Agent Response: {response}")
-            
+            self.log_event("User query", payload=user_query)
+            self.log_event("Agent response", payload=response)
+
             return response.strip()
         except Exception as e:
-            logging.error(f"Error during agent interaction: {e}")
+            logger.error(f"Error during agent interaction: {e}")
             return "An error occurred while communicating with the agent. Please try again."
 
+    async def _quiz_producer(self, queue, reserved_concepts):
+        """
+        Background producer that keeps `queue` filled with unique quiz questions.
+
+        Questions come from the persisted local pool first and from the LLM otherwise.
+        A concept is reserved as soon as its question is queued, so the queue never
+        holds two questions on the same concept.
+        """
+        fallback_questions = list(FALLBACK_QUIZ_QUESTIONS)
+        failures = duplicates = 0
+
+        while True:
+            quiz = self.quiz_pool.pick(reserved_concepts)
+
+            if quiz is None:
+                try:
+                    prompt = self.prompt_manager.load_prompt(
+                        "learn.quiz_question",
+                        avoid_concepts=", ".join(sorted(reserved_concepts)) or "none"
+                    )
+                    quiz = parse_quiz_response(await self.ai_client.get_completion(prompt))
+                    failures = 0
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    failures += 1
+                    logger.error(f"Error generating question from OpenAI: {e}")
+                    quiz = next(
+                        (q for q in fallback_questions if normalize_concept(q["concept"]) not in reserved_concepts),
+                        None
+                    )
+                    if quiz is None:
+                        await asyncio.sleep(backoff_delay(failures, base=1.0, cap=30.0))
+                        continue
+                    fallback_questions.remove(quiz)
+                else:
+                    if normalize_concept(quiz["concept"]) in reserved_concepts:
+                        # Duplicate concept: discard without bothering the user, backing
+                        # off so a repetitive model doesn't burn calls in a tight loop
+                        duplicates += 1
+                        await asyncio.sleep(backoff_delay(duplicates, base=0.5, cap=30.0))
+                        continue
+                    duplicates = 0
+                    self.quiz_pool.add(quiz)
+
+            reserved_concepts.add(normalize_concept(quiz["concept"]))
+            await queue.put(quiz)
+
     async def dynamic_quiz(self):
         """
         Generate dynamic SQL quizzes using GPT.
-        Continuously generates new, unique concept-based questions until the user types 'exit'.
+        Continuously serves new, unique concept-based questions until the user types 'exit'.
+        A background producer pre-generates questions while the user is answering, so only
+        the first question may have to wait on the LLM.
         """
         print("\n📝 Starting Dynamic SQL Quiz...")
-        asked_concepts = set()  # Maintain a set to track concepts already covered
-    
-        # Predefined fallback questions
-        initial_fallback_questions = [
-            {
-                "question": "What does the SQL SELECT statement do?",
-                "options": ["a) Inserts data", "b) Deletes data", "c) Retrieves data", "d) Updates data"],
-                "answer": "c",
-                "concept": "SELECT"
-            },
-            {
-                "question": "Which SQL clause is used to filter records?",
-                "options": ["a) WHERE", "b) GROUP BY", "c) HAVING", "d) ORDER BY"],
-                "answer": "a",
-                "concept": "WHERE"
-            },
-            {
-                "question": "What is the purpose of the SQL JOIN clause?",
-                "options": ["a) Combine rows from multiple tables", "b) Create a new table", "c) Filter data", "d) Update data"],
-                "answer": "a",
-                "concept": "JOIN"
-            },
-        ]
-        fallback_questions = initial_fallback_questions.copy()
+        reserved_concepts = set()  # Concepts already asked or waiting in the queue
+        queue = asyncio.Queue(maxsize=QUIZ_PREFETCH)
+        producer = asyncio.create_task(self._quiz_producer(queue, reserved_concepts))
 
-        while True:
-            # Prompt the user for action or exit
-            exit_prompt = input("\nType 'exit' to end the quiz or press Enter to continue: ").strip().lower()
-            if exit_prompt == "exit":
-                print("Exiting the quiz mode.")
-                break
+        try:
+            while True:
+                # Prompt the user for action or exit (off the event loop, so the producer keeps running)
+                exit_prompt = (await asyncio.to_thread(input, "\nType 'exit' to end the quiz or press Enter to continue: ")).strip().lower()
+                if exit_prompt == "exit":
+                    print("Exiting the quiz mode.")
+                    break
 
-            quiz_prompt = (
-                "Generate a random SQL quiz question with four multiple-choice options. "
-                "The question must include a unique concept (e.g., SELECT, JOIN, GROUP BY, HAVING). "
-                "Provide the answer and the concept being tested in the format:\n"
-                "{'question': '...', 'options': ['a) ...', 'b) ...', 'c) ...', 'd) ...'], 'answer': 'a', 'concept': '...'}"
-            )
+                try:
+                    if queue.empty():
+                        print("Generating question...")
+                    quiz = await asyncio.wait_for(queue.get(), timeout=QUIZ_WAIT_TIMEOUT)
 
+                    # Display the question and options
+                    print(f"\n{quiz['question']}")
+                    for option in quiz['options']:
+                        print(option)
+
+                    # Get and evaluate the user's answer
+                    user_answer = (await asyncio.to_thread(input, "Your answer: ")).strip().lower()
+                    if user_answer == quiz["answer"]:
+                        print("✅ Correct!")
+                        self.log_event(f"Correct answer for question: {quiz['question']} (Concept: {quiz['concept']})")
+                    else:
+                        print(f"❌ Incorrect. The correct answer is {quiz['answer']}.")
+                        self.log_event(f"Incorrect answer for question: {quiz['question']} (Concept: {quiz['concept']})")
+                except asyncio.TimeoutError:
+                    logger.error("Timed out waiting for a quiz question")
+                    print("An error occurred while generating the quiz. Please try again.")
+        finally:
+            producer.cancel()
             try:
-                # Generate a new unique quiz question
-                while True:
-                    try:
-                        # Attempt to generate a question using the OpenAI API
-                        quiz_data = await self.ai_client.get_completion(quiz_prompt)
-                        quiz = eval(quiz_data)  # Convert the response to a dictionary (ensure trusted input)
-                    except Exception as e:
-                        logging.error(f"Error generating question from OpenAI: {e}")
-                        print("Error generating question from OpenAI. Using fallback.")
-
-                        # Use fallback questions
-                        if fallback_questions:
-                            quiz = fallback_questions.pop(0)
-                        else:
-                            print("No more fallback questions available. Restarting fallback questions...")
-                            fallback_questions = initial_fallback_questions.copy()
-                            quiz = fallback_questions.pop(0)
-
-                    # Check if the concept is unique
-                    if quiz['concept'] not in asked_concepts:
-                        asked_concepts.add(quiz['concept'])
-                        break  # Exit the loop if the concept is unique
-
-                # Display the question and options
-                print(f"\n{quiz['question']}")
-                for option in quiz['options']:
-                    print(option)
-
-                # Get and evaluate the user's answer
-                user_answer = input("Your answer: ").strip().lower()
-                if user_answer == quiz["answer"]:
-                    print("✅ Correct!")
-                    self.log_event(f"Correct answer for question: {quiz['question']} (Concept: {quiz['concept']})")
-                else:
-                    print(f"❌ Incorrect. The correct answer is {quiz['answer']}.")
-                    self.log_event(f"Incorrect answer for question: {quiz['question']} (Concept: {quiz['concept']})")
-            except Exception as e:
-                logging.error(f"Error during quiz generation: {e}")
-                print("An error occurred while generating the quiz. Please try again.")
+                await producer
+            except asyncio.CancelledError:
+                pass
+            self.quiz_pool.save()
 
     async def practice_sql(self):
         """
@@ -174,7 +224,8 @@ class SQLLearnMode:
         print("\n🤖 Chat with the SQL Agent")
         print("Ask any SQL-related question. Type 'exit' to quit.")
         while True:
-            user_input = input("You: ").strip()
+            # Read input off the event loop so background summarization keeps running
+            user_input = (await asyncio.to_thread(input, "You: ")).strip()
             if user_input.lower() == "exit":
                 print("Exiting chat mode.")
                 break
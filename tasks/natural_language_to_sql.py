@@ -2,25 +2,44 @@
 Natural Language to SQL Conversion Tool (Async)
 
 Converts natural language queries into valid SQL queries.
+
+With `candidates > 1`, several candidates are requested concurrently and each one is
+checked as soon as it arrives: against the schema with the local validator and, for
+SQLite/generic SQL, by compiling and running it on an empty in-memory SQLite database
+built from the schema. The first candidate that passes is returned. Only if all fail is
+one more round requested, with the errors fed back.
 """
 
+import asyncio
 import json
 import os
+import sqlite3
 import sys
 from core.base_ai_client import BaseAIClient
+from core.metrics import run_metrics
 from core.sql_task_base import SQLTask
 from core.logger import get_logger
 from utils.prompt_manager import PromptManager
 from utils.sanitizer import clean_output
+from utils.schema_index import SchemaIndex
+from utils.sql_local_validator import ERROR, LocalSQLValidator, format_issues
+from utils.sqlite_benchmark import check_sql
+from utils.synthetic_data import SyntheticDataGenerator
 
 # Add the project root directory to the Python path
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, project_root)
 
 
+# Dialects whose queries can be compiled by SQLite
+SQLITE_DIALECTS = {"generic", "sqlite", "sqlite3"}
+CANDIDATE_TEMPERATURE = 0.7
+
+
 class NaturalLanguageToSQL(SQLTask):
     def __init__(self, schema_file: str = "schema.json"):
         self.client = BaseAIClient()
+        self.client.usage_label = type(self).__name__  # Token usage and prompt-cache hits per task
         self.logger = get_logger("natural_language_to_sql")
         self.schema_file = schema_file
         self.schema = self._load_schema()
@@ -36,15 +55,21 @@ class NaturalLanguageToSQL(SQLTask):
             self.logger.error(f"Failed to load schema file: {e}")
             raise RuntimeError(f"Schema file loading error: {e}")
 
-    async def run(self, nl_query: str, sql_dialect: str = "generic") -> str:
+    async def run(self, nl_query: str, sql_dialect: str = "generic", candidates: int = 1) -> str:
         """
         Converts natural language queries into SQL using the predefined schema.
 
         :param nl_query: Natural language query string.
         :param sql_dialect: SQL dialect (e.g., MySQL, PostgreSQL, SQLite).
+        :param candidates: Concurrent candidates to request and check; 1 returns the single response as-is.
         :return: Generated SQL query.
         """
         try:
+            # Writing SQL against the whole schema is not a task for the fast tier
+            self.client.route_strong()
+            if candidates > 1:
+                return await self._run_candidates(nl_query, sql_dialect, candidates)
+
             self.logger.info("Converting natural language query to SQL...")
 
             # Load the prompt
@@ -62,3 +87,78 @@ class NaturalLanguageToSQL(SQLTask):
         except Exception as e:
             self.logger.error(f"Natural Language to SQL conversion failed: {e}")
             raise RuntimeError(f"NaturalLanguageToSQL error: {e}")
+
+    async def _run_candidates(self, nl_query: str, sql_dialect: str, candidates: int) -> str:
+        self.logger.info(f"Converting natural language query to SQL ({candidates} candidates)...")
+        schema = json.dumps(self.schema)
+        validator = LocalSQLValidator(SchemaIndex(self.schema))
+        conn = None
+        if sql_dialect.lower() in SQLITE_DIALECTS:
+            conn = sqlite3.connect(":memory:", isolation_level=None)
+            SyntheticDataGenerator(self.schema).create_schema(conn)
+
+        def check(candidate: str):
+            errors = [issue for issue in validator.validate(candidate) if issue.severity == ERROR]
+            if errors:
+                return format_issues(errors)
+            return check_sql(conn, candidate) if conn is not None else None
+
+        try:
+            prompt = PromptManager.load_prompt("nl_to_sql.convert", nl_query=nl_query, sql_dialect=sql_dialect, schema=schema)
+            sql, failures = await self._first_passing(prompt, candidates, check)
+            if sql is not None:
+                return sql
+
+            # All candidates failed: one more round with the errors fed back
+            run_metrics.increment("nl_to_sql.retries")
+            self.client.escalate()  # The feedback round goes to the strong tier
+            self.logger.info(f"All {candidates} candidates failed; retrying with compiler feedback.")
+            attempts = "\n\n".join(
+                f"Attempt {number}:\n{candidate or '(no response)'}\nError: {error}"
+                for number, (candidate, error) in enumerate(failures, 1)
+            )
+            prompt = PromptManager.load_prompt(
+                "nl_to_sql.fix", nl_query=nl_query, sql_dialect=sql_dialect, schema=schema, failed_attempts=attempts
+            )
+            sql, retry_failures = await self._first_passing(prompt, candidates, check)
+            if sql is not None:
+                return sql
+
+            candidate, error = next(((c, e) for c, e in retry_failures + failures if c), (None, None))
+            if candidate is None:
+                raise RuntimeError(f"No candidate was generated: {error or retry_failures[-1][1]}")
+            self.logger.warning("No candidate compiled; returning the first unverified candidate.")
+            comment = "\n".join(f"-- {line}" for line in f"Warning: query did not compile: {error}".splitlines())
+            return f"{comment}\n{candidate}"
+        finally:
+            if conn is not None:
+                conn.close()
+
+    async def _first_passing(self, prompt: str, candidates: int, check):
+        """
+        Requests candidates concurrently and checks each as it arrives.
+
+        :return: (first passing SQL or None, [(candidate, error), ...] for failed ones)
+        """
+        requests = [
+            asyncio.ensure_future(self.client.get_completion(prompt, temperature=CANDIDATE_TEMPERATURE))
+            for _ in range(candidates)
+        ]
+        run_metrics.increment("nl_to_sql.candidates", candidates)
+        failures = []
+        try:
+            for completed in asyncio.as_completed(requests):
+                try:
+                    candidate = clean_output(await completed).strip()
+                except Exception as e:
+                    failures.append((None, str(e)))
+                    continue
+                error = check(candidate)
+                if error is None:
+                    return candidate, failures
+                failures.append((candidate, error))
+            return None, failures
+        finally:
+            # The first passing candidate wins; don't wait for the others
+            for request in requests:
+                request.cancel()
@@ -7,10 +7,15 @@ Analyzes SQL queries for optimization opportunities, formatting issues, and best
 from core.base_ai_client import BaseAIClient
 from core.sql_task_base import SQLTask
 from core.logger import get_logger
-from utils.prompt_manager import PromptManager
-from utils.sanitizer import clean_output
+from utils.findings import format_findings
 
 class SQLAnalyzer(SQLTask):
+    prompt_key = "analyzer.performance_analysis"
+    structured_prompt_key = "analyzer.findings"
+    temperature = 0.2
+    minifiable = True
+    max_output_tokens = 700
+
     def __init__(self):
         self.client = BaseAIClient()
         self.logger = get_logger("sql_analyzer")
@@ -25,17 +30,19 @@ class SQLAnalyzer(SQLTask):
         try:
             self.logger.info("Analyzing SQL query...")
 
-            # Use PromptManager to load the prompt
-            prompt = PromptManager.load_prompt(
-                "analyzer.performance_analysis",
-                sql_query=sql_query
-            )
+            if self.structured:
+                findings = await self.run_structured(sql_query)
+                self.logger.info(f"SQL analysis completed: {len(findings)} finding(s).")
+                return format_findings(findings)
+
+            # Render the prompt
+            prompt = self.build_prompt(sql_query)
 
             # Send the prompt to the AI model
-            result = await self.client.get_completion(prompt, temperature=0.2)
+            result = await self.client.get_completion(prompt, temperature=self.temperature)
             self.logger.info("SQL analysis completed successfully.")
 
-            return clean_output(result)
+            return self.postprocess(result)
 
         except Exception as e:
             self.logger.error(f"SQL analysis failed: {e}")
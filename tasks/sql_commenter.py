@@ -9,10 +9,13 @@ from core.sql_task_base import SQLTask
 from core.logger import get_logger
 from datetime import datetime
 import getpass
-from utils.prompt_manager import PromptManager
 from utils.sanitizer import clean_output
 
 class SQLCommenter(SQLTask):
+    prompt_key = "commenter.add_comments"
+    patch_prompt_key = "commenter.add_comments_patch"
+    temperature = 0.2
+
     def __init__(self):
         self.client = BaseAIClient()
         self.logger = get_logger("sql_commenter")
@@ -30,26 +33,26 @@ class SQLCommenter(SQLTask):
         try:
             self.logger.info("Generating SQL comments...")
 
-            # Use PromptManager to load the prompt
-            prompt = PromptManager.load_prompt(
-                "commenter.add_comments",
-                sql_query=sql_query,
-                user=self.user,
-                timestamp=self.timestamp
-            )
-
-            # Send the prompt to the AI model
-            result = await self.client.get_completion(prompt, temperature=0.2)
-            cleaned = self._sanitize_output(result)
+            # Render the prompt and send it to the AI model (as a patch request with --patch)
+            result = await self.rewrite(sql_query)
 
             self.logger.info("SQL commenting completed.")
 
-            return clean_output(cleaned)
+            return result
 
         except Exception as e:
             self.logger.error(f"SQL commenting failed: {e}")
             raise RuntimeError(f"SQLCommenter error: {e}")
 
+    def prompt_inputs(self, sql_query: str) -> dict:
+        """
+        The commenter prompt also takes the author and timestamp header values.
+        """
+        return {"sql_query": sql_query, "user": self.user, "timestamp": self.timestamp}
+
+    def postprocess(self, result: str) -> str:
+        return clean_output(self._sanitize_output(result))
+
     def _sanitize_output(self, output: str) -> str:
         """
         Removes markdown fences and trailing explanation sections.
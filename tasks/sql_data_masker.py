@@ -1,75 +1,164 @@
-from utils.prompt_manager import PromptManager
-from core.base_ai_client import AIClient
+import re
+
+from utils.pii_catalog import PIICatalog
+from utils.sql_lexer import (
+    COMMENT, NAME, NUMBER, OPERATOR, PUNCT, QUOTED_NAME, STRING, WHITESPACE, identifier_name, is_keyword, tokenize
+)
+
+# Literal patterns, in priority order (an SSN is not also reported as a phone number)
+SENSITIVE_PATTERNS = re.compile(
+    r"""
+    (?P<email>[\w.%+-]+@[\w-]+(?:\.[\w-]+)+)
+  | (?P<ssn>\b\d{3}-\d{2}-\d{4}\b)
+  | (?P<credit_card>\b\d(?:[ -]?\d){12,18}\b)
+  | (?P<phone>(?:\+\d{1,3}[-.\s]?)?\(?\b\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}\b)
+    """,
+    re.VERBOSE,
+)
+
+COMPARISON_OPERATORS = {"=", "<>", "!=", "<", ">", "<=", ">="}
+
+
+def mask_label(kind: str) -> str:
+    return f"[masked-{kind.replace('_', '-')}]"
+
+
+def _luhn_valid(number: str) -> bool:
+    digits = [int(d) for d in number if d.isdigit()]
+    checksum = 0
+    for i, digit in enumerate(reversed(digits)):
+        if i % 2:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        checksum += digit
+    return checksum % 10 == 0
+
 
 class SQLDataMasker:
     """
-    A class for masking sensitive data in SQL queries using AI-driven prompts.
+    Masks and detects sensitive data in SQL queries locally, without LLM calls:
+
+    - literals that look like emails, phone numbers, credit card numbers or SSNs
+    - any literal compared with (=, <>, LIKE, IN, ...) a column that the PII catalog of the
+      schema classifies as sensitive, e.g. `LastName = 'Smith'` -> `LastName = '[masked-name]'`
     """
 
-    def __init__(self, ai_client: AIClient, prompt_manager: PromptManager):
+    def __init__(self, catalog: PIICatalog = None):
         """
-        Initializes the SQLDataMasker with AI client and prompt manager.
+        :param catalog: PII column catalog (see utils.pii_catalog); patterns only without it
         """
-        self.ai_client = ai_client
-        self.prompt_manager = prompt_manager
+        self.catalog = catalog
 
-    async def mask_sensitive_data(self, sql_query: str) -> str:
+    def mask_sensitive_data(self, sql_query: str) -> str:
         """
-        Masks sensitive data in the given SQL query using AI.
+        Masks sensitive data in the given SQL query.
 
         :param sql_query: The SQL query string to be masked.
         :return: The SQL query with sensitive data masked.
         """
-        # Load the appropriate prompt for masking sensitive data
-        prompt = self.prompt_manager.load_prompt("data_masker.mask_sensitive_data", sql_query=sql_query)
+        masked, _ = self._scan(sql_query)
+        return masked
 
-        # Send the prompt to the AI client
-        response = await self.ai_client.generate(prompt)
-
-        return response.strip()
-
-    async def detect_sensitive_data(self, sql_query: str) -> str:
+    def detect_sensitive_data(self, sql_query: str) -> list:
         """
-        Detects sensitive data in the given SQL query using AI.
+        Detects sensitive data in the given SQL query.
 
         :param sql_query: The SQL query string to be analyzed.
-        :return: A description of detected sensitive data.
+        :return: List of (kind, value), e.g. ("email", "user@example.com")
         """
-        # Load the appropriate prompt for detecting sensitive data
-        prompt = self.prompt_manager.load_prompt("data_masker.detect_sensitive_data", sql_query=sql_query)
-
-        # Send the prompt to the AI client
-        response = await self.ai_client.generate(prompt)
-
-        return response.strip()
-
-
-# Example usage
-if __name__ == "__main__":
-    import asyncio
-    ai_client = AIClient()
-    prompt_manager = PromptManager("prompts/index.yaml")
-
-    masker = SQLDataMasker(ai_client, prompt_manager)
-
-    sample_query = """
-        SELECT * FROM users
-        WHERE email = 'user@example.com'
-        AND phone = '+1-800-555-1234'
-        AND credit_card = '4111 1111 1111 1111'
-        AND ssn = '123-45-6789';
+        _, detected = self._scan(sql_query)
+        return detected
+
+    def _scan(self, sql_query: str):
+        tokens = tokenize(sql_query)
+        columns = self._compared_columns(tokens) if self.catalog else {}
+        detected = []
+        parts = []
+        for position, token in enumerate(tokens):
+            if token.kind not in (STRING, NUMBER):
+                parts.append(token.value)
+                continue
+
+            category = self.catalog.category(columns[position]) if position in columns else None
+            if category:
+                value = _literal_value(token)
+                detected.append((category, value))
+                parts.append(f"'{mask_label(category)}'" if token.kind == NUMBER else _replace_literal(token, mask_label(category)))
+            elif token.kind == STRING:
+                parts.append(_mask_patterns(token.value, detected))
+            else:
+                parts.append(token.value)
+        return "".join(parts), detected
+
+    @staticmethod
+    def _compared_columns(tokens) -> dict:
+        """
+        Maps the position of each literal compared with a column to the column name:
+        `col = 'x'`, `'x' = col`, `col LIKE 'x%'` and `col [NOT] IN ('x', 'y')`.
+        """
+        indexed = [(position, token) for position, token in enumerate(tokens) if token.kind not in (WHITESPACE, COMMENT)]
+        kinds = [token for _, token in indexed]
+        columns = {}
+
+        def column_at(i):
+            if 0 <= i < len(kinds) and kinds[i].kind in (NAME, QUOTED_NAME):
+                return identifier_name(kinds[i])
+            return None
+
+        for i, token in enumerate(kinds):
+            if token.kind not in (STRING, NUMBER):
+                continue
+            previous = kinds[i - 1] if i > 0 else None
+            following = kinds[i + 1] if i + 1 < len(kinds) else None
+            column = None
+            if previous is not None and ((previous.kind == OPERATOR and previous.value in COMPARISON_OPERATORS) or is_keyword(previous, "LIKE")):
+                column = column_at(i - 2)
+            if column is None and following is not None and following.kind == OPERATOR and following.value in COMPARISON_OPERATORS:
+                column = column_at(i + 2)
+            if column is None:
+                column = _in_list_column(kinds, i)
+            if column:
+                columns[indexed[i][0]] = column
+        return columns
+
+
+def _in_list_column(tokens, index: int):
     """
+    Column of `col [NOT] IN (..., literal, ...)` for the literal at `index`.
+    """
+    i = index - 1
+    while i >= 0 and (tokens[i].kind in (STRING, NUMBER) or (tokens[i].kind == PUNCT and tokens[i].value == ",")):
+        i -= 1
+    if i < 1 or not (tokens[i].kind == PUNCT and tokens[i].value == "(") or not is_keyword(tokens[i - 1], "IN"):
+        return None
+    i -= 2
+    if i >= 0 and is_keyword(tokens[i], "NOT"):
+        i -= 1
+    if i >= 0 and tokens[i].kind in (NAME, QUOTED_NAME):
+        return identifier_name(tokens[i])
+    return None
+
+
+def _literal_value(token) -> str:
+    if token.kind == NUMBER:
+        return token.value
+    return token.value[token.value.index("'") + 1:-1].replace("''", "'")
+
+
+def _replace_literal(token, replacement: str) -> str:
+    """
+    Replaces a string literal's content, keeping its prefix (N'...') and quotes.
+    """
+    return token.value[:token.value.index("'") + 1] + replacement + "'"
 
-    print("Original Query:")
-    print(sample_query)
-
-    async def run():
-        masked_query = await masker.mask_sensitive_data(sample_query)
-        print("\nMasked Query:")
-        print(masked_query)
 
-        detected_data = await masker.detect_sensitive_data(sample_query)
-        print("\nDetected Sensitive Data:")
-        print(detected_data)
+def _mask_patterns(literal: str, detected: list) -> str:
+    def replace(match):
+        kind = match.lastgroup
+        if kind == "credit_card" and not _luhn_valid(match.group()):
+            return match.group()
+        detected.append((kind, match.group()))
+        return mask_label(kind)
 
-    asyncio.run(run())
\ No newline at end of file
+    return SENSITIVE_PATTERNS.sub(replace, literal)
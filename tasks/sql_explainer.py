@@ -7,10 +7,12 @@ Provides a step-by-step explanation of SQL queries for educational and onboardin
 from core.base_ai_client import BaseAIClient
 from core.sql_task_base import SQLTask
 from core.logger import get_logger
-from utils.prompt_manager import PromptManager
-from utils.sanitizer import clean_output
 
 class SQLExplainer(SQLTask):
+    prompt_key = "explainer.step_by_step"
+    temperature = 0.3
+    minifiable = True
+
     def __init__(self):
         self.client = BaseAIClient()
         self.logger = get_logger("sql_explainer")
@@ -25,17 +27,14 @@ class SQLExplainer(SQLTask):
         try:
             self.logger.info("Explaining SQL query...")
 
-            # Use PromptManager to load the prompt
-            prompt = PromptManager.load_prompt(
-                "explainer.step_by_step",
-                sql_query=sql_query
-            )
+            # Render the prompt
+            prompt = self.build_prompt(sql_query)
 
             # Send the prompt to the AI model
-            result = await self.client.get_completion(prompt, temperature=0.3)
+            result = await self.client.get_completion(prompt, temperature=self.temperature)
             self.logger.info("SQL explanation generated successfully.")
 
-            return clean_output(result)
+            return self.postprocess(result)
 
         except Exception as e:
             self.logger.error(f"SQL explanation failed: {e}")
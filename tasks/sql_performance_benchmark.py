@@ -2,39 +2,55 @@
 SQL Performance Benchmark Tool (Async + Modular)
 
 Simulates query execution and provides performance metrics and optimization suggestions.
+With a SQLite database (`--db`), the queries are actually executed and the measured
+timings, row counts and query plans are given to the LLM instead of asking it to estimate.
 """
 
+import asyncio
+
 from core.base_ai_client import BaseAIClient
 from core.sql_task_base import SQLTask
 from core.logger import get_logger
 from utils.prompt_manager import PromptManager
-from utils.sanitizer import clean_output
+from utils.sqlite_benchmark import benchmark_script, format_benchmark_report
 
 
 class SQLPerformanceBenchmark(SQLTask):
-    def __init__(self):
+    prompt_key = "performance_benchmark.simulate"
+    temperature = 0.3
+    minifiable = True
+
+    def __init__(self, db_path: str = None, warmup: int = 1, repetitions: int = 5):
+        """
+        :param db_path: SQLite database to execute against; None simulates with the LLM only
+        :param warmup: Untimed runs before measuring
+        :param repetitions: Timed runs per statement
+        """
         self.client = BaseAIClient()
         self.logger = get_logger("sql_performance_benchmark")
+        self.db_path = db_path
+        self.warmup = warmup
+        self.repetitions = repetitions
 
     async def run(self, sql_query: str) -> str:
         """
-        Simulates query execution and provides performance metrics.
+        Simulates (or, with a database, measures) query execution and provides performance metrics.
 
         :param sql_query: SQL query string
         :return: Performance insights and optimization suggestions
         """
         try:
+            if self.db_path:
+                return await self._run_measured(sql_query)
+
             self.logger.info("Simulating SQL query execution...")
 
-            # Use PromptManager to load the prompt
-            prompt = PromptManager.load_prompt(
-                "performance_benchmark.simulate",
-                sql_query=sql_query
-            )
+            # Render the prompt
+            prompt = self.build_prompt(sql_query)
 
             # Send the prompt to the AI model
-            result = await self.client.get_completion(prompt, temperature=0.3)
-            cleaned = clean_output(result)
+            result = await self.client.get_completion(prompt, temperature=self.temperature)
+            cleaned = self.postprocess(result)
 
             self.logger.info("SQL performance benchmarking completed.")
             return cleaned
@@ -42,3 +58,19 @@ class SQLPerformanceBenchmark(SQLTask):
         except Exception as e:
             self.logger.error(f"SQL Performance Benchmarking failed: {e}")
             raise RuntimeError(f"SQLPerformanceBenchmark error: {e}")
+
+    async def _run_measured(self, sql_query: str) -> str:
+        self.logger.info(f"Benchmarking SQL against {self.db_path} ({self.warmup} warmup, {self.repetitions} runs)...")
+
+        # sqlite3 releases the GIL while executing, so a thread keeps the event loop free
+        results = await asyncio.to_thread(benchmark_script, self.db_path, sql_query, self.warmup, self.repetitions)
+        report = format_benchmark_report(results, self.warmup)
+
+        self.prepare_client(sql_query)
+        prompt = PromptManager.load_prompt(
+            "performance_benchmark.measured", sql_query=self.prompt_sql(sql_query), measurements=report
+        )
+        result = await self.client.get_completion(prompt, temperature=self.temperature)
+
+        self.logger.info("SQL performance benchmarking completed.")
+        return f"Measured Results:\n{report}\n\nOptimization Suggestions:\n{self.postprocess(result)}"
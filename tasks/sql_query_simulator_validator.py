@@ -1,6 +1,44 @@
-import sqlparse
 from typing import Tuple
 
+from core.cpu_pool import format_sql, map_cpu_bound, run_cpu_bound, validate_sql
+from utils.schema_index import load_schema_index
+from utils.sql_local_validator import LocalSQLValidator, format_issues
+
+
+def _validation_result(sql_query: str, issues) -> Tuple[bool, str]:
+    if not sql_query.strip():
+        return False, "Invalid SQL query. Could not parse the query."
+    if LocalSQLValidator.has_errors(issues):
+        return False, f"SQL query is invalid:\n{format_issues(issues)}"
+    if issues:
+        return True, f"SQL query is valid, with warnings:\n{format_issues(issues)}"
+    return True, "SQL query is valid."
+
+
+def _validate(sql_query: str, schema_path: str = None) -> Tuple[bool, str]:
+    try:
+        return _validation_result(sql_query, validate_sql(sql_query, schema_path))
+    except Exception as e:
+        return False, f"SQL query validation failed: {e}"
+
+
+def simulate_and_validate(sql_query: str, schema_path: str = None) -> str:
+    """
+    Validation followed by simulation; module-level so it can run in the CPU pool.
+    A query that can't be validated is reported, so one bad query doesn't fail a batch.
+    """
+    is_valid, validation_message = _validate(sql_query, schema_path)
+    if not is_valid:
+        return validation_message
+
+    try:
+        parsed = format_sql(sql_query)
+    except Exception as e:
+        raise RuntimeError(f"Query simulation failed: {e}")
+    simulation_result = f"Query simulation successful. Parsed structure:\n{parsed}"
+
+    return f"Validation Result: {validation_message}\n\nSimulation Result:\n{simulation_result}"
+
 
 class SQLQuerySimulatorValidator:
     """
@@ -9,43 +47,47 @@ class SQLQuerySimulatorValidator:
     Query Simulation: Simulates a SQL query execution to estimate its performance and ensure correctness without running it on the actual database.
     Validation: Ensures the query adheres to SQL syntax and compatibility with the provided SQL dialect.
 
+    The async variants run the (pure-Python, CPU-bound) parsing in the process pool so
+    they don't stall LLM requests running on the same event loop.
     """
 
-    def __init__(self, sql_dialect: str):
+    def __init__(self, sql_dialect: str, schema_path: str = None):
         self.sql_dialect = sql_dialect
+        self.schema_path = schema_path
+        if schema_path:
+            load_schema_index(schema_path)  # Fail early on a missing or malformed schema
 
     def simulate(self, sql_query: str) -> str:
         """
         Simulate query execution. Here, we simply parse the query and return its structure.
         """
         try:
-            parsed = sqlparse.format(sql_query, reindent=True, keyword_case='upper')
+            parsed = format_sql(sql_query)
             return f"Query simulation successful. Parsed structure:\n{parsed}"
         except Exception as e:
             raise RuntimeError(f"Query simulation failed: {e}")
 
     def validate(self, sql_query: str) -> Tuple[bool, str]:
         """
-        Validate the SQL query syntax using sqlparse.
+        Validate the SQL query locally: syntax, and table/column references and FK joins
+        when a schema was given.
         """
-        try:
-            parsed = sqlparse.parse(sql_query)
-            if not parsed:
-                return False, "Invalid SQL query. Could not parse the query."
-            return True, "SQL query is valid."
-        except Exception as e:
-            return False, f"SQL query validation failed: {e}"
+        return _validate(sql_query, self.schema_path)
 
     def run(self, sql_query: str) -> str:
         """
         Perform both simulation and validation.
         """
-        # Validation
-        is_valid, validation_message = self.validate(sql_query)
-        if not is_valid:
-            return validation_message
+        return simulate_and_validate(sql_query, self.schema_path)
 
-        # Simulation
-        simulation_result = self.simulate(sql_query)
+    async def run_async(self, sql_query: str) -> str:
+        """
+        `run` in the process pool (inline for small queries).
+        """
+        return await run_cpu_bound(simulate_and_validate, sql_query, self.schema_path, size=len(sql_query))
 
-        return f"Validation Result: {validation_message}\n\nSimulation Result:\n{simulation_result}"
\ No newline at end of file
+    async def run_many(self, sql_queries) -> list:
+        """
+        `run` over many queries, distributed to the process pool in chunks.
+        """
+        return await map_cpu_bound(simulate_and_validate, [(sql, self.schema_path) for sql in sql_queries])
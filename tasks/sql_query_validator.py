@@ -2,19 +2,35 @@
 SQL Query Validator Tool (Async)
 
 Simulates query execution and validates SQL syntax and logic.
+Queries are first checked locally (syntax and, when a schema is given, table/column
+references and FK joins); only queries without local errors are sent to the LLM.
 """
 
 from core.base_ai_client import BaseAIClient
 from core.sql_task_base import SQLTask
+from core.cpu_pool import run_cpu_bound, validate_sql
 from core.logger import get_logger
-from utils.prompt_manager import PromptManager
-from utils.sanitizer import clean_output
+from utils.schema_index import load_schema_index
+from utils.findings import findings_from_issues, format_findings
+from utils.sql_local_validator import LocalSQLValidator, format_issues
 
 
 class SQLQueryValidator(SQLTask):
-    def __init__(self):
+    prompt_key = "query_validator.simulate_and_validate"
+    structured_prompt_key = "query_validator.findings"
+    temperature = 0.3
+    minifiable = True
+    max_output_tokens = 500
+
+    def __init__(self, schema_path: str = None):
+        """
+        :param schema_path: Optional schema JSON (schema/ format) used to resolve tables and columns
+        """
         self.client = BaseAIClient()
         self.logger = get_logger("sql_query_validator")
+        self.schema_path = schema_path
+        if schema_path:
+            load_schema_index(schema_path)  # Fail early on a missing or malformed schema
 
     async def run(self, sql_query: str) -> str:
         """
@@ -26,15 +42,29 @@ class SQLQueryValidator(SQLTask):
         try:
             self.logger.info("Validating SQL query...")
 
-            # Use PromptManager to load the validation prompt
-            prompt = PromptManager.load_prompt(
-                "query_validator.simulate_and_validate",
-                sql_query=sql_query
-            )
+            # Local checks first; queries with errors never reach the LLM
+            issues = await run_cpu_bound(validate_sql, sql_query, self.schema_path, size=len(sql_query))
+            if LocalSQLValidator.has_errors(issues):
+                self.logger.info(f"Local validation found {len(issues)} issue(s); skipping LLM review.")
+                if self.structured:
+                    self.last_findings = findings_from_issues(issues)
+                    return format_findings(self.last_findings)
+                return f"Validation Results:\n- Local validation failed:\n{format_issues(issues)}\n"
+
+            if self.structured:
+                findings = await self.run_structured(sql_query) + findings_from_issues(issues)
+                self.last_findings = findings
+                self.logger.info(f"SQL query validation completed: {len(findings)} finding(s).")
+                return format_findings(findings)
+
+            # Render the validation prompt
+            prompt = self.build_prompt(sql_query)
 
             # Send the prompt to the AI model
-            result = await self.client.get_completion(prompt, temperature=0.3)
-            cleaned = clean_output(result)
+            result = await self.client.get_completion(prompt, temperature=self.temperature)
+            cleaned = self.postprocess(result)
+            if issues:
+                cleaned = f"{cleaned}\n\nLocal validation warnings:\n{format_issues(issues)}"
 
             self.logger.info("SQL query validation completed.")
             return cleaned
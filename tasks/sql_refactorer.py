@@ -2,18 +2,34 @@
 SQL Refactorer Tool (Async + Modular)
 
 Refactors complex SQL queries into more modular, maintainable components using CTEs, views, or subqueries.
+With a SQLite database, the refactor is run against the original and kept only if it
+returns the same rows and is not slower.
 """
 
+import asyncio
+
 from core.base_ai_client import BaseAIClient
 from core.sql_task_base import SQLTask
 from core.logger import get_logger
-from utils.prompt_manager import PromptManager
-from utils.sanitizer import clean_output
+from utils.refactor_verifier import verify_refactor
 
 class SQLRefactorer(SQLTask):
-    def __init__(self):
+    prompt_key = "refactorer.improve_modularity"
+    patch_prompt_key = "refactorer.improve_modularity_patch"
+    temperature = 0.25
+
+    def __init__(self, db_path: str = None, warmup: int = 1, repetitions: int = 5):
+        """
+        :param db_path: SQLite database used to verify refactors; None skips verification
+        :param warmup: Untimed runs before measuring
+        :param repetitions: Timed runs of each version
+        """
         self.client = BaseAIClient()
         self.logger = get_logger("sql_refactorer")
+        self.db_path = db_path
+        self.warmup = warmup
+        self.repetitions = repetitions
+        self.last_verification = None
 
     async def run(self, sql_query: str) -> str:
         """
@@ -25,18 +41,28 @@ class SQLRefactorer(SQLTask):
         try:
             self.logger.info("Refactoring SQL query...")
 
-            # Use PromptManager to load the prompt
-            prompt = PromptManager.load_prompt(
-                "refactorer.improve_modularity",
-                sql_query=sql_query
-            )
-
-            # Send the prompt to the AI model
-            result = await self.client.get_completion(prompt, temperature=0.25)
+            # Render the prompt and send it to the AI model (as a patch request with --patch)
+            refactored = await self.rewrite(sql_query)
             self.logger.info("SQL refactoring completed.")
 
-            return clean_output(result)
+            if self.db_path:
+                return await self._verified(sql_query, refactored)
+            return refactored
 
         except Exception as e:
             self.logger.error(f"SQL refactoring failed: {e}")
             raise RuntimeError(f"SQLRefactorer error: {e}")
+
+    async def _verified(self, sql_query: str, refactored: str) -> str:
+        """
+        Returns the refactor if it is equivalent and not slower, otherwise the original.
+        """
+        verification = await asyncio.to_thread(
+            verify_refactor, self.db_path, sql_query, refactored, self.warmup, self.repetitions
+        )
+        self.last_verification = verification
+        if verification.keep:
+            self.logger.info(f"Refactor verified ({verification.speedup:.2f}x).")
+            return refactored
+        self.logger.warning(f"Refactor discarded: {verification.reason}.")
+        return sql_query
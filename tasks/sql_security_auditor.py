@@ -7,11 +7,16 @@ Analyzes SQL queries for potential security vulnerabilities and provides remedia
 from core.base_ai_client import BaseAIClient
 from core.sql_task_base import SQLTask
 from core.logger import get_logger
-from utils.prompt_manager import PromptManager
-from utils.sanitizer import clean_output
+from utils.findings import format_findings
 
 
 class EnhancedSQLSecurityAuditor(SQLTask):
+    prompt_key = "security_audit.enhanced"
+    structured_prompt_key = "security_audit.findings"
+    temperature = 0.3
+    minifiable = True
+    max_output_tokens = 700
+
     def __init__(self):
         self.client = BaseAIClient()
         self.logger = get_logger("enhanced_sql_security_auditor")
@@ -26,15 +31,17 @@ class EnhancedSQLSecurityAuditor(SQLTask):
         try:
             self.logger.info("Starting security audit for SQL query...")
 
-            # Use PromptManager to load the security audit prompt
-            prompt = PromptManager.load_prompt(
-                "security_audit.enhanced",
-                sql_query=sql_query
-            )
+            if self.structured:
+                findings = await self.run_structured(sql_query)
+                self.logger.info(f"Security audit completed: {len(findings)} finding(s).")
+                return format_findings(findings)
+
+            # Render the security audit prompt
+            prompt = self.build_prompt(sql_query)
 
             # Send the prompt to the AI model
-            result = await self.client.get_completion(prompt, temperature=0.3)
-            cleaned = clean_output(result)
+            result = await self.client.get_completion(prompt, temperature=self.temperature)
+            cleaned = self.postprocess(result)
 
             self.logger.info("Security audit completed.")
             return cleaned
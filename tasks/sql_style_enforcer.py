@@ -1,31 +1,144 @@
+"""
+SQL Style Enforcer
+
+The mechanical style rules (keyword case, indentation, comma placement, alias style) are
+applied locally by the dialect-aware formatter in utils.sql_formatter, without an LLM
+call. The LLM is only asked about the rules a formatter can't decide, such as naming
+conventions, and only when an AI client is given. SQL it has already enforced is
+recognized by hash and skipped without a call. In patch mode the LLM returns only the
+lines it changes (see utils.sql_patch).
+"""
+
+import json
+import os
+import threading
+
+from core.metrics import run_metrics
+from utils.batch_jobs import hash_text
+from utils.findings import number_lines
 from utils.prompt_manager import PromptManager
-from core.base_ai_client import AIClient
+from utils.sanitizer import clean_output
+from utils.sql_formatter import format_sql, normalize_dialect, style_for
+from utils.sql_patch import request_rewrite
+
+PROMPT_KEY = "style_enforcer.enforce_style"
+PATCH_PROMPT_KEY = "style_enforcer.enforce_style_patch"
+STYLE_CACHE_PATH = os.environ.get("GENAI_SQL_STYLE_CACHE", ".style_cache.jsonl")
+
+
+class StyleCache:
+    """
+    Hashes of the SQL the LLM pass produced, per profile (dialect, style and prompt
+    version). A file whose content is in the cache is unchanged since it was enforced.
+    Append-only JSONL, so concurrent workers only ever add lines.
+    """
+
+    _shared = {}
+    _lock = threading.Lock()
+
+    def __init__(self, path: str = STYLE_CACHE_PATH):
+        self.path = path
+        self.entries = set()
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn last line
+                    self.entries.add((entry.get("profile"), entry.get("hash")))
+
+    @classmethod
+    def shared(cls, path: str = STYLE_CACHE_PATH):
+        """
+        The cache of `path`, loaded once per run.
+        """
+        with cls._lock:
+            if path not in cls._shared:
+                cls._shared[path] = cls(path)
+            return cls._shared[path]
+
+    def contains(self, profile: str, sql_code: str) -> bool:
+        return (profile, hash_text(sql_code)) in self.entries
+
+    def add(self, profile: str, sql_code: str):
+        entry = (profile, hash_text(sql_code))
+        if entry in self.entries:
+            return
+        self.entries.add(entry)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"profile": profile, "hash": entry[1]}) + "\n")
+
 
 class SQLStyleEnforcer:
     """
-    A class to enforce SQL coding standards dynamically using AI-driven prompts.
+    Enforces SQL coding standards: locally formatted, plus an optional LLM pass for naming
+    and other non-mechanical rules.
     """
 
-    def __init__(self, ai_client: AIClient, prompt_manager: PromptManager):
+    # Patch mode (--patch): the LLM pass returns unified-diff hunks instead of the whole file
+    patch = False
+
+    def __init__(self, ai_client=None, prompt_manager: PromptManager = None, style_overrides: dict = None, cache: StyleCache = None):
         """
-        Initializes the SQLStyleEnforcer with AI client and prompt manager.
+        :param ai_client: AI client for the non-mechanical rules; formatting only without it
+        :param style_overrides: Per-dialect style settings (SQL_STYLE config), see utils.sql_formatter.style_for
+        :param cache: StyleCache of already enforced SQL, to skip unchanged files
         """
         self.ai_client = ai_client
         self.prompt_manager = prompt_manager
+        self.style_overrides = style_overrides
+        self.cache = cache
+
+    def format(self, sql_code: str, dialect: str = "generic") -> str:
+        """
+        Applies the mechanical style rules of the dialect locally.
+        """
+        return format_sql(sql_code, dialect, style_for(dialect, self.style_overrides))
 
     async def enforce_style(self, sql_code: str, dialect: str = "generic") -> str:
         """
-        Enforces SQL style guide dynamically using AI.
+        Enforces the SQL style guide.
 
         :param sql_code: The SQL code to analyze.
         :param dialect: The SQL dialect (e.g., "PostgreSQL", "T-SQL").
-        :return: AI-enhanced SQL with enforced style guide.
+        :return: SQL with the style guide enforced.
         """
-        # Load the appropriate prompt for SQL Style Guide Enforcement
-        prompt = self.prompt_manager.get_prompt("style_enforcer.enforce_style")
-        prompt = prompt.format(sql_code=sql_code, sql_dialect=dialect)
+        formatted = self.format(sql_code, dialect)
+        run_metrics.increment("style.formatted_locally")
+        if self.ai_client is None:
+            return formatted
+
+        profile = self.profile(dialect)
+        if self.cache is not None and self.cache.contains(profile, sql_code):
+            run_metrics.increment("style.skipped_unchanged")
+            return sql_code
+
+        async def full_text():
+            prompt = PromptManager.load_prompt(PROMPT_KEY, sql_code=formatted, sql_dialect=dialect)
+            return clean_output(await self.ai_client.generate(prompt, temperature=0.0))
 
-        # Send the prompt to the AI client
-        response = await self.ai_client.generate(prompt)
+        if hasattr(self.ai_client, "route"):
+            # Tier by the complexity of the SQL (when LLM_ROUTING is set)
+            self.ai_client.usage_label = type(self).__name__
+            self.ai_client.route(formatted)
+        patch_prompt = None
+        if self.patch:
+            patch_prompt = PromptManager.load_prompt(PATCH_PROMPT_KEY, sql_code=number_lines(formatted), sql_dialect=dialect)
+        response = await request_rewrite(self.ai_client, formatted, full_text, patch_prompt, temperature=0.0)
+        run_metrics.increment("style.llm_calls")
 
-        return response.strip()
\ No newline at end of file
+        # The LLM's edits are re-formatted, so the mechanical rules hold whatever it returns
+        result = self.format(response, dialect)
+        if self.cache is not None:
+            self.cache.add(profile, result)
+        return result
+
+    def profile(self, dialect: str) -> str:
+        """
+        Identifies what the cached results were enforced with; a new style or prompt
+        version enforces every file again.
+        """
+        style = style_for(dialect, self.style_overrides)
+        version = PromptManager.get_metadata(PROMPT_KEY).get("version")
+        return hash_text(json.dumps([normalize_dialect(dialect), style, version], sort_keys=True))[:16]
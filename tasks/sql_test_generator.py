@@ -7,10 +7,11 @@ Generates test cases and scenarios for SQL queries to validate correctness and l
 from core.base_ai_client import BaseAIClient
 from core.sql_task_base import SQLTask
 from core.logger import get_logger
-from utils.prompt_manager import PromptManager
-from utils.sanitizer import clean_output
 
 class SQLTestGenerator(SQLTask):
+    prompt_key = "test_generator.unit_tests"
+    temperature = 0.3
+
     def __init__(self):
         self.client = BaseAIClient()
         self.logger = get_logger("sql_test_generator")
@@ -25,17 +26,14 @@ class SQLTestGenerator(SQLTask):
         try:
             self.logger.info("Generating SQL test cases...")
 
-            # Use PromptManager to load the prompt
-            prompt = PromptManager.load_prompt(
-                "test_generator.unit_tests",
-                sql_query=sql_query
-            )
+            # Render the prompt
+            prompt = self.build_prompt(sql_query)
 
             # Send the prompt to the AI model
-            result = await self.client.get_completion(prompt, temperature=0.3)
+            result = await self.client.get_completion(prompt, temperature=self.temperature)
             self.logger.info("SQL test generation completed.")
 
-            return clean_output(result)
+            return self.postprocess(result)
 
         except Exception as e:
             self.logger.error(f"SQL test generation failed: {e}")
@@ -0,0 +1,85 @@
+import sys
+import os
+import json
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from utils.batch_jobs import hash_text, load_manifest, manifest_path_for, read_batch_results, write_batch_file
+
+
+def test_write_batch_file_and_manifest(tmp_path):
+    batch_path = str(tmp_path / "batch.jsonl")
+    entries = [{
+        "filepath": "queries/a.sql",
+        "task": "analyze",
+        "prompt_key": "analyzer.performance_analysis",
+        "prompt_version": 1.0,
+        "prompt": "Analyze: SELECT 1;",
+        "temperature": 0.2,
+        "input_hash": hash_text("SELECT 1;"),
+    }]
+
+    manifest_path = write_batch_file(batch_path, entries, model="gpt-4o-batch")
+
+    with open(batch_path, "r", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == 1
+    assert lines[0]["url"] == "/chat/completions"
+    assert lines[0]["body"]["model"] == "gpt-4o-batch"
+    assert lines[0]["body"]["messages"][0]["content"] == "Analyze: SELECT 1;"
+
+    manifest = load_manifest(manifest_path)
+    request = manifest["requests"][lines[0]["custom_id"]]
+    assert request["filepath"] == "queries/a.sql"
+    assert request["task"] == "analyze"
+    assert request["prompt_version"] == 1.0
+
+
+def test_read_batch_results(tmp_path):
+    results_path = tmp_path / "results.jsonl"
+    records = [
+        {"custom_id": "analyze-000000", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "ok"}}]}}},
+        {"custom_id": "analyze-000001", "response": {"status_code": 429, "body": {"error": "throttled"}}},
+        {"custom_id": "analyze-000002", "error": {"code": "expired"}},
+    ]
+    results_path.write_text("\n".join(json.dumps(r) for r in records) + "\n\nnot json\n", encoding="utf-8")
+
+    results = list(read_batch_results(str(results_path)))
+
+    assert results[0] == ("analyze-000000", "ok", None)
+    assert results[1][0] == "analyze-000001" and results[1][1] is None and "429" in results[1][2]
+    assert results[2][0] == "analyze-000002" and "expired" in results[2][2]
+    assert results[3][0] is None and "invalid JSON" in results[3][2]
+
+
+def test_batch_mode_rejects_tasks_without_a_prompt(tmp_path, capsys):
+    from app import TASKS, ingest_batch, submit_batch
+
+    for task_name in ("nl_to_sql", "dynamic_sql"):
+        ingest_batch(task_name, TASKS[task_name], str(tmp_path / "results.jsonl"), str(tmp_path / "manifest.json"))
+        submit_batch(task_name, TASKS[task_name], str(tmp_path), False, str(tmp_path / "batch.jsonl"))
+        assert capsys.readouterr().out.count(f"❌ Task '{task_name}' does not support batch mode.") == 2
+
+
+def test_minified_batch_maps_lines_back(tmp_path, capsys):
+    from app import TASKS, ingest_batch, submit_batch
+
+    sql_path = tmp_path / "q.sql"
+    sql_path.write_text("-- header\n\nSELECT *\nFROM Claims;\n", encoding="utf-8")
+    batch_path = str(tmp_path / "batch.jsonl")
+    submit_batch("analyze", TASKS["analyze"], str(sql_path), False, batch_path, minify=True)
+
+    with open(batch_path, "r", encoding="utf-8") as f:
+        line = json.loads(f.readline())
+    assert "-- header" not in line["body"]["messages"][0]["content"]
+
+    results_path = tmp_path / "results.jsonl"
+    results_path.write_text(json.dumps({
+        "custom_id": line["custom_id"],
+        "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "Line 1: avoid SELECT *"}}]}},
+    }) + "\n", encoding="utf-8")
+    ingest_batch("analyze", TASKS["analyze"], str(results_path), manifest_path_for(batch_path), dry_run=True)
+
+    assert "Line 3: avoid SELECT *" in capsys.readouterr().out
@@ -0,0 +1,66 @@
+import sys
+import os
+import asyncio
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from learn.conversation_memory import ConversationMemory
+from utils.token_utils import estimate_message_tokens
+
+
+@pytest.mark.asyncio
+async def test_recent_turns_are_sent_verbatim():
+    async def summarize(content):
+        return "unused"
+
+    memory = ConversationMemory(summarize, max_tokens=500)
+    memory.add_turn("What is a CTE?", "A named subquery.")
+
+    messages = memory.build_messages("system", "Show an example.")
+
+    assert [m["role"] for m in messages] == ["system", "user", "assistant", "user"]
+    assert messages[1]["content"] == "What is a CTE?"
+    assert messages[-1]["content"] == "Show an example."
+
+
+@pytest.mark.asyncio
+async def test_prompt_size_stays_bounded_and_old_turns_are_summarized():
+    calls = []
+
+    async def summarize(content):
+        calls.append(content)
+        await asyncio.sleep(0)
+        return "User is learning joins."
+
+    memory = ConversationMemory(summarize, max_tokens=120)
+    sizes = []
+    for i in range(30):
+        memory.add_turn(f"Question {i} " + "x" * 80, f"Answer {i} " + "y" * 80)
+        sizes.append(estimate_message_tokens(memory.build_messages("system", "next")))
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert calls, "older turns should be summarized in the background"
+    assert max(sizes) <= 120 + estimate_message_tokens([{"content": "system"}, {"content": "next"}])
+    assert len(memory.turns) < 30
+
+    messages = memory.build_messages("system", "next")
+    assert "User is learning joins." in messages[1]["content"]
+
+
+@pytest.mark.asyncio
+async def test_failed_summarization_keeps_turns():
+    async def summarize(content):
+        raise RuntimeError("LLM down")
+
+    memory = ConversationMemory(summarize, max_tokens=60)
+    for i in range(5):
+        memory.add_turn("q" * 100, "a" * 100)
+        await asyncio.sleep(0)
+    await memory.close()
+
+    assert memory.summary == ""
+    assert len(memory.turns) == 5
@@ -0,0 +1,80 @@
+import sys
+import os
+import asyncio
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from core import cpu_pool  # Import after setting the path
+from core.metrics import run_metrics
+from tasks.sql_query_simulator_validator import SQLQuerySimulatorValidator
+from utils.dynamic_sql_scanner import scan_dynamic_sql
+
+SCHEMA_PATH = os.path.join(project_root, "schema", "HealthClaimsDemo.json")
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    run_metrics.reset()
+    yield
+
+
+@pytest.mark.asyncio
+async def test_small_inputs_run_inline():
+    sites = await cpu_pool.run_cpu_bound(scan_dynamic_sql, "EXEC (@sql)", size=11)
+    assert [site.kind for site in sites] == ["exec_string"]
+    assert run_metrics.get("cpu_pool.inline") == 1
+    assert run_metrics.get("cpu_pool.tasks") == 0
+
+
+@pytest.mark.asyncio
+async def test_large_inputs_run_in_pool():
+    sql = "SELECT PatientID FROM Claims;\n" * 2000
+    issues = await cpu_pool.run_cpu_bound(cpu_pool.validate_sql, sql, SCHEMA_PATH, size=len(sql))
+    assert issues == []
+    assert run_metrics.get("cpu_pool.tasks") == 1
+
+
+@pytest.mark.asyncio
+async def test_map_is_chunked_and_ordered():
+    queries = [f"SELECT {i} FROM Claims WHERE ClaimIDX = {i}" if i % 3 == 0 else f"SELECT {i}" for i in range(10)]
+    results = await cpu_pool.map_cpu_bound(cpu_pool.validate_sql, [(q, SCHEMA_PATH) for q in queries], chunk_size=4)
+    assert [bool(issues) for issues in results] == [i % 3 == 0 for i in range(10)]
+    assert run_metrics.get("cpu_pool.tasks") == 3
+
+
+@pytest.mark.asyncio
+async def test_pool_does_not_block_event_loop():
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.ensure_future(ticker())
+    validator = SQLQuerySimulatorValidator("T-SQL", schema_path=SCHEMA_PATH)
+    results = await validator.run_many(["SELECT c.ClaimID FROM Claims c WHERE c.PaidAmount > 0"] * 200)
+    task.cancel()
+    assert all(result.startswith("Validation Result: SQL query is valid.") for result in results)
+    assert ticks > 0
+
+
+def test_sync_run_reports_local_errors():
+    validator = SQLQuerySimulatorValidator("T-SQL", schema_path=SCHEMA_PATH)
+    assert validator.run("SELECT Nope FROM Claims").startswith("SQL query is invalid:")
+    assert validator.validate("SELECT ClaimID FROM Claims") == (True, "SQL query is valid.")
+
+
+def test_validation_errors_are_reported_not_raised(monkeypatch):
+    import tasks.sql_query_simulator_validator as simulator
+
+    def broken(sql_query, schema_path=None):
+        raise ValueError("unexpected token")
+
+    monkeypatch.setattr(simulator, "validate_sql", broken)
+    validator = SQLQuerySimulatorValidator("T-SQL", schema_path=SCHEMA_PATH)
+    assert validator.run("SELECT 1") == "SQL query validation failed: unexpected token"
@@ -0,0 +1,80 @@
+import sys
+import os
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from core.deployment_pool import DeploymentPool, LATENCY_WEIGHTED
+
+BASE_CONFIG = {
+    "AOPAI_KEY": "key",
+    "API_BASE": "https://primary.example/",
+    "AOPAI_DEPLOY_MODEL": "gpt-4o",
+    "AOPAI_API_VERSION": "2025-01-01-preview",
+}
+
+
+def _pool(entries, **extra):
+    return DeploymentPool.from_config(dict(BASE_CONFIG, AOPAI_DEPLOYMENTS=entries, **extra))
+
+
+def test_legacy_config_builds_single_deployment():
+    pool = DeploymentPool.from_config(BASE_CONFIG)
+    assert len(pool) == 1
+    assert pool.deployments[0].endpoint == (
+        "https://primary.example/openai/deployments/gpt-4o/chat/completions?api-version=2025-01-01-preview"
+    )
+
+
+def test_least_outstanding_selection():
+    pool = _pool([{"name": "pool-a", "api_base": "https://a.example/"}, {"name": "pool-b", "api_base": "https://b.example/"}])
+    first, second = pool.deployments
+    first.begin()
+    assert pool.select() is second
+    second.begin()
+    second.begin()
+    assert pool.select() is first
+
+
+def test_latency_weighted_selection():
+    pool = _pool(
+        [{"name": "lw-slow", "api_base": "https://slow.example/"}, {"name": "lw-fast", "api_base": "https://fast.example/"}],
+        LLM_ROUTING_STRATEGY=LATENCY_WEIGHTED,
+    )
+    slow, fast = pool.deployments
+    for _ in range(5):
+        slow.latency.record(2.0)
+        fast.latency.record(0.2)
+    assert pool.select() is fast
+
+
+def test_throttled_and_exhausted_deployments_are_skipped():
+    pool = _pool([{"name": "q-a", "api_base": "https://qa.example/"}, {"name": "q-b", "api_base": "https://qb.example/"}])
+    first, second = pool.deployments
+    first.throttle(30)
+    assert pool.select() is second
+
+    second.update_quota({"x-ratelimit-remaining-requests": "0"})
+    # Both impaired: the exhausted one still ranks above the cooling-down one
+    assert pool.select() is second
+
+
+def test_failover_excludes_failed_deployment():
+    pool = _pool([{"name": "f-a", "api_base": "https://fa.example/"}, {"name": "f-b", "api_base": "https://fb.example/"}])
+    first, second = pool.deployments
+    assert pool.select(exclude={first}) is second
+    # With every deployment excluded the pool still returns one rather than nothing
+    assert pool.select(exclude={first, second}) is not None
+
+
+def test_open_circuits_are_never_selected():
+    pool = _pool([{"name": "c-a", "api_base": "https://ca.example/"}], LLM_BREAKER_THRESHOLD=1, LLM_BREAKER_RESET=60)
+    pool.deployments[0].breaker.record_failure()
+    assert pool.select() is None
+
+
+def test_unknown_strategy_rejected():
+    with pytest.raises(ValueError):
+        _pool([{}], LLM_ROUTING_STRATEGY="round_robin")
@@ -0,0 +1,68 @@
+import sys
+import os
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from utils.dynamic_sql_scanner import extract_context, format_scan_report, scan_dynamic_sql
+
+DYNAMIC_SQL = """-- EXEC sp_executesql @not_code
+DECLARE @sql NVARCHAR(MAX) = N'SELECT * FROM ' + @tableName;
+SET @sql += ' WHERE UserID = ' + CAST(@userID AS VARCHAR(10));
+EXEC sp_executesql @sql;
+EXEC('DELETE FROM ' + @tableName);
+PREPARE stmt FROM @query;
+EXECUTE IMMEDIATE 'DROP TABLE ' || v_name;
+"""
+
+
+def test_detects_sites_with_line_spans():
+    sites = scan_dynamic_sql(DYNAMIC_SQL)
+    assert [(site.kind, site.start_line) for site in sites] == [
+        ("string_concatenation", 2),
+        ("string_concatenation", 3),
+        ("sp_executesql", 4),
+        ("exec_string", 5),
+        ("prepare", 6),
+        ("execute_immediate", 7),
+    ]
+
+
+def test_static_sql_has_no_hits():
+    sql = """
+    -- Call EXEC('x') from the app, not here
+    EXEC dbo.GetUsers @UserID = 5;
+    EXEC @rc = dbo.RefreshStats;
+    SELECT 'EXEC sp_executesql' AS note, a + b AS total FROM t WHERE name = 'x' + @suffix;
+    """
+    assert scan_dynamic_sql(sql) == []
+    assert format_scan_report([]) == "No dynamic SQL patterns detected."
+
+
+def test_prose_concatenation_is_not_sql():
+    sql = """
+    SET @greeting = 'Hello ' + @name + ' from table ' + @table;
+    SET @note = 'Where: ' + @site + ', created by ' + @user;
+    SET @message = 'Please select a value from ' + @list;
+    """
+    assert scan_dynamic_sql(sql) == []
+
+    # Fragments of a statement across literals, and later appends to the same variable
+    sql = "SET @q = 'SELECT ' + @cols + ' FROM ' + @table;\nSET @q = @q + ' WHERE id = ' + @id;"
+    assert [(site.kind, site.start_line) for site in scan_dynamic_sql(sql)] == [
+        ("string_concatenation", 1), ("string_concatenation", 2),
+    ]
+
+
+def test_multiline_site_span():
+    sql = "SET @sql = 'SELECT a\nFROM t\nWHERE id = ' + @id;\nEXEC (@sql);"
+    sites = scan_dynamic_sql(sql)
+    assert (sites[0].kind, sites[0].start_line, sites[0].end_line) == ("string_concatenation", 1, 3)
+    assert (sites[1].kind, sites[1].start_line) == ("exec_string", 4)
+
+
+def test_extract_context_keeps_only_surrounding_lines():
+    sql = "\n".join(["SELECT 1;"] * 20 + ["EXEC (@sql);"] + ["SELECT 2;"] * 20)
+    context = extract_context(sql, scan_dynamic_sql(sql), padding=1)
+    assert context.splitlines() == ["   20: SELECT 1;", "   21: EXEC (@sql);", "   22: SELECT 2;"]
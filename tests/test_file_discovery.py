@@ -0,0 +1,91 @@
+import sys
+import os
+import asyncio
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from utils.file_utils import get_sql_files_in_directory, iter_sql_files  # Import after setting the path
+from utils.ignore_rules import IgnoreRules
+from app import run_work_queue
+
+
+def make_tree(root, files):
+    for relative, content in files.items():
+        path = os.path.join(root, *relative.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+
+def relative(root, paths):
+    return [os.path.relpath(path, root).replace(os.sep, "/") for path in paths]
+
+
+def test_gitignore_semantics():
+    rules = IgnoreRules().extended(["# build output", "build/", "*.tmp.sql", "!keep.tmp.sql", "/top.sql", "docs/**/old"])
+
+    assert rules.is_ignored("build", True)
+    assert not rules.is_ignored("build", False)  # Directories only
+    assert rules.is_ignored("a/b/x.tmp.sql", False)
+    assert not rules.is_ignored("a/keep.tmp.sql", False)
+    assert rules.is_ignored("top.sql", False) and not rules.is_ignored("a/top.sql", False)
+    assert rules.is_ignored("docs/v1/v2/old", True)
+    assert IgnoreRules().extended(["*.sql"], base="sub").is_ignored("sub/a.sql", False)
+    assert not IgnoreRules().extended(["*.sql"], base="sub").is_ignored("other/a.sql", False)
+
+
+def test_discovery_honors_ignore_files_globs_and_size(tmp_path):
+    root = str(tmp_path)
+    make_tree(root, {
+        ".gitignore": "dist/\n",
+        "a.sql": "SELECT 1",
+        "procs/b.sql": "SELECT 2",
+        "procs/.genaisqlignore": "draft_*.sql\n",
+        "procs/draft_c.sql": "SELECT 3",
+        "dist/built.sql": "SELECT 4",
+        "node_modules/pkg/seed.sql": "SELECT 5",
+        "dumps/huge.sql": "INSERT INTO t VALUES (1);\n" * 100,
+        "notes.txt": "not sql",
+    })
+
+    assert relative(root, iter_sql_files(root)) == ["a.sql", "dumps/huge.sql", "procs/b.sql"]
+    assert relative(root, iter_sql_files(root, max_size=1000)) == ["a.sql", "procs/b.sql"]
+    assert relative(root, iter_sql_files(root, include=["procs/**"])) == ["procs/b.sql"]
+    assert relative(root, iter_sql_files(root, exclude=["dumps/"])) == ["a.sql", "procs/b.sql"]
+    assert relative(root, get_sql_files_in_directory(root, recursive=False)) == ["a.sql"]
+
+
+def test_discovery_is_lazy(tmp_path):
+    root = str(tmp_path)
+    make_tree(root, {"a/1.sql": "", "b/2.sql": ""})
+    files = iter_sql_files(root)
+
+    assert relative(root, [next(files)]) == ["a/1.sql"]
+    os.remove(os.path.join(root, "b", "2.sql"))  # Not walked yet
+    assert list(files) == []
+
+
+@pytest.mark.asyncio
+async def test_work_queue_starts_before_discovery_ends():
+    events = []
+
+    def discovered():
+        for n in range(6):
+            events.append(f"found {n}")
+            yield (f"{n}.sql", [])
+
+    async def handle(file, duplicates):
+        events.append(f"start {file}")
+        await asyncio.sleep(0)
+
+    assert await run_work_queue(discovered(), handle, workers=2) == 6
+    assert events.index("start 0.sql") < events.index("found 5")
+
+    async def failing(file, duplicates):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await run_work_queue(discovered(), failing)
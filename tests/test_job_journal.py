@@ -0,0 +1,65 @@
+import sys
+import os
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from utils.job_journal import DONE, FAILED, STARTED, JobJournal, is_completed, load_journal  # Import after setting the path
+
+
+def test_journal_replays_latest_state_per_file(tmp_path):
+    with JobJournal("run1", directory=str(tmp_path)) as journal:
+        journal.start_run(task="comment", path="/repo", recursive=True, files=3)
+        journal.started("/repo/a.sql", "comment", "in-a", 1.0)
+        journal.done("/repo/a.sql", "/repo/a.sql", "out-a")
+        journal.started("/repo/b.sql", "comment", "in-b", 1.0)
+        journal.failed("/repo/b.sql", "timeout")
+        journal.started("/repo/c.sql", "comment", "in-c", 1.0)
+
+    header, files = load_journal(journal.path)
+
+    assert header["task"] == "comment" and header["run_id"] == "run1"
+    assert files[os.path.abspath("/repo/a.sql")]["status"] == DONE
+    assert files[os.path.abspath("/repo/a.sql")]["input_hash"] == "in-a"
+    assert files[os.path.abspath("/repo/b.sql")]["status"] == FAILED
+    assert files[os.path.abspath("/repo/c.sql")]["status"] == STARTED
+
+
+def test_torn_last_line_is_ignored_and_appends_continue(tmp_path):
+    journal = JobJournal("run2", directory=str(tmp_path))
+    journal.started("/repo/a.sql", "analyze", "in-a")
+    journal.done("/repo/a.sql", "/repo/a.sql", "in-a")
+    journal.close()
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"event": "file", "file": "/repo/b.sql", "sta')  # crash mid-write
+
+    with JobJournal("run2", directory=str(tmp_path)) as resumed:
+        resumed.started("/repo/b.sql", "analyze", "in-b")
+
+    _, files = load_journal(journal.path)
+    assert files[os.path.abspath("/repo/a.sql")]["status"] == DONE
+    assert files[os.path.abspath("/repo/b.sql")]["status"] == STARTED
+
+
+def test_fsync_is_batched(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd))
+
+    journal = JobJournal("run3", directory=str(tmp_path), fsync_every=10, fsync_seconds=3600)
+    for i in range(25):
+        journal.started(f"/repo/{i}.sql", "comment", str(i))
+    assert len(synced) == 2
+    journal.close()
+    assert len(synced) == 3
+
+
+def test_completed_requires_same_task_and_unchanged_file():
+    state = {"status": DONE, "task": "comment", "input_hash": "in", "output_hash": "out"}
+
+    assert is_completed(state, "comment", "out")
+    assert is_completed(state, "comment", "in")
+    assert not is_completed(state, "comment", "edited-since")
+    assert not is_completed(state, "analyze", "out")
+    assert not is_completed(dict(state, status=FAILED), "comment", "out")
+    assert not is_completed(None, "comment", "out")
@@ -0,0 +1,56 @@
+import sys
+import os
+import json
+import logging
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+import core.logger as audit_log
+
+
+def _record(**extra):
+    record = logging.LogRecord("sql_analyzer", logging.INFO, __file__, 1, "Analyzing %s", ("query",), None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+def test_json_formatter_includes_run_id_and_extra_fields():
+    record = _record(run_id="run-123", file="a.sql")
+    entry = json.loads(audit_log.JSONFormatter().format(record))
+    assert entry["message"] == "Analyzing query"
+    assert entry["run_id"] == "run-123"
+    assert entry["logger"] == "sql_analyzer"
+    assert entry["file"] == "a.sql"
+
+
+def test_payload_sampling():
+    dropped = _record(payload="x" * 5000)
+    audit_log.PayloadSampler(rate=0.0).filter(dropped)
+    assert dropped.payload is None
+    assert dropped.payload_chars == 5000
+
+    kept = _record(payload="x" * 5000)
+    audit_log.PayloadSampler(rate=1.0, max_chars=100).filter(kept)
+    assert kept.payload == "x" * 100
+
+
+def test_get_logger_writes_structured_lines_off_thread(tmp_path, monkeypatch):
+    audit_log.shutdown_logging()
+    monkeypatch.setattr(audit_log, "LOG_DIR", str(tmp_path))
+    audit_log.set_run_id("run-abc")
+    try:
+        logger = audit_log.get_logger("test_audit_logger")
+        logger.info("Task started", extra={"file": "b.sql"})
+        assert audit_log.get_logger("test_audit_logger").handlers.count(audit_log._queue_handler) == 1
+        audit_log.shutdown_logging()
+
+        with open(tmp_path / "test_audit_logger.log", "r", encoding="utf-8") as f:
+            entry = json.loads(f.readline())
+        assert entry["message"] == "Task started"
+        assert entry["run_id"] == "run-abc"
+        assert entry["file"] == "b.sql"
+    finally:
+        audit_log.shutdown_logging()
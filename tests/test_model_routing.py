@@ -0,0 +1,117 @@
+import sys
+import os
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from core.base_ai_client import BaseAIClient  # Import after setting the path
+from core.deployment_pool import DeploymentPool
+from core.metrics import run_metrics
+from core.model_routing import RoutingPolicy
+from utils.sql_complexity import score_sql
+
+SIMPLE_SQL = "SELECT ClaimID FROM Claims WHERE PatientID = 42"
+COMPLEX_SQL = """
+WITH recent AS (
+    SELECT c.*, ROW_NUMBER() OVER (PARTITION BY c.PatientID ORDER BY c.ClaimDate DESC) AS rn
+    FROM Claims c
+    JOIN Providers pr ON pr.ProviderID = c.ProviderID
+    WHERE c.ClaimDate >= (SELECT MIN(ServiceDate) FROM Visits WHERE VisitID IN (SELECT VisitID FROM Referrals))
+)
+SELECT p.PatientID, r.ClaimID FROM Patients p LEFT JOIN recent r ON r.PatientID = p.PatientID AND r.rn = 1
+"""
+DYNAMIC_SQL = "DECLARE @sql NVARCHAR(MAX) = N'SELECT * FROM ' + @table; EXEC sp_executesql @sql;"
+
+
+def test_complexity_features_are_counted():
+    simple = score_sql(SIMPLE_SQL)
+    complex_ = score_sql(COMPLEX_SQL)
+
+    assert simple.score < 1
+    assert (complex_.joins, complex_.depth, complex_.ctes, complex_.windows) == (2, 3, 1, 1)
+    assert complex_.score > 6
+    assert score_sql(DYNAMIC_SQL).dynamic >= 1
+
+
+def test_comments_and_strings_do_not_count():
+    sql = "-- JOIN JOIN JOIN\nSELECT 'a JOIN b OVER (x)' FROM t /* WITH x AS ( */"
+    assert score_sql(sql)[1:] == (4, 0, 0, 0, 0, 0)
+
+
+def test_policy_routes_by_score_and_size():
+    policy = RoutingPolicy(max_fast_score=6, max_fast_tokens=50)
+
+    assert policy.choose(SIMPLE_SQL) == "fast"
+    assert policy.choose(COMPLEX_SQL) == "strong"
+    assert policy.choose(DYNAMIC_SQL) == "strong"  # Short, but builds and executes SQL
+    assert policy.choose(" UNION ALL ".join([SIMPLE_SQL] * 10)) == "strong"  # Too many tokens
+    assert RoutingPolicy.from_config({}) is None
+
+
+@pytest.mark.asyncio
+async def test_failed_fast_request_escalates_to_strong_tier():
+    client = BaseAIClient()
+    client.pool = DeploymentPool.from_config({
+        "AOPAI_KEY": "key",
+        "AOPAI_API_VERSION": "2025-01-01-preview",
+        "AOPAI_DEPLOYMENTS": [
+            {"name": "route-mini", "api_base": "https://mini.example/", "model": "gpt-4o-mini", "tier": "fast"},
+            {"name": "route-full", "api_base": "https://full.example/", "model": "gpt-4o", "tier": "strong"},
+        ],
+    })
+    client.routing = RoutingPolicy()
+    served = []
+
+    async def post(http_client, deployment, payload):
+        served.append(deployment.tier)
+        if deployment.tier == "fast":
+            raise ValueError("context length exceeded")
+        return {"choices": [{"message": {"content": "ok"}}]}
+
+    client._hedged_post = post
+    escalations = run_metrics.get("route.escalations")
+
+    assert client.route(SIMPLE_SQL) == "fast"
+    assert await client.get_completion("prompt") == "ok"
+    assert served == ["fast", "strong"]
+    assert run_metrics.get("route.escalations") == escalations + 1
+
+
+@pytest.mark.asyncio
+async def test_dynamic_sql_and_nl_to_sql_are_routed():
+    from tasks.natural_language_to_sql import NaturalLanguageToSQL
+    from utils.dynamic_sql_detector import DynamicSQLDetector
+    from utils.prompt_manager import PromptManager
+
+    served = []
+
+    def routed(client):
+        client.pool = DeploymentPool.from_config({
+            "AOPAI_KEY": "key",
+            "AOPAI_API_VERSION": "2025-01-01-preview",
+            "AOPAI_DEPLOYMENTS": [
+                {"name": "route-mini-2", "api_base": "https://mini.example/", "model": "gpt-4o-mini", "tier": "fast"},
+                {"name": "route-full-2", "api_base": "https://full.example/", "model": "gpt-4o", "tier": "strong"},
+            ],
+        })
+        client.routing = RoutingPolicy()
+
+        async def post(http_client, deployment, payload):
+            served.append(deployment.tier)
+            return {"choices": [{"message": {"content": "SELECT 1"}}]}
+
+        client._hedged_post = post
+        return client
+
+    # A long procedure full of dynamic SQL: only excerpts are sent, but the whole file is scored
+    procedure = "\n".join([SIMPLE_SQL + ";"] * 40 + [DYNAMIC_SQL])
+    detector = DynamicSQLDetector(routed(BaseAIClient()), PromptManager("prompts/index.yaml"))
+    await detector.analyze_risks_and_optimization(procedure)
+
+    task = NaturalLanguageToSQL(schema_file=os.path.join(project_root, "schema", "HealthClaimsDemo.json"))
+    routed(task.client)
+    await task.run("claims per patient")
+
+    assert served == ["strong", "strong"]
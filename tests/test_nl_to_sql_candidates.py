@@ -0,0 +1,73 @@
+import sys
+import os
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from tasks.natural_language_to_sql import NaturalLanguageToSQL  # Import after setting the path
+
+SCHEMA_PATH = os.path.join(project_root, "schema", "HealthClaimsDemo.json")
+GOOD_SQL = "SELECT p.FirstName, p.LastName FROM Patients p JOIN Claims c ON c.PatientID = p.PatientID WHERE c.DiagnosisCode = 'E11'"
+
+
+def delayed(*responses):
+    """
+    Fake completion returning responses in order, each after the given delay.
+    """
+    queue = list(responses)
+
+    async def complete(prompt, temperature=0.3):
+        delay, response = queue.pop(0)
+        await asyncio.sleep(delay)
+        return response
+
+    return AsyncMock(side_effect=complete)
+
+
+@pytest.mark.asyncio
+async def test_first_compiling_candidate_wins():
+    task = NaturalLanguageToSQL(schema_file=SCHEMA_PATH)
+    task.client.get_completion = delayed(
+        (0.0, "SELECT Name FROM Patients"),          # Unknown column
+        (0.05, GOOD_SQL),
+        (5.0, "SELECT 1"),                           # Never awaited
+    )
+
+    result = await asyncio.wait_for(task.run("diabetic patients", "SQLite", candidates=3), timeout=2)
+
+    assert result == GOOD_SQL
+    assert task.client.get_completion.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_retry_feeds_back_errors():
+    task = NaturalLanguageToSQL(schema_file=SCHEMA_PATH)
+    task.client.get_completion = delayed(
+        (0.0, "SELECT * FROM Patients WHERE"),       # SQLite syntax error
+        (0.0, "SELECT * FROM Patient"),              # Unknown table
+        (0.0, GOOD_SQL),
+        (0.0, GOOD_SQL),
+    )
+
+    result = await task.run("diabetic patients", "generic", candidates=2)
+
+    assert result == GOOD_SQL
+    retry_prompt = task.client.get_completion.call_args_list[2][0][0]
+    assert "Unknown table 'Patient'" in retry_prompt
+    assert "incomplete input" in retry_prompt
+
+
+@pytest.mark.asyncio
+async def test_unverified_candidate_is_flagged():
+    task = NaturalLanguageToSQL(schema_file=SCHEMA_PATH)
+    task.client.get_completion = AsyncMock(return_value="SELECT Nope FROM Claims")
+
+    result = await task.run("anything", "T-SQL", candidates=2)
+
+    assert task.client.get_completion.call_count == 4
+    assert result.startswith("-- Warning: query did not compile:")
+    assert result.endswith("SELECT Nope FROM Claims")
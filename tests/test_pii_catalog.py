@@ -0,0 +1,84 @@
+import sys
+import os
+import json
+import shutil
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from utils.pii_catalog import PIICatalog, batch_columns, build_pii_catalog, catalog_path_for  # Import after setting the path
+from tasks.sql_data_masker import SQLDataMasker
+
+SCHEMA = os.path.join(project_root, "schema", "HealthClaimsDemo.json")
+PII = {"Patients.FirstName": "name", "Patients.LastName": "name", "Patients.DateOfBirth": "date_of_birth", "Providers.ProviderName": "name"}
+
+
+class FakeClient:
+    def __init__(self):
+        self.batches = []
+
+    async def get_structured_completion(self, prompt, schema, name, temperature=0.3, max_tokens=None):
+        lines = prompt.messages[-1]["content"].splitlines()[1:]
+        columns = [f"{table}.{column}" for table, names in (line.split(": ") for line in lines) for column in names.split(", ")]
+        self.batches.append(columns)
+        return {"pii_columns": [{"column": column, "category": PII[column]} for column in columns if column in PII]}
+
+
+@pytest.mark.asyncio
+async def test_catalog_is_built_in_batches_and_updated_incrementally(tmp_path):
+    schema_path = str(tmp_path / "HealthClaimsDemo.json")
+    shutil.copy(SCHEMA, schema_path)
+    client = FakeClient()
+
+    catalog, stats = await build_pii_catalog(schema_path, client, batch_size=10)
+
+    assert [len(batch) for batch in client.batches] == [10, 9, 8]  # 27 columns, tables kept together
+    assert catalog.pii_columns == PII
+    assert (catalog.revision, stats["classified"]) == (1, 27)
+    assert PIICatalog.load(catalog_path_for(schema_path)).pii_columns == PII
+
+    # Unchanged schema: no LLM call, no new revision
+    client.batches.clear()
+    catalog, stats = await build_pii_catalog(schema_path, client, batch_size=10)
+    assert client.batches == [] and catalog.revision == 1
+
+    # One new column, one dropped table: only the new column is classified
+    with open(schema_path, "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    schema["Schema"] = [table for table in schema["Schema"] if table["TableName"] != "sysdiagrams"]
+    next(t for t in schema["Schema"] if t["TableName"] == "Patients")["Columns"].append({"ColumnName": "Email"})
+    with open(schema_path, "w", encoding="utf-8") as f:
+        json.dump(schema, f)
+    PII["Patients.Email"] = "email"
+
+    catalog, stats = await build_pii_catalog(schema_path, client, batch_size=10)
+
+    assert client.batches == [["Patients.Email"]]
+    assert stats == {"classified": 1, "kept": 22, "removed": 5}
+    assert catalog.revision == 2 and len(catalog.data["history"]) == 2
+    assert catalog.category("email") == "email"
+    del PII["Patients.Email"]
+
+
+def test_batches_keep_tables_together():
+    keys = [f"A.c{n}" for n in range(4)] + [f"B.c{n}" for n in range(4)] + [f"C.c{n}" for n in range(12)]
+    assert [len(batch) for batch in batch_columns(keys, size=10)] == [8, 10, 2]
+
+
+def test_masker_uses_catalog_without_llm():
+    catalog = PIICatalog({"columns": {
+        "Patients.LastName": {"pii": True, "category": "name"},
+        "Patients.PatientID": {"pii": False, "category": None},
+    }})
+    masker = SQLDataMasker(catalog=catalog)
+    query = "SELECT * FROM Patients p WHERE p.LastName = 'O''Brien' OR [LastName] IN (N'Smith', 'Jones') AND PatientID = 42"
+
+    masked = masker.mask_sensitive_data(query)
+
+    assert masked == (
+        "SELECT * FROM Patients p WHERE p.LastName = '[masked-name]' OR [LastName] IN (N'[masked-name]', '[masked-name]') AND PatientID = 42"
+    )
+    assert masker.detect_sensitive_data(query) == [("name", "O'Brien"), ("name", "Smith"), ("name", "Jones")]
+    assert SQLDataMasker().mask_sensitive_data(query) == query
@@ -0,0 +1,67 @@
+import sys
+import os
+import httpx
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from core.base_ai_client import BaseAIClient  # Import after setting the path
+from core.metrics import RunMetrics, cache_hit_ratios, run_metrics
+from utils.prompt_manager import PromptManager, prompt_messages
+
+
+def test_per_call_values_come_after_static_instructions():
+    first = PromptManager.load_prompt("commenter.add_comments", sql_query="SELECT 1", user="ana", timestamp="2026-01-01")
+    second = PromptManager.load_prompt("commenter.add_comments", sql_query="SELECT 2", user="bo", timestamp="2026-02-02")
+
+    assert [m["role"] for m in first.messages] == ["system", "user"]
+    assert first.messages[0] == second.messages[0]  # Identical, cacheable prefix
+    assert "2026-01-01" not in first.messages[0]["content"]
+    assert first.messages[-1]["content"].endswith("SELECT 1")
+    assert "SELECT 1" in first  # Still usable as plain text
+
+
+def test_schema_context_precedes_the_question():
+    prompt = PromptManager.load_prompt("nl_to_sql.convert", nl_query="Count patients", sql_dialect="T-SQL", schema='{"Patients": []}')
+
+    assert [m["role"] for m in prompt.messages] == ["system", "system", "user"]
+    assert '{"Patients": []}' in prompt.messages[1]["content"]
+    assert "Count patients" in prompt.messages[2]["content"]
+    assert prompt_messages("plain text") == [{"role": "user", "content": "plain text"}]
+
+
+@pytest.mark.asyncio
+async def test_client_sends_layout_and_records_cached_tokens():
+    client = BaseAIClient()
+    client.usage_label = "LayoutTest"
+    sent = []
+
+    class FakeHTTP:
+        async def post(self, url, json, headers):
+            sent.append(json["messages"])
+            return httpx.Response(200, request=httpx.Request("POST", url), json={
+                "choices": [{"message": {"content": "ok"}}],
+                "usage": {"prompt_tokens": 2000, "completion_tokens": 10, "prompt_tokens_details": {"cached_tokens": 1536}},
+            })
+
+    async def post(http_client, deployment, payload):
+        return await client._timed_post(FakeHTTP(), deployment, payload)
+
+    client._hedged_post = post
+    cached = run_metrics.get("prompt_cache.LayoutTest.cached_tokens")
+    prompt = PromptManager.load_prompt("explainer.step_by_step", sql_query="SELECT 1")
+
+    assert await client.get_completion(prompt) == "ok"
+    assert sent[0] == prompt.messages
+    assert run_metrics.get("prompt_cache.LayoutTest.cached_tokens") == cached + 1536
+
+
+def test_hit_ratio_in_summary():
+    metrics = RunMetrics()
+    metrics.increment("prompt_cache.SQLCommenter.prompt_tokens", 4000)
+    metrics.increment("prompt_cache.SQLCommenter.cached_tokens", 3072)
+
+    assert cache_hit_ratios(metrics.snapshot()["counters"]) == {"SQLCommenter": 0.768}
+    assert "prompt_cache.SQLCommenter.hit_ratio: 76.8%" in metrics.format_summary()
@@ -0,0 +1,93 @@
+import sys
+import os
+import json
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from core import cpu_pool  # Import after setting the path
+from utils.query_log import aggregate_query_log, aggregate_query_log_parallel, format_shape_table, read_query_log, top_shapes
+
+
+def test_query_store_csv_averages_are_multiplied_by_executions(tmp_path):
+    log = tmp_path / "query_store.csv"
+    log.write_text(
+        "query_id,query_sql_text,count_executions,avg_duration,avg_cpu_time\n"
+        "1,\"SELECT * FROM Claims WHERE PatientID = 42\",10,2000,1000\n"
+        "2,\"select * from claims where patientid = 7\",30,1000,500\n"
+        "3,\"SELECT COUNT(*) FROM Patients\",1,500000,400000\n",
+        encoding="utf-8",
+    )
+
+    shapes = aggregate_query_log(str(log))
+
+    assert len(shapes) == 2
+    claims = next(shape for shape in shapes.values() if shape.count == 40)
+    assert claims.total_duration_ms == pytest.approx(50.0)  # 10 x 2 ms + 30 x 1 ms
+    assert claims.total_cpu_ms == pytest.approx(25.0)
+    assert claims.sample_sql == "SELECT * FROM Claims WHERE PatientID = 42"
+
+
+def test_pg_stat_statements_jsonl_and_ranking(tmp_path):
+    log = tmp_path / "pg_stat_statements.jsonl"
+    rows = [
+        {"query": "SELECT * FROM orders WHERE id = $1", "calls": 100000, "total_exec_time": 900.0},
+        {"query": "SELECT * FROM report_view", "calls": 3, "total_exec_time": 45000.0},
+        {"query": "UPDATE stock SET qty = qty - 1 WHERE sku = 'A'", "calls": 2000, "total_exec_time": 200.0},
+        {"query": "update stock set qty = qty - 5 where sku = 'B'", "calls": 3000, "total_exec_time": 300.0},
+    ]
+    log.write_text("\n".join(json.dumps(row) for row in rows) + "\nnot json\n", encoding="utf-8")
+
+    shapes = aggregate_query_log(str(log))
+
+    by_duration = top_shapes(shapes, 2)
+    assert [shape.sample_sql for shape in by_duration] == ["SELECT * FROM report_view", "SELECT * FROM orders WHERE id = $1"]
+    assert top_shapes(shapes, 1, rank_by="count")[0].count == 100000
+    assert top_shapes(shapes, 3)[2].count == 5000
+
+    table = format_shape_table(by_duration, sum(shape.total_duration_ms for shape in shapes.values()))
+    assert "97.0%" in table  # 45000 / 46400
+
+
+def test_extended_events_rows_count_once_each(tmp_path):
+    log = tmp_path / "xevents.tsv"
+    log.write_text(
+        "event_name\tstatement\tduration\tcpu_time\n"
+        "sql_statement_completed\tEXEC dbo.GetClaims @id = 1\t1500\t1000\n"
+        "sql_statement_completed\tEXEC dbo.GetClaims @id = 2\t2500\t1000\n",
+        encoding="utf-8",
+    )
+
+    assert list(read_query_log(str(log))) == [
+        ("EXEC dbo.GetClaims @id = 1", 1.0, 1.5, 1.0),
+        ("EXEC dbo.GetClaims @id = 2", 1.0, 2.5, 1.0),
+    ]
+    (shape,) = aggregate_query_log(str(log)).values()
+    assert shape.count == 2 and shape.total_duration_ms == pytest.approx(4.0)
+
+
+def test_missing_statement_column_is_reported(tmp_path):
+    log = tmp_path / "bad.csv"
+    log.write_text("id,duration\n1,5\n", encoding="utf-8")
+
+    with pytest.raises(ValueError, match="No statement text column"):
+        aggregate_query_log(str(log))
+
+
+@pytest.mark.asyncio
+async def test_parallel_aggregation_matches_single_process(tmp_path, monkeypatch):
+    log = tmp_path / "big.csv"
+    lines = ["query_sql_text,calls,total_exec_time"]
+    lines += [f"\"SELECT c{i % 7} FROM t{i % 7} WHERE id = {i}\",{i % 3 + 1},{i % 11}" for i in range(2000)]
+    log.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    monkeypatch.setattr(cpu_pool, "INLINE_MAX_CHARS", 0)
+
+    parallel = await aggregate_query_log_parallel(str(log), batch_rows=150)
+    single = aggregate_query_log(str(log))
+
+    assert list(parallel) == list(single)
+    for fingerprint, shape in single.items():
+        other = parallel[fingerprint]
+        assert (other.sample_sql, other.count, other.total_duration_ms, other.rows) == (shape.sample_sql, shape.count, shape.total_duration_ms, shape.rows)
@@ -0,0 +1,46 @@
+import sys
+import os
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from learn.quiz_pool import QuizQuestionPool, normalize_concept, parse_quiz_response
+
+QUIZ_JSON = '{"question": "Which clause filters groups?", "options": ["a) WHERE", "b) HAVING"], "answer": "B", "concept": "having"}'
+
+
+def test_parse_json_inside_markdown():
+    quiz = parse_quiz_response(f"Here you go:\n```json\n{QUIZ_JSON}\n```")
+    assert quiz["answer"] == "b"
+    assert quiz["options"] == ["a) WHERE", "b) HAVING"]
+
+
+def test_parse_python_literal_without_eval():
+    raw = "{'question': 'Q?', 'options': ['a) 1', 'b) 2'], 'answer': 'a', 'concept': 'JOIN'}"
+    assert parse_quiz_response(raw)["concept"] == "JOIN"
+
+
+@pytest.mark.parametrize("raw", [
+    "no object here",
+    "{'question': __import__('os').getcwd(), 'options': [], 'answer': 'a', 'concept': 'X'}",
+    '{"question": "Q?", "options": ["a) 1", "b) 2"], "answer": "a"}',
+])
+def test_parse_rejects_invalid_or_unsafe_input(raw):
+    with pytest.raises(ValueError):
+        parse_quiz_response(raw)
+
+
+def test_pool_deduplicates_and_persists(tmp_path):
+    path = str(tmp_path / "pool.json")
+    pool = QuizQuestionPool(path)
+    quiz = parse_quiz_response(QUIZ_JSON)
+    assert pool.add(quiz)
+    assert not pool.add(dict(quiz, question="  which CLAUSE filters groups? "))
+    pool.save()
+
+    reloaded = QuizQuestionPool(path)
+    assert len(reloaded) == 1
+    assert reloaded.pick(set())["concept"] == "having"
+    assert reloaded.pick({normalize_concept("HAVING")}) is None
@@ -0,0 +1,113 @@
+import sys
+import os
+import sqlite3
+import pytest
+from unittest.mock import AsyncMock
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from tasks.sql_refactorer import SQLRefactorer  # Import after setting the path
+from utils.refactor_verifier import Verification, connect, format_speedup_table, result_fingerprint, verify_refactor
+
+ORIGINAL = "SELECT department, COUNT(*) FROM employees WHERE salary > 100 GROUP BY department"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "verify.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE employees (id INTEGER PRIMARY KEY, department TEXT, salary REAL)")
+    conn.executemany("INSERT INTO employees (department, salary) VALUES (?, ?)",
+                     [(f"d{i % 7}", float(i % 300)) for i in range(3000)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_fingerprint_ignores_row_order(db_path):
+    conn = connect(db_path)
+    ascending = result_fingerprint(conn, "SELECT id, department FROM employees ORDER BY id")
+    descending = result_fingerprint(conn, "SELECT id, department FROM employees ORDER BY id DESC")
+    duplicated = result_fingerprint(conn, "SELECT id, department FROM employees UNION ALL SELECT 1, 'd1'")
+    conn.close()
+    assert ascending == descending
+    assert ascending[0][0] == 3000
+    assert duplicated != ascending  # Multisets: an extra duplicate row changes the hash
+
+
+def test_equivalent_refactor_is_kept(db_path):
+    refactored = (
+        "WITH high_paid AS (SELECT department FROM employees WHERE salary > 100)\n"
+        "SELECT department, COUNT(*) FROM high_paid GROUP BY department ORDER BY department DESC"
+    )
+    verification = verify_refactor(db_path, ORIGINAL, refactored, repetitions=3, tolerance=10.0)
+    assert verification.equivalent and verification.keep
+    assert verification.original_seconds > 0 and verification.speedup > 0
+
+
+def test_different_results_are_rejected(db_path):
+    verification = verify_refactor(db_path, ORIGINAL, ORIGINAL.replace("> 100", ">= 100"))
+    assert not verification.equivalent and not verification.keep
+    assert verification.reason.startswith("results differ")
+
+
+def test_failing_refactor_is_rejected(db_path):
+    verification = verify_refactor(db_path, ORIGINAL, "SELECT department FROM staff")
+    assert not verification.keep
+    assert "refactored query failed: no such table: staff" == verification.reason
+
+
+def test_numeric_types_compare_by_value(db_path):
+    conn = connect(db_path)
+    assert result_fingerprint(conn, "SELECT 1, 2.5") == result_fingerprint(conn, "SELECT 1.0, 2.5")
+    conn.close()
+
+
+def test_data_changes_are_compared(db_path):
+    original = "UPDATE employees SET salary = salary + 1 WHERE salary > 2"
+    verification = verify_refactor(db_path, original, "DELETE FROM employees")
+    assert not verification.equivalent and not verification.keep
+
+    # Same rows changed in the same way
+    refactored = "UPDATE employees SET salary = salary + 1 WHERE NOT salary <= 2"
+    verification = verify_refactor(db_path, original, refactored, repetitions=3, tolerance=10.0)
+    assert verification.equivalent and verification.keep
+
+    # Same row count, different contents
+    verification = verify_refactor(db_path, original, original.replace("+ 1", "+ 2"))
+    assert not verification.equivalent
+
+    # Changes are rolled back after verification
+    conn = connect(db_path)
+    assert conn.execute("SELECT COUNT(*), SUM(salary) FROM employees").fetchone() == (3000, sum(float(i % 300) for i in range(3000)))
+    conn.close()
+
+
+def test_script_without_results_or_changes_is_not_kept(db_path):
+    script = "CREATE TEMP TABLE scratch (id INTEGER); INSERT INTO scratch VALUES (1)"
+    verification = verify_refactor(db_path, script, "SELECT 1")
+    assert not verification.keep and verification.reason.startswith("not verifiable")
+
+
+def test_speedup_table():
+    table = format_speedup_table([
+        ("a.sql", Verification(True, 0.004, 0.002, 2.0, True, "equivalent and not slower")),
+        ("b.sql", Verification(False, None, None, None, False, "results differ (3 vs 4 rows)")),
+    ])
+    lines = table.splitlines()
+    assert lines[0].split() == ["File", "Equivalent", "Original", "ms", "Refactored", "ms", "Speedup", "Kept"]
+    assert "2.00x" in lines[2] and lines[2].endswith("yes")
+    assert lines[3].endswith("no (results differ (3 vs 4 rows))")
+
+
+@pytest.mark.asyncio
+async def test_refactorer_returns_original_when_not_equivalent(db_path):
+    task = SQLRefactorer(db_path=db_path, repetitions=2)
+    task.client.get_completion = AsyncMock(return_value="SELECT department, COUNT(*) FROM employees GROUP BY department")
+
+    result = await task.run(ORIGINAL)
+
+    assert result == ORIGINAL
+    assert task.last_verification is not None and not task.last_verification.keep
@@ -0,0 +1,187 @@
+import sys
+import os
+import asyncio
+import httpx
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from core.base_ai_client import BaseAIClient  # Import after setting the path
+from core.deployment_pool import DeploymentPool
+from core.metrics import run_metrics
+from core.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    backoff_delay,
+    is_retryable,
+    retry_after_seconds,
+)
+
+OK = {"choices": [{"message": {"content": "ok"}}]}
+
+
+def _status_error(status_code, headers=None):
+    request = httpx.Request("POST", "https://example.invalid/")
+    response = httpx.Response(status_code, headers=headers or {}, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+def test_retryable_classification():
+    assert is_retryable(_status_error(429))
+    assert is_retryable(_status_error(503))
+    assert is_retryable(httpx.ConnectTimeout("timeout"))
+    assert not is_retryable(_status_error(400))
+    assert not is_retryable(ValueError("bad payload"))
+
+
+def test_retry_after_header():
+    assert retry_after_seconds(_status_error(429, {"retry-after": "3"})) == 3.0
+    assert retry_after_seconds(_status_error(429, {"retry-after-ms": "250"})) == 0.25
+    assert retry_after_seconds(_status_error(500)) is None
+    assert retry_after_seconds(_status_error(429, {"retry-after": "600"}), cap=20.0) == 20.0
+    assert retry_after_seconds(_status_error(429, {"retry-after-ms": "90000"}), cap=20.0) == 20.0
+
+
+def test_backoff_delay_is_capped():
+    for attempt in range(10):
+        delay = backoff_delay(attempt, base=0.5, cap=4.0)
+        assert 0 <= delay <= min(4.0, 0.5 * 2 ** attempt)
+
+
+def test_latency_percentile():
+    tracker = LatencyTracker()
+    for value in range(1, 101):
+        tracker.record(value / 100)
+    assert tracker.percentile(95) == 0.95
+    assert tracker.percentile(50) == 0.5
+
+
+def test_circuit_breaker_opens_and_recovers():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.0)
+    assert breaker.allow_request()
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # Reset timeout elapsed: exactly one half-open probe is allowed
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_fails_fast_while_open():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+    breaker.record_failure()
+    assert not breaker.allow_request()
+
+
+def _client(monkeypatch, handler, hosts, **config):
+    """
+    A client whose deployments (one per host) are served by `handler` instead of the network.
+    Breakers and latency trackers are shared per endpoint, so hosts must be unique to a test.
+    """
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs))
+    client = BaseAIClient()
+    client.pool = DeploymentPool.from_config(dict({
+        "AOPAI_KEY": "key",
+        "AOPAI_API_VERSION": "2025-01-01-preview",
+        "AOPAI_DEPLOYMENTS": [{"name": host, "api_base": f"https://{host}/", "model": "gpt-4o"} for host in hosts],
+    }, **config))
+    client.routing = client.tier = client.hedge_percentile = None
+    client.max_retries, client.backoff_base, client.backoff_max = 3, 0.01, 0.05
+    return client
+
+
+@pytest.mark.asyncio
+async def test_throttled_request_waits_capped_retry_after(monkeypatch):
+    responses = [httpx.Response(429, headers={"retry-after": "600"}), httpx.Response(200, json=OK)]
+    client = _client(monkeypatch, lambda request: responses.pop(0), ["retry-throttled.example"])
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay):
+        delays.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    assert await client.get_completion("prompt") == "ok"
+    assert delays == [client.backoff_max]
+
+
+@pytest.mark.asyncio
+async def test_failed_deployment_fails_over_without_waiting(monkeypatch):
+    served = []
+
+    def handler(request):
+        served.append(request.url.host)
+        return httpx.Response(503 if request.url.host == "retry-down.example" else 200, json=OK)
+
+    client = _client(monkeypatch, handler, ["retry-down.example", "retry-up.example"])
+    failovers = run_metrics.get("llm.failovers")
+
+    assert await client.get_completion("prompt") == "ok"
+    assert served == ["retry-down.example", "retry-up.example"]
+    assert run_metrics.get("llm.failovers") == failovers + 1
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_rejects_without_calling(monkeypatch):
+    served = []
+
+    def handler(request):
+        served.append(request.url.host)
+        return httpx.Response(503)
+
+    client = _client(monkeypatch, handler, ["retry-broken.example"], LLM_BREAKER_THRESHOLD=1)
+    client.max_retries = 0
+
+    with pytest.raises(RuntimeError, match="503"):
+        await client.get_completion("prompt")
+    with pytest.raises(CircuitOpenError):
+        await client.get_completion("prompt")
+    assert served == ["retry-broken.example"]
+
+
+@pytest.mark.asyncio
+async def test_hedge_on_another_deployment_wins(monkeypatch):
+    async def handler(request):
+        if request.url.host == "hedge-slow.example":
+            await asyncio.sleep(0.5)
+            return httpx.Response(200, json={"choices": [{"message": {"content": "slow"}}]})
+        return httpx.Response(200, json={"choices": [{"message": {"content": "fast"}}]})
+
+    client = _client(monkeypatch, handler, ["hedge-slow.example", "hedge-fast.example"])
+    client.hedge_percentile, client.hedge_min_samples = 95, 1
+    client.pool.deployments[0].latency.record(0.01)  # Hedge once the primary takes longer than 10 ms
+    wins = run_metrics.get("llm.hedge_wins")
+
+    assert await client.get_completion("prompt") == "fast"
+    assert run_metrics.get("llm.hedge_wins") == wins + 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_releases_half_open_circuit(monkeypatch):
+    async def handler(request):
+        await asyncio.sleep(10)
+        return httpx.Response(200, json=OK)
+
+    client = _client(monkeypatch, handler, ["hedge-probe.example"], LLM_BREAKER_THRESHOLD=1, LLM_BREAKER_RESET=0.0)
+    deployment = client.pool.deployments[0]
+    deployment.breaker.record_failure()
+    assert deployment.breaker.allow_request()  # The half-open probe
+
+    async with httpx.AsyncClient() as http:
+        probe = asyncio.ensure_future(client._timed_post(http, deployment, {}))
+        await asyncio.sleep(0.01)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+    # Neither success nor failure: still half-open, and another probe may go out
+    assert deployment.breaker.state == CircuitBreaker.HALF_OPEN
+    assert deployment.breaker.allow_request()
@@ -0,0 +1,92 @@
+import sys
+import os
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from utils.sharding import assign_shards, parse_shard, shard_files  # Import after setting the path
+from utils.findings import Finding, read_findings_report, write_findings_report
+from utils.job_journal import DONE, JobJournal, load_journal, merge_journals
+
+FILES = [f"/checkout/queries/team{n % 7}/q{n}.sql" for n in range(400)]
+
+
+def test_shards_are_disjoint_complete_and_stable():
+    shards = [shard_files(FILES, "/checkout/queries", i, 20) for i in range(1, 21)]
+
+    assert sorted(sum(shards, [])) == sorted(FILES)
+    assert all(shards)
+    # Another runner's checkout location does not matter, only the relative path
+    moved = [file.replace("/checkout", "/runner/work") for file in FILES]
+    assert shard_files(moved, "/runner/work/queries", 3, 20) == [file.replace("/checkout", "/runner/work") for file in shards[2]]
+    # New files never move existing ones
+    grown = assign_shards(FILES + ["/checkout/queries/new.sql"], "/checkout/queries", 20)
+    assert all(grown[file] == shard for file, shard in assign_shards(FILES, "/checkout/queries", 20).items())
+
+
+def test_balanced_shards_even_out_token_load():
+    loads = {file: 50 for file in FILES}
+    loads.update({file: 3000 for file in FILES[:16]})  # A few large files
+    count = 8
+
+    def spread(assignment):
+        totals = [0] * count
+        for file, shard in assignment.items():
+            totals[shard] += loads[file]
+        return max(totals) / (sum(totals) / count)
+
+    balanced = assign_shards(FILES, "/checkout/queries", count, balance=True, loads=loads)
+
+    assert sorted(balanced) == sorted(FILES)
+    assert spread(balanced) < 1.1
+    assert spread(balanced) <= spread(assign_shards(FILES, "/checkout/queries", count))
+
+
+def test_parse_shard():
+    assert parse_shard("3/20") == (3, 20)
+    for spec in ("0/20", "21/20", "3", "a/b"):
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+
+
+def test_merge_shard_journals_and_reports(tmp_path):
+    shard_dir = str(tmp_path / "shards")
+    # Runners with different checkout roots journal the same relative keys
+    with JobJournal("shard1", directory=shard_dir, root="/runner1/repo") as journal:
+        journal.start_run(task="analyze", path="/runner1/repo", recursive=True, files=2, shard="1/2", discovery={"exclude": ["vendor/"]})
+        journal.started("/runner1/repo/a.sql", "analyze", "in-a")
+        journal.done("/runner1/repo/a.sql", "/runner1/repo/a.sql", "out-a")
+        journal.started("/runner1/repo/sub/b.sql", "analyze", "in-b")
+        journal.failed("/runner1/repo/sub/b.sql", "timeout")
+    with JobJournal("shard2", directory=shard_dir, root="/runner2/checkout") as journal:
+        journal.start_run(task="analyze", path="/runner2/checkout", recursive=True, files=1, shard="2/2")
+        journal.started("/runner2/checkout/c.sql", "analyze", "in-c")
+        journal.done("/runner2/checkout/c.sql", "/runner2/checkout/c.sql", "out-c")
+        journal.started("/runner2/checkout/sub/b.sql", "analyze", "in-b")
+        journal.done("/runner2/checkout/sub/b.sql", "/runner2/checkout/sub/b.sql", "out-b")
+
+    paths = [os.path.join(shard_dir, "shard1.jsonl"), os.path.join(shard_dir, "shard2.jsonl")]
+    merged, statuses = merge_journals(paths, "merged", task="analyze", directory=str(tmp_path))
+    header, files = load_journal(merged)
+
+    assert statuses == {DONE: 3}
+    assert sorted(files) == ["a.sql", "c.sql", "sub/b.sql"]
+    assert header["files"] == 3 and header["merged"] == ["shard1", "shard2"]
+    assert header["discovery"] == {"exclude": ["vendor/"]}  # Restored by --resume
+    assert files["c.sql"]["input_hash"] == "in-c"
+    # A resumed run resolves the keys against its own --path
+    with JobJournal("resumed", directory=str(tmp_path), root="/runner3/src") as resumed:
+        assert resumed.key("/runner3/src/sub/b.sql") == "sub/b.sql"
+    with pytest.raises(ValueError):
+        merge_journals(paths, "other", task="audit", directory=str(tmp_path))
+
+    finding = Finding("perf.scan", "high", 1, 1, "Full scan", "Add an index")
+    write_findings_report(str(tmp_path / "r1.json"), "analyze", [("a.sql", [finding])])
+    write_findings_report(str(tmp_path / "r2.json"), "analyze", [("c.sql", [finding, finding])])
+    entries = read_findings_report(str(tmp_path / "r1.json"))[1] + read_findings_report(str(tmp_path / "r2.json"))[1]
+    report = write_findings_report(str(tmp_path / "merged.json"), "analyze", entries)
+
+    assert (report["files"], report["findings"]) == (2, 3)
+    assert entries[0] == ("a.sql", [finding])
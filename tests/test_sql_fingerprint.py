@@ -0,0 +1,47 @@
+import sys
+import os
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from core import cpu_pool  # Import after setting the path
+from utils.sql_fingerprint import fingerprint_file, fingerprint_sql, group_by_fingerprint, normalize_sql, text_fingerprint
+
+
+def test_normalize_strips_literals_case_whitespace_and_comments():
+    sql = "SELECT * FROM [Claims] WHERE PatientID = 42 AND Code IN ('A', 'B', N'C')  -- tenant 7\n;"
+    assert normalize_sql(sql) == "select * from claims where patientid = ? and code in ( ? )"
+
+
+def test_copies_share_a_fingerprint():
+    a = "SELECT TOP 10 c.ClaimID\nFROM dbo.Claims c\nWHERE c.ClaimDate >= '2024-01-01' /* tenant A */"
+    b = "select top 50 C.CLAIMID from DBO.\"Claims\" C where C.claimdate >= '2023-06-30';"
+    assert fingerprint_sql(a) == fingerprint_sql(b)
+
+
+def test_different_shapes_differ():
+    assert fingerprint_sql("SELECT a FROM t WHERE x = 1") != fingerprint_sql("SELECT a FROM t WHERE y = 1")
+    assert fingerprint_sql("SELECT a FROM t WHERE x = @p") != fingerprint_sql("SELECT a FROM t WHERE x = 1")
+
+
+def test_text_fingerprint_keeps_literals_and_lines():
+    sql = "SELECT a\nFROM t\nWHERE x = 1\n"
+    assert text_fingerprint(sql) == text_fingerprint("SELECT a  \r\nFROM t\r\nWHERE x = 1")
+    assert text_fingerprint(sql) != text_fingerprint(sql.replace("1", "2"))
+    assert text_fingerprint(sql) != text_fingerprint("SELECT a FROM t\nWHERE x = 1\n")  # Other line numbers
+
+
+@pytest.mark.asyncio
+async def test_group_files_in_cpu_pool(tmp_path):
+    paths = []
+    for i, sql in enumerate(["SELECT 1 FROM t WHERE id = 5", "SELECT b FROM u", "select 1 from T where ID = 99"]):
+        path = tmp_path / f"q{i}.sql"
+        path.write_text(sql, encoding="utf-8")
+        paths.append(str(path))
+
+    fingerprints = await cpu_pool.map_cpu_bound(fingerprint_file, paths)
+    groups = group_by_fingerprint(paths, fingerprints)
+
+    assert list(groups.values()) == [[paths[0], paths[2]], [paths[1]]]
@@ -0,0 +1,83 @@
+import sys
+import os
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from utils.sql_formatter import format_sql, style_for  # Import after setting the path
+
+QUERY = (
+    "select top 10 p.Name n, count(*) claims from dbo.Patients p "
+    "left join Claims c on c.PatientID = p.PatientID and c.Amount between 10 and 20 "
+    "where p.Active = 1 and (p.Age > 65 or p.Age < -1) and p.ID in (select PatientID from Vip) "
+    "group by p.Name order by claims desc;"
+)
+
+
+def test_query_layout():
+    assert format_sql(QUERY, "T-SQL") == (
+        "SELECT TOP 10\n"
+        "    p.Name AS n,\n"
+        "    count(*) AS claims\n"
+        "FROM dbo.Patients AS p\n"
+        "LEFT JOIN Claims AS c ON c.PatientID = p.PatientID\n"
+        "    AND c.Amount BETWEEN 10 AND 20\n"
+        "WHERE p.Active = 1\n"
+        "    AND (p.Age > 65 OR p.Age < -1)\n"
+        "    AND p.ID IN (\n"
+        "        SELECT PatientID\n"
+        "        FROM Vip\n"
+        "    )\n"
+        "GROUP BY p.Name\n"
+        "ORDER BY claims DESC;\n"
+    )
+
+
+@pytest.mark.parametrize("dialect,overrides", [
+    ("T-SQL", None),
+    ("PostgreSQL", {"default": {"commas": "leading", "keyword_case": "lower"}}),
+    ("Oracle", {"oracle": {"indent": 2}}),
+])
+def test_formatting_is_idempotent(dialect, overrides):
+    sql = (
+        "WITH recent AS (select a, b -- why\n from t where x = 1), other AS (select 1 one)\n"
+        "SELECT r.a, o.one FROM recent r JOIN other o ON 1 = 1;\n"
+        "CREATE TABLE t (id INT   \n);\n"
+        "UPDATE t SET a = 1, b = CASE WHEN c > 1 THEN 'x' ELSE 'y' END WHERE id = @id\n"
+    )
+    style = style_for(dialect, overrides)
+    once = format_sql(sql, dialect, style)
+    assert format_sql(once, dialect, style) == once
+    assert "-- why" in once and "create table t (id int\n);" in once.lower()
+
+
+def test_dialect_styles():
+    sql = "select a x, b from t y join u on u.id = y.id"
+    postgres = style_for("PostgreSQL", {"default": {"commas": "leading"}, "postgres": {"keyword_case": "lower"}})
+
+    assert format_sql(sql, "PostgreSQL", postgres) == (
+        "select\n    a as x\n    , b\nfrom t as y\njoin u on u.id = y.id\n"
+    )
+    # Oracle rejects AS before table aliases
+    assert format_sql(sql, "Oracle") == "SELECT\n    a AS x,\n    b\nFROM t y\nJOIN u ON u.id = y.id\n"
+
+
+def test_non_queries_and_unsafe_layouts_keep_their_lines():
+    procedure = (
+        "create procedure p as\n"
+        "begin\n"
+        "    if @x = 1 print 'one'   \n"
+        "    merge into t using s on t.id = s.id when matched then update set a = s.a;\n"
+        "end\n"
+    )
+    assert format_sql(procedure, "T-SQL") == (
+        "CREATE PROCEDURE p AS\n"
+        "BEGIN\n"
+        "    IF @x = 1 PRINT 'one'\n"
+        "    MERGE INTO t USING s ON t.id = s.id WHEN MATCHED THEN UPDATE SET a = s.a;\n"
+        "END\n"
+    )
+    # Unbalanced parentheses: left as written
+    assert format_sql("select (a from t", "T-SQL") == "SELECT (a FROM t\n"
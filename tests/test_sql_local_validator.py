@@ -0,0 +1,141 @@
+import sys
+import os
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from utils.schema_index import SchemaIndex  # Import after setting the path
+from utils.sql_local_validator import ERROR, WARNING, LocalSQLValidator
+
+
+@pytest.fixture(scope="module")
+def validator():
+    return LocalSQLValidator(SchemaIndex.from_file(os.path.join(project_root, "schema", "HealthClaimsDemo.json")))
+
+
+def messages(issues):
+    return [(issue.severity, issue.line, issue.message) for issue in issues]
+
+
+def test_valid_query_with_aliases_and_fk_join(validator):
+    sql = (
+        "SELECT c.ClaimID, p.FirstName AS fn, SUM(c.PaidAmount) total\n"
+        "FROM dbo.Claims c WITH (NOLOCK)\n"
+        "INNER JOIN Patients p ON c.PatientID = p.PatientID\n"
+        "WHERE c.ClaimDate >= DATEADD(day, -30, GETDATE()) AND PaidAmount > 0\n"
+        "GROUP BY c.ClaimID, p.FirstName ORDER BY total DESC;"
+    )
+    assert validator.validate(sql) == []
+
+
+def test_column_alias_forms(validator):
+    sql = (
+        "SELECT c.ClaimID, CASE WHEN c.PaidAmount > 0 THEN 1 ELSE 0 END flag FROM Claims c ORDER BY flag;\n"
+        "SELECT Total = SUM(PaidAmount), TOP_ID = MAX(ClaimID) FROM Claims;\n"
+        "SELECT TOP 5 Amount = LEFT(ClaimID, 2), COUNT(*) n FROM Claims WHERE PaidAmount = 1 GROUP BY ClaimID"
+    )
+    assert validator.validate(sql) == []
+    # `name = expr` outside a select list is still a column reference
+    assert messages(validator.validate("SELECT ClaimID FROM Claims WHERE Total = 1")) == [
+        (ERROR, 1, "Unknown column 'Total' (tables in scope: Claims)"),
+    ]
+
+
+def test_unknown_table_and_columns_are_located(validator):
+    issues = validator.validate("SELECT c.ClaimIDX\nFROM Claims c\nWHERE Amount > 1;\nSELECT * FROM Claimz")
+    assert messages(issues) == [
+        (ERROR, 1, "Unknown column 'ClaimIDX' in table 'Claims'"),
+        (ERROR, 3, "Unknown column 'Amount' (tables in scope: Claims)"),
+        (ERROR, 4, "Unknown table 'Claimz'"),
+    ]
+    assert (issues[0].col, issues[1].col) == (10, 7)
+
+
+def test_unknown_alias(validator):
+    issues = validator.validate("SELECT x.ClaimID FROM Claims c")
+    assert messages(issues) == [(ERROR, 1, "Unknown table or alias 'x'")]
+
+
+def test_non_fk_join_is_a_warning(validator):
+    issues = validator.validate("SELECT * FROM Claims c JOIN Patients p ON c.ProviderID = p.PatientID")
+    assert len(issues) == 1 and issues[0].severity == WARNING
+    assert "expected Claims.PatientID = Patients.PatientID" in issues[0].message
+    assert not LocalSQLValidator.has_errors(issues)
+
+
+def test_ctes_derived_tables_and_temp_tables(validator):
+    sql = """
+    WITH recent AS (SELECT PatientID, COUNT(*) n FROM Claims GROUP BY PatientID)
+    SELECT r.PatientID, r.n, p.LastName FROM recent r JOIN Patients p ON p.PatientID = r.PatientID;
+    SELECT x.PatientID FROM (SELECT PatientID FROM Claims) x;
+    SELECT ClaimID INTO #tmp FROM Claims;
+    SELECT t.ClaimID, t.Anything FROM #tmp t;
+    SELECT name FROM sys.tables;
+    """
+    assert validator.validate(sql) == []
+
+
+def test_procedure_body(validator):
+    sql = """CREATE PROCEDURE dbo.GetClaims @PatientID INT AS
+BEGIN
+  SET NOCOUNT ON;
+  DECLARE @total MONEY;
+  SELECT @total = SUM(PaidAmount) FROM Claims WHERE PatientID = @PatientID;
+  UPDATE c SET PaidAmount = 0 FROM Claims c WHERE c.ClaimID = 1;
+  SELECT CASE WHEN Gender = 'F' THEN 'x' ELSE 'y' END AS g FROM Patients ORDER BY g
+END"""
+    assert validator.validate(sql) == []
+
+
+@pytest.mark.parametrize("sql, unknown", [
+    ("CREATE PROCEDURE dbo.GetX AS SELECT Bogus FROM Claims", "'Bogus' (tables in scope: Claims)"),
+    ("CREATE VIEW dbo.vX AS SELECT c.Bogus FROM dbo.Claims c", "'Bogus' in table 'Claims'"),
+    ("CREATE OR ALTER PROCEDURE dbo.GetX @id INT AS SELECT Bogus FROM Claims WHERE ClaimID = @id",
+     "'Bogus' (tables in scope: Claims)"),
+    ("ALTER PROC dbo.GetX AS SELECT Bogus FROM Claims", "'Bogus' (tables in scope: Claims)"),
+    ("CREATE FUNCTION dbo.fX (@id INT) RETURNS TABLE AS RETURN SELECT Bogus FROM Claims WHERE ClaimID = @id",
+     "'Bogus' (tables in scope: Claims)"),
+])
+def test_module_name_is_not_a_table(validator, sql, unknown):
+    assert validator.validate(sql.replace("Bogus", "ClaimDate")) == []
+    # The body is still checked
+    assert messages(validator.validate(sql)) == [(ERROR, 1, f"Unknown column {unknown}")]
+
+
+def test_trigger_pseudo_tables(validator):
+    sql = ("CREATE TRIGGER dbo.trX ON dbo.Claims AFTER INSERT, UPDATE AS "
+           "SELECT i.ClaimID FROM inserted i JOIN deleted d ON d.ClaimID = i.ClaimID")
+    assert validator.validate(sql) == []
+    sql = "UPDATE Claims SET PaidAmount = 0 OUTPUT inserted.ClaimDate, deleted.PaidAmount, x.ClaimID WHERE ClaimID = 1"
+    assert messages(validator.validate(sql)) == [(ERROR, 1, "Unknown table or alias 'x'")]
+
+
+def test_merge(validator):
+    sql = ("MERGE Claims AS tg USING (SELECT ClaimID, PaidAmount FROM Claims) AS src ON tg.ClaimID = src.ClaimID "
+           "WHEN MATCHED THEN UPDATE SET tg.PaidAmount = src.PaidAmount "
+           "WHEN NOT MATCHED THEN INSERT (ClaimID) VALUES (src.ClaimID);")
+    assert validator.validate(sql) == []
+    assert messages(validator.validate(sql.replace("tg.PaidAmount =", "tg.Bogus ="))) == [
+        (ERROR, 1, "Unknown column 'Bogus' in table 'Claims'"),
+    ]
+
+
+def test_pivot_and_unpivot(validator):
+    sql = """
+    SELECT PatientID, [2020], [2021] FROM (SELECT PatientID, YEAR(ClaimDate) AS y, PaidAmount FROM Claims) s
+    PIVOT (SUM(PaidAmount) FOR y IN ([2020], [2021])) AS pv ORDER BY pv.[2020];
+    SELECT PatientID, Kind, Amount FROM (SELECT PatientID, PaidAmount FROM Claims) s
+    UNPIVOT (Amount FOR Kind IN (PaidAmount)) AS u
+    """
+    assert validator.validate(sql) == []
+
+
+def test_syntax_errors_without_schema():
+    validator = LocalSQLValidator()
+    assert messages(validator.validate("SELECT (1 FROM t")) == [(ERROR, 1, "Unclosed parenthesis")]
+    assert messages(validator.validate("SELECT 1)")) == [(ERROR, 1, "Unmatched closing parenthesis")]
+    assert messages(validator.validate("SELECT 'abc FROM t")) == [(ERROR, 1, "Unterminated string literal")]
+    assert messages(validator.validate("SELECT 1 /* note")) == [(ERROR, 1, "Unterminated block comment")]
+    assert validator.validate("SELECT 'it''s' FROM anything") == []
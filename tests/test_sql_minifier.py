@@ -0,0 +1,70 @@
+import sys
+import os
+import pytest
+from unittest.mock import AsyncMock
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from core.metrics import run_metrics  # Import after setting the path
+from tasks.sql_analyzer import SQLAnalyzer
+from tasks.sql_refactorer import SQLRefactorer
+from utils.sql_minifier import minify_sql, remap_line_references
+
+SQL = """/******************************************
+ * Claims report
+ * Change log: 2019-01-01 created
+ ******************************************/
+
+SELECT   c.ClaimID,          -- the claim
+         c.PaidAmount
+FROM     Claims c /* main table */ WHERE c.Note = 'a  --  b'
+
+        AND c.Text = 'multi
+line'   ORDER BY 1;
+SELECT /*+ INDEX(c IX_Claims) */ 1 FROM Claims c
+"""
+
+
+def test_minify_strips_comments_and_whitespace():
+    minified = minify_sql(SQL)
+    assert minified.text == (
+        "SELECT c.ClaimID,\n"
+        "c.PaidAmount\n"
+        "FROM Claims c WHERE c.Note = 'a  --  b'\n"
+        "AND c.Text = 'multi\n"
+        "line' ORDER BY 1;\n"
+        "SELECT /*+ INDEX(c IX_Claims) */ 1 FROM Claims c"
+    )
+    assert minified.line_map == [6, 7, 8, 10, 11, 12]
+
+
+def test_remap_line_references():
+    line_map = [6, 7, 8, 10, 11, 12]
+    text = "Line 3 scans Claims; lines 4-5 filter. See line 40 and Lines 1 and 2."
+    assert remap_line_references(text, line_map) == (
+        "Line 8 scans Claims; lines 10-11 filter. See line 40 and Lines 6 and 7."
+    )
+
+
+@pytest.mark.asyncio
+async def test_minified_prompt_and_original_line_numbers():
+    run_metrics.reset()
+    task = SQLAnalyzer()
+    task.minify = True
+    task.client.get_completion = AsyncMock(return_value="Line 3: avoid functions on c.Note.")
+
+    result = await task.run(SQL)
+
+    prompt = task.client.get_completion.call_args[0][0]
+    assert "Change log" not in prompt and "main table" not in prompt
+    assert result == "Line 8: avoid functions on c.Note."
+    assert run_metrics.get("prompt.minified_inputs") == 1
+    assert run_metrics.get("prompt.tokens_saved") > 20
+
+
+def test_rewriting_tasks_are_never_minified():
+    task = SQLRefactorer()
+    task.minify = True
+    assert task.build_prompt(SQL).count("Change log") == 1
@@ -0,0 +1,78 @@
+import sys
+import os
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from core.metrics import run_metrics  # Import after setting the path
+from utils.sql_patch import PatchError, apply_patch, parse_patch, request_rewrite
+
+ORIGINAL = "SELECT a,\n       b\nFROM t\nWHERE a = 1\nORDER BY a;\n"
+
+
+class FakeClient:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.completion_tokens = 0
+
+    async def generate(self, prompt, temperature=0.3):
+        response = self.responses.pop(0)
+        self.completion_tokens += len(response) // 4
+        return response
+
+
+def test_apply_patch_with_header_insertion_and_off_line_numbers():
+    patch = (
+        "```diff\n--- a/query.sql\n+++ b/query.sql\n"
+        "@@ -0,0 +1,1 @@\n+-- Orders of customer 1\n"
+        "@@ -9,2 +10,2 @@\n FROM t\n-WHERE a = 1\n+WHERE a = 1 -- customer\n```"  # Line numbers are off
+    )
+    assert apply_patch(ORIGINAL, parse_patch(patch)) == (
+        "-- Orders of customer 1\nSELECT a,\n       b\nFROM t\nWHERE a = 1 -- customer\nORDER BY a;\n"
+    )
+    assert apply_patch(ORIGINAL, parse_patch("NO CHANGES")) == ORIGINAL
+
+
+@pytest.mark.parametrize("patch", [
+    "@@ -3,2 +3,2 @@\n FROM t\n-WHERE a = 2\n+WHERE a = 3",      # Removed line doesn't match
+    "@@ -1,1 +1,1 @@\n-SELECT x,\n+SELECT y,",                  # Context not in the file
+    "Here is the updated query:\nSELECT a FROM t",              # Whole file instead of a patch
+    "@@ -4,1 +4,1 @@\n-WHERE a = 1\n+WHERE a = 2\n@@ -1,1 +1,1 @@\n-SELECT a,\n+SELECT c,",  # Out of order
+])
+def test_invalid_patches_are_rejected(patch):
+    with pytest.raises(PatchError):
+        apply_patch(ORIGINAL, parse_patch(patch))
+
+
+def test_ambiguous_hunk_is_rejected():
+    original = "SELECT 1;\nGO\nSELECT 1;\nGO\n"
+    with pytest.raises(PatchError):
+        apply_patch(original, parse_patch("@@ -7,1 +7,1 @@\n-SELECT 1;\n+SELECT 2;"))
+    assert apply_patch(original, parse_patch("@@ -3,1 +3,1 @@\n-SELECT 1;\n+SELECT 2;")) == "SELECT 1;\nGO\nSELECT 2;\nGO\n"
+
+
+@pytest.mark.asyncio
+async def test_request_rewrite_falls_back_and_measures_each_mode():
+    run_metrics.reset()
+
+    async def full_text():
+        return (await client.generate("full prompt")).strip()
+
+    client = FakeClient("@@ -4,1 +4,1 @@\n-WHERE a = 1\n+WHERE a = 2")
+    assert await request_rewrite(client, ORIGINAL, full_text, "patch prompt") == ORIGINAL.replace("a = 1", "a = 2")
+
+    client = FakeClient("@@ -4,1 +4,1 @@\n-WHERE a = 9\n+WHERE a = 2", "SELECT 1")
+    assert await request_rewrite(client, ORIGINAL, full_text, "patch prompt") == "SELECT 1"
+
+    client = FakeClient(ORIGINAL)
+    assert await request_rewrite(client, ORIGINAL, full_text) == ORIGINAL.strip()
+
+    counters = run_metrics.snapshot()["counters"]
+    assert (counters["patch.applied"], counters["patch.fallbacks"]) == (1, 1)
+    assert counters["rewrite.patch.completion_tokens"] == 10
+    assert counters["rewrite.patch_fallback.completion_tokens"] == 12  # Both calls
+    assert counters["rewrite.full.completion_tokens"] == 12
+    assert "rewrite.patch.completion_tokens_per_file: 10" in run_metrics.format_summary()
+    run_metrics.reset()
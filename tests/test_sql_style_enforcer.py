@@ -1,34 +1,81 @@
 import unittest
 import asyncio
-from tasks.sql_style_enforcer import SQLStyleEnforcer
+import os
+import tempfile
+from tasks.sql_style_enforcer import SQLStyleEnforcer, StyleCache
 from utils.prompt_manager import PromptManager
-from core.base_ai_client import MockAIClient  # Mock AI Client for testing
+
+
+class FakeAIClient:
+    """
+    Records prompts and returns a canned response.
+    """
+
+    def __init__(self):
+        self.response = ""
+        self.prompts = []
+
+    def set_mock_response(self, response):
+        self.response = response
+
+    async def generate(self, prompt, temperature=0.3):
+        self.prompts.append(prompt)
+        return self.response
+
 
 class TestSQLStyleEnforcer(unittest.TestCase):
     def setUp(self):
         self.prompt_manager = PromptManager("prompts/index.yaml")
-        self.ai_client = MockAIClient()  # Use a mock AI client to simulate responses
-        self.enforcer = SQLStyleEnforcer(self.ai_client, self.prompt_manager)
+        self.ai_client = FakeAIClient()  # Simulates LLM responses
+        self.cache_path = os.path.join(tempfile.mkdtemp(), "style_cache.jsonl")
+        self.enforcer = SQLStyleEnforcer(self.ai_client, self.prompt_manager, cache=StyleCache(self.cache_path))
 
     def test_enforce_style(self):
         sample_query = """
         select * from UsersTable
         where UserName = 'JohnDoe'
         """
-        expected_response = """
-        SELECT *
-        FROM users_table
-        WHERE user_name = 'JohnDoe'
+        mock_response = """
+        select * from users_table
+        where user_name = 'JohnDoe'
         """
 
         # Mock AI response
-        self.ai_client.set_mock_response(expected_response)
+        self.ai_client.set_mock_response(mock_response)
 
         # Run the style enforcer
         result = asyncio.run(self.enforcer.enforce_style(sample_query, dialect="PostgreSQL"))
 
-        # Assert the result matches the expected response
-        self.assertEqual(result.strip(), expected_response.strip())
+        # The LLM gets formatted SQL, and its answer is formatted again
+        self.assertIn("SELECT *\n        FROM UsersTable\n        WHERE UserName = 'JohnDoe'", self.ai_client.prompts[0].messages[-1]["content"])
+        self.assertEqual(result, "SELECT *\nFROM users_table\nWHERE user_name = 'JohnDoe'\n")
+
+    def test_unchanged_file_is_skipped_without_llm_call(self):
+        self.ai_client.set_mock_response("SELECT a FROM t")
+        result = asyncio.run(self.enforcer.enforce_style("select a from t", dialect="T-SQL"))
+
+        # Enforcing the result again, even in a later run, needs no call
+        enforcer = SQLStyleEnforcer(self.ai_client, self.prompt_manager, cache=StyleCache(self.cache_path))
+        self.assertEqual(asyncio.run(enforcer.enforce_style(result, dialect="T-SQL")), result)
+        self.assertEqual(len(self.ai_client.prompts), 1)
+
+        # Another dialect's style is a different profile
+        asyncio.run(enforcer.enforce_style(result, dialect="Oracle"))
+        self.assertEqual(len(self.ai_client.prompts), 2)
+
+    def test_patch_mode(self):
+        self.enforcer.patch = True
+        self.ai_client.set_mock_response("@@ -2,1 +2,1 @@\n-FROM UsersTable\n+FROM users_table")
+        result = asyncio.run(self.enforcer.enforce_style("select * from UsersTable", dialect="T-SQL"))
+
+        self.assertIn("1| SELECT *\n2| FROM UsersTable", self.ai_client.prompts[0].messages[-1]["content"])
+        self.assertEqual(result, "SELECT *\nFROM users_table\n")
+
+    def test_formatting_only_without_ai_client(self):
+        enforcer = SQLStyleEnforcer(style_overrides={"T-SQL": {"keyword_case": "lower"}})
+        result = asyncio.run(enforcer.enforce_style("SELECT a, b FROM t WHERE a = 1", dialect="T-SQL"))
+        self.assertEqual(result, "select\n    a,\n    b\nfrom t\nwhere a = 1\n")
+
 
 if __name__ == "__main__":
     unittest.main()
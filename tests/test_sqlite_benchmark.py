@@ -0,0 +1,73 @@
+import sys
+import os
+import sqlite3
+import pytest
+from unittest.mock import AsyncMock
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from tasks.sql_performance_benchmark import SQLPerformanceBenchmark  # Import after setting the path
+from utils.sqlite_benchmark import benchmark_script, format_benchmark_report, percentile, split_sql_statements
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "bench.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT, department TEXT)")
+    conn.executemany("INSERT INTO employees (name, department) VALUES (?, ?)",
+                     [(f"e{i}", "Engineering" if i % 4 == 0 else "Sales") for i in range(200)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_split_sql_statements():
+    sql = "SELECT 1; -- first\nSELECT ';' AS x\nGO\nSELECT (1);"
+    assert split_sql_statements(sql) == ["SELECT 1", "SELECT ';' AS x", "SELECT (1)"]
+
+
+def test_percentile():
+    ordered = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert (percentile(ordered, 50), percentile(ordered, 95), percentile(ordered, 99)) == (5, 10, 10)
+
+
+def test_benchmark_measures_rows_and_plan(db_path):
+    results = benchmark_script(db_path, "SELECT * FROM employees WHERE department = 'Engineering';", warmup=1, repetitions=4)
+    assert len(results) == 1
+    result = results[0]
+    assert result.error is None
+    assert result.rows == 50
+    assert len(result.timings) == 4 and result.timings == sorted(result.timings)
+    assert "SCAN" in result.plan
+
+
+def test_benchmark_rolls_back_modifications(db_path):
+    results = benchmark_script(db_path, "DELETE FROM employees; SELECT COUNT(*) FROM nope;", repetitions=2)
+    assert results[0].rows == 200 and results[0].error is None
+    assert "no such table" in results[1].error
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM employees").fetchone()[0] == 200
+    conn.close()
+
+
+def test_report_contains_measurements(db_path):
+    report = format_benchmark_report(benchmark_script(db_path, "SELECT name FROM employees", repetitions=3))
+    assert "Runs: 3 (after 1 warmup)" in report
+    assert "p95" in report and "Rows: 200" in report and "Query plan:" in report
+
+
+@pytest.mark.asyncio
+async def test_measured_results_are_sent_to_llm(db_path):
+    task = SQLPerformanceBenchmark(db_path=db_path, repetitions=2)
+    task.client.get_completion = AsyncMock(return_value="Add an index on department.")
+
+    result = await task.run("SELECT * FROM employees WHERE department = 'Engineering';")
+
+    prompt = task.client.get_completion.call_args[0][0]
+    assert "Rows: 50" in prompt and "SCAN employees" in prompt
+    assert result.startswith("Measured Results:")
+    assert result.endswith("Optimization Suggestions:\nAdd an index on department.")
@@ -0,0 +1,106 @@
+import sys
+import os
+import json
+import pytest
+from unittest.mock import AsyncMock
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from tasks.sql_analyzer import SQLAnalyzer  # Import after setting the path
+from tasks.sql_query_validator import SQLQueryValidator
+from utils.findings import FINDINGS_SCHEMA, Finding, format_findings, parse_findings, write_findings_report
+
+SQL = "-- header comment\n\nSELECT *\nFROM Claims\nWHERE YEAR(ClaimDate) = 2024"
+
+RESPONSE = {
+    "findings": [
+        {"rule_id": "non-sargable-predicate", "severity": "high", "line_start": 3, "line_end": 3,
+         "message": "YEAR() on ClaimDate prevents index seeks.", "fix": "Use a ClaimDate range."},
+        {"rule_id": "select-star", "severity": "medium", "line_start": 1, "line_end": 1,
+         "message": "SELECT * returns unused columns.", "fix": "List the needed columns."},
+    ]
+}
+
+
+@pytest.mark.asyncio
+async def test_structured_analyzer_returns_compact_findings():
+    task = SQLAnalyzer()
+    task.structured = True
+    task.client.get_structured_completion = AsyncMock(return_value=RESPONSE)
+
+    result = await task.run(SQL)
+
+    prompt, schema, name = task.client.get_structured_completion.call_args.args
+    assert schema is FINDINGS_SCHEMA
+    assert "3| SELECT *" in prompt
+    assert task.client.get_structured_completion.call_args.kwargs["max_tokens"] == task.max_output_tokens
+    assert result.splitlines() == [
+        "[HIGH] L3 non-sargable-predicate: YEAR() on ClaimDate prevents index seeks. Fix: Use a ClaimDate range.",
+        "[MEDIUM] L1 select-star: SELECT * returns unused columns. Fix: List the needed columns.",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_minified_line_spans_map_back_to_original_lines():
+    task = SQLAnalyzer()
+    task.structured = True
+    task.minify = True
+    task.client.get_structured_completion = AsyncMock(return_value=RESPONSE)
+
+    await task.run(SQL)
+
+    prompt = task.client.get_structured_completion.call_args.args[0]
+    assert "1| SELECT *" in prompt and "header comment" not in prompt
+    assert [(f.rule_id, f.line_start) for f in task.last_findings] == [("non-sargable-predicate", 5), ("select-star", 3)]
+
+
+@pytest.mark.asyncio
+async def test_validator_local_errors_become_findings_without_llm_call():
+    task = SQLQueryValidator()
+    task.structured = True
+    task.client.get_structured_completion = AsyncMock()
+
+    result = await task.run("SELECT (a FROM t")
+
+    task.client.get_structured_completion.assert_not_called()
+    assert task.last_findings and task.last_findings[0].rule_id == "local.error"
+    assert result.startswith("[HIGH] L1 local.error:")
+
+
+def test_parse_tolerates_bad_fields_and_report_merges(tmp_path):
+    findings = parse_findings({"findings": [{"rule_id": "", "severity": "BLOCKER", "line_start": 4, "line_end": 2}, "junk"]})
+    assert findings == [Finding("unspecified", "info", 4, 4, "", "")]
+    assert format_findings([]) == "No findings."
+
+    path = tmp_path / "report.json"
+    write_findings_report(str(path), "analyze", [
+        ("a.sql", parse_findings(RESPONSE)),
+        ("b.sql", []),
+    ])
+    report = json.loads(path.read_text(encoding="utf-8"))
+
+    assert report["files"] == 2 and report["findings"] == 2
+    assert report["by_severity"] == {"high": 1, "medium": 1}
+    assert report["results"][0]["findings"][0]["rule_id"] == "non-sargable-predicate"
+
+
+@pytest.mark.asyncio
+async def test_client_requests_json_schema_and_rejects_truncated_output():
+    task = SQLAnalyzer()
+    client = task.client
+    client._post_with_retries = AsyncMock(return_value={
+        "choices": [{"finish_reason": "stop", "message": {"content": json.dumps(RESPONSE)}}]
+    })
+
+    data = await client.get_structured_completion("prompt", FINDINGS_SCHEMA, "sql_findings", max_tokens=300)
+
+    payload = client._post_with_retries.call_args.args[0]
+    assert payload["max_tokens"] == 300
+    assert payload["response_format"]["json_schema"] == {"name": "sql_findings", "strict": True, "schema": FINDINGS_SCHEMA}
+    assert data == RESPONSE
+
+    client._post_with_retries.return_value = {"choices": [{"finish_reason": "length", "message": {"content": '{"findings": [{"ru'}}]}
+    with pytest.raises(RuntimeError, match="exceeded 300 output tokens"):
+        await client.get_structured_completion("prompt", FINDINGS_SCHEMA, "sql_findings", max_tokens=300)
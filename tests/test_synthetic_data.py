@@ -0,0 +1,75 @@
+import sys
+import os
+import sqlite3
+import pytest
+
+# Add the project root directory to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, project_root)
+
+from utils import synthetic_data  # Import after setting the path
+from utils.synthetic_data import SyntheticDataGenerator, infer_column_kind
+
+SCHEMA_DIR = os.path.join(project_root, "schema")
+
+
+def test_infer_column_kind():
+    kinds = {name: infer_column_kind({"ColumnName": name}) for name in
+             ["PatientID", "DiagnosisCode", "ClaimDate", "DateOfBirth", "PaidAmount", "Gender", "FirstName", "rowguid",
+              "IsActive", "Description", "CorporateName"]}
+    assert kinds == {
+        "PatientID": "id", "DiagnosisCode": "code", "ClaimDate": "date", "DateOfBirth": "date", "PaidAmount": "amount",
+        "Gender": "gender", "FirstName": "first_name", "rowguid": "guid", "IsActive": "flag", "Description": "text",
+        "CorporateName": "text",
+    }
+    assert infer_column_kind({"ColumnName": "Total", "DataType": "money"}) == "amount"
+
+
+def test_fk_joins_return_every_row(tmp_path, monkeypatch):
+    monkeypatch.setattr(synthetic_data, "INSERT_BATCH_SIZE", 700)  # Exercise multi-batch keys
+    db_path = str(tmp_path / "claims.sqlite")
+    generator = SyntheticDataGenerator.from_file(
+        os.path.join(SCHEMA_DIR, "HealthClaimsDemo.json"), default_rows=500, table_rows={"Claims": 3000, "ClaimTypes": 5}
+    )
+    counts = generator.build(db_path)
+    assert counts["Claims"] == 3000 and counts["ClaimTypes"] == 5 and counts["Patients"] == 500
+
+    conn = sqlite3.connect(db_path)
+    joined = conn.execute("""
+        SELECT COUNT(*) FROM Claims c
+        JOIN Patients p ON p.PatientID = c.PatientID
+        JOIN Providers pr ON pr.ProviderID = c.ProviderID
+        JOIN ClaimTypes ct ON ct.ClaimTypeID = c.ClaimTypeID
+        JOIN DiagnosisCodes d ON d.DiagnosisCode = c.DiagnosisCode
+        JOIN ProcedureCodes pc ON pc.ProcedureCode = c.ProcedureCode
+    """).fetchone()[0]
+    assert joined == 3000
+    assert conn.execute("SELECT COUNT(DISTINCT ClaimID) FROM Claims").fetchone()[0] == 3000
+    assert conn.execute("SELECT COUNT(DISTINCT DiagnosisCode) FROM DiagnosisCodes").fetchone()[0] == 500
+    conn.close()
+
+
+def test_same_seed_same_data(tmp_path):
+    schema_path = os.path.join(SCHEMA_DIR, "HealthClaimsDemo.json")
+    rows = []
+    for name in ("a.sqlite", "b.sqlite"):
+        db_path = str(tmp_path / name)
+        SyntheticDataGenerator.from_file(schema_path, default_rows=50, seed=7).build(db_path, index_foreign_keys=False)
+        conn = sqlite3.connect(db_path)
+        rows.append(conn.execute("SELECT * FROM Claims ORDER BY ClaimID").fetchall())
+        conn.close()
+    assert rows[0] == rows[1]
+
+
+def test_existing_database_is_not_replaced(tmp_path):
+    db_path = tmp_path / "exists.sqlite"
+    db_path.write_text("keep")
+    generator = SyntheticDataGenerator.from_file(os.path.join(SCHEMA_DIR, "HealthClaimsDemo.json"), default_rows=10)
+    with pytest.raises(FileExistsError):
+        generator.build(str(db_path))
+    assert db_path.read_text() == "keep"
+
+
+def test_large_schema_builds(tmp_path):
+    counts = SyntheticDataGenerator.from_file(os.path.join(SCHEMA_DIR, "AW2019.JSON"), default_rows=20).build(str(tmp_path / "aw.sqlite"))
+    assert len(counts) == 91
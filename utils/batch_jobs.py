@@ -0,0 +1,123 @@
+"""
+Offline Batch Jobs
+
+Renders task prompts into a provider batch input file (Azure OpenAI / OpenAI Batch JSONL
+format) and reads the batch results file back, so overnight corpus runs can use the
+cheaper, higher-quota batch interface instead of interactive calls.
+
+Each batch file gets a sidecar manifest (`<batch file>.manifest.json`) that maps every
+request's `custom_id` to the source file path, task, prompt key/version and input hash.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from utils.prompt_manager import prompt_messages
+
+BATCH_URL = "/chat/completions"
+
+
+def manifest_path_for(batch_path: str) -> str:
+    """
+    Returns the manifest path that accompanies a batch input file.
+    """
+    return f"{batch_path}.manifest.json"
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def build_batch_request(custom_id: str, prompt: str, model: str, temperature: float) -> dict:
+    """
+    Builds one line of a batch input file.
+    """
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_URL,
+        "body": {
+            "model": model,
+            "messages": prompt_messages(prompt),
+            "temperature": temperature
+        }
+    }
+
+
+def write_batch_file(batch_path: str, entries, model: str) -> str:
+    """
+    Writes the batch input JSONL and its manifest.
+
+    :param batch_path: Output path of the batch JSONL file
+    :param entries: Iterable of dicts with keys: filepath, task, prompt_key, prompt_version,
+                    prompt, temperature, input_hash and optionally minify
+    :param model: Deployment / model name placed in each request body
+    :return: Path of the written manifest
+    """
+    requests = {}
+    with open(batch_path, "w", encoding="utf-8") as f:
+        for index, entry in enumerate(entries):
+            custom_id = f"{entry['task']}-{index:06d}"
+            f.write(json.dumps(build_batch_request(custom_id, entry["prompt"], model, entry["temperature"])) + "\n")
+            requests[custom_id] = {
+                "filepath": entry["filepath"],
+                "task": entry["task"],
+                "prompt_key": entry["prompt_key"],
+                "prompt_version": entry["prompt_version"],
+                "input_hash": entry["input_hash"],
+                "minify": entry.get("minify", False),
+            }
+
+    manifest = {
+        "batch_file": os.path.abspath(batch_path),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "model": model,
+        "requests": requests,
+    }
+    manifest_path = manifest_path_for(batch_path)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest_path
+
+
+def load_manifest(manifest_path: str) -> dict:
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_batch_results(results_path: str):
+    """
+    Streams a batch results JSONL file.
+
+    :param results_path: Path to the provider's output (or error) file
+    :return: Generator of (custom_id, content, error) tuples; exactly one of content or
+             error is set
+    """
+    with open(results_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield None, None, f"line {line_number}: invalid JSON ({e})"
+                continue
+
+            custom_id = record.get("custom_id")
+            if record.get("error"):
+                yield custom_id, None, str(record["error"])
+                continue
+
+            response = record.get("response") or {}
+            status = response.get("status_code", 200)
+            body = response.get("body") or {}
+            if status != 200:
+                yield custom_id, None, f"HTTP {status}: {body.get('error', body)}"
+                continue
+            try:
+                yield custom_id, body["choices"][0]["message"]["content"], None
+            except (KeyError, IndexError, TypeError):
+                yield custom_id, None, "response body has no completion content"
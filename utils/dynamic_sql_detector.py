@@ -1,14 +1,16 @@
-import re
-from typing import List, Dict, Tuple
+from typing import Dict
 from utils.prompt_manager import PromptManager
 from core.base_ai_client import AIClient
+from core.cpu_pool import run_cpu_bound
+from utils.dynamic_sql_scanner import extract_context, format_scan_report, scan_dynamic_sql
 
 
 class DynamicSQLDetector:
     """
     A utility for detecting and analyzing dynamically generated SQL queries.
     This includes identifying risks such as SQL injection vulnerabilities and
-    providing optimization suggestions.
+    providing optimization suggestions. A local lexical scan finds the dynamic SQL
+    sites first, so files without any never reach the LLM.
     """
 
     def __init__(self, ai_client: AIClient, prompt_manager: PromptManager):
@@ -21,33 +23,63 @@ class DynamicSQLDetector:
         self.ai_client = ai_client
         self.prompt_manager = prompt_manager
 
-    async def detect_dynamic_sql(self, sql_code: str) -> Dict[str, str]:
+    def prepare_client(self, sql_code: str):
+        """
+        Routes the LLM call by the complexity of the whole file (when LLM_ROUTING is set),
+        not just the excerpt that is sent, and attributes token usage to this task.
+        """
+        if hasattr(self.ai_client, "route"):
+            self.ai_client.usage_label = type(self).__name__
+            self.ai_client.route(sql_code)
+
+    async def detect_dynamic_sql(self, sql_code: str, use_llm: bool = False) -> Dict[str, str]:
         """
         Detects dynamic SQL patterns in the given SQL code.
 
+        Detection runs locally with the lexical scanner, so it needs no LLM call. With
+        `use_llm`, files that have hits additionally get an LLM description of the
+        detected patterns, based only on the code surrounding each site.
+
         :param sql_code: The SQL code to analyze.
+        :param use_llm: Also ask the LLM to describe the detected patterns.
         :return: A dictionary with detected patterns and their descriptions.
         """
+        sites = await run_cpu_bound(scan_dynamic_sql, sql_code, size=len(sql_code))
+        report = format_scan_report(sites)
+        if not sites or not use_llm:
+            return {"dynamic_sql_analysis": report}
+
         # Load the appropriate prompt for detecting dynamic SQL
-        prompt = self.prompt_manager.load_prompt("dynamic_sql.detector", sql_code=sql_code)
-        
+        prompt = self.prompt_manager.load_prompt("dynamic_sql.detector", sql_code=extract_context(sql_code, sites))
+
         # Interact with the AI model to identify dynamic SQL patterns
+        self.prepare_client(sql_code)
         response = await self.ai_client.generate(prompt)
-        return {"dynamic_sql_analysis": response.strip()}
+        return {"dynamic_sql_analysis": f"{report}\n\n{response.strip()}"}
 
     async def analyze_risks_and_optimization(self, sql_code: str) -> str:
         """
         Analyzes the dynamically generated SQL for risks and optimization opportunities.
+        Files without dynamic SQL are answered locally; otherwise only the code
+        surrounding each detected site is sent to the LLM.
 
         :param sql_code: The SQL code to analyze.
         :return: A report detailing risks and optimization suggestions.
         """
+        sites = await run_cpu_bound(scan_dynamic_sql, sql_code, size=len(sql_code))
+        if not sites:
+            return format_scan_report(sites)
+
         # Load the prompt for analyzing risks and optimizations
-        prompt = self.prompt_manager.load_prompt("dynamic_sql.risks_and_optimization", sql_code=sql_code)
-        
+        prompt = self.prompt_manager.load_prompt(
+            "dynamic_sql.risks_and_optimization",
+            sql_code=extract_context(sql_code, sites)
+        )
+
         # Interact with the AI model to analyze risks and optimizations
+        self.prepare_client(sql_code)
         response = await self.ai_client.generate(prompt)
-        return response.strip()
+        return f"{format_scan_report(sites)}\n\n{response.strip()}"
 
 
 # Example usage
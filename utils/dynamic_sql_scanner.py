@@ -0,0 +1,217 @@
+"""
+Local Dynamic SQL Scanner
+
+Token-level pre-filter for DynamicSQLDetector. Finds candidate dynamic SQL sites
+(EXEC of a string or variable, sp_executesql, EXECUTE IMMEDIATE, PREPARE ... FROM,
+PL/pgSQL EXECUTE and string-concatenated SQL variables) with their line spans, without
+calling the LLM. Comments and string contents never produce false positives because
+matching runs on lexer tokens.
+"""
+
+import re
+from collections import namedtuple
+
+from utils.sql_lexer import (
+    NAME, NUMBER, OPERATOR, PUNCT, STRING, VARIABLE, STATEMENT_KEYWORDS,
+    end_line, is_keyword, significant, tokenize,
+)
+
+DynamicSQLSite = namedtuple("DynamicSQLSite", "kind start_line end_line description")
+
+# Human-readable descriptions of each site kind
+SITE_KINDS = {
+    "exec_string": "EXEC/EXECUTE of a string expression",
+    "exec_variable": "EXEC/EXECUTE of a SQL string variable",
+    "sp_executesql": "sp_executesql call",
+    "execute_immediate": "EXECUTE IMMEDIATE",
+    "prepare": "PREPARE statement from a string",
+    "string_concatenation": "SQL text built by string concatenation",
+}
+
+# Statement-shaped SQL in the literals of an expression (joined by line breaks): a statement
+# keyword starting a literal or line, with the rest of its shape (SELECT ... FROM, INSERT INTO,
+# ...) anywhere after it, so fragments like 'SELECT ' + @cols + ' FROM ' count but prose
+# like 'Hello ' + @name + ' from table' doesn't
+_SQL_IN_STRING = re.compile(
+    r"^[\s(]*(?:"
+    r"SELECT\b[\s\S]*\bFROM\b|UPDATE\b[\s\S]*\bSET\b|INSERT\s+INTO\b|DELETE\s+FROM\b|MERGE\s+INTO\b|TRUNCATE\s+TABLE\b"
+    r"|(?:CREATE|ALTER|DROP)\s+(?:OR\s+(?:ALTER|REPLACE)\s+)?(?:TABLE|VIEW|PROC|PROCEDURE|FUNCTION|INDEX|TRIGGER|SCHEMA|DATABASE)\b"
+    r"|EXEC(?:UTE)?\s+[\w@\[\"]"
+    r")",
+    re.IGNORECASE | re.MULTILINE,
+)
+_QUOTED = re.compile(r"^[A-Za-z&]*'(.*)'$", re.DOTALL)
+
+
+def _statement_end(tokens, index: int) -> int:
+    """
+    Returns the index of the last token of the statement containing tokens[index]:
+    up to ';' or the next statement keyword at parenthesis depth 0.
+    """
+    depth = 0
+    last = index
+    for i in range(index + 1, len(tokens)):
+        token = tokens[i]
+        if token.kind == PUNCT and token.value == "(":
+            depth += 1
+        elif token.kind == PUNCT and token.value == ")":
+            depth -= 1
+            if depth < 0:
+                break
+        elif depth == 0 and token.kind == PUNCT and token.value == ";":
+            break
+        elif depth == 0 and token.kind == NAME and token.value.upper() in STATEMENT_KEYWORDS:
+            break
+        last = i
+    return last
+
+
+def _builds_sql_string(expression) -> bool:
+    """
+    True if an expression concatenates a SQL-looking string literal.
+    """
+    literals = []
+    for t in expression:
+        if t.kind == STRING:
+            quoted = _QUOTED.match(t.value)
+            literals.append(quoted.group(1) if quoted else t.value)
+    has_sql_literal = bool(_SQL_IN_STRING.search("\n".join(literals)))
+    concatenates = any(
+        (t.kind == OPERATOR and t.value in ("+", "||", "+=")) or is_keyword(t, "CONCAT", "FORMAT", "QUOTENAME")
+        for t in expression
+    )
+    return has_sql_literal and concatenates
+
+
+def scan_dynamic_sql(sql_code: str) -> list:
+    """
+    Finds candidate dynamic SQL sites.
+
+    :param sql_code: SQL source
+    :return: List of DynamicSQLSite(kind, start_line, end_line, description), in source order
+    """
+    tokens = significant(tokenize(sql_code))
+    sites = []
+    executed_variables = set()
+
+    def add(kind, first, last):
+        sites.append(DynamicSQLSite(kind, tokens[first].line, end_line(tokens[last]), SITE_KINDS[kind]))
+
+    for i, token in enumerate(tokens):
+        nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+
+        if token.kind == NAME and token.value.lower() == "sp_executesql":
+            add("sp_executesql", i, _statement_end(tokens, i))
+            if nxt is not None and nxt.kind == VARIABLE:
+                executed_variables.add(nxt.value.lower())
+
+        elif is_keyword(token, "EXEC", "EXECUTE") and nxt is not None:
+            after = tokens[i + 2] if i + 2 < len(tokens) else None
+            if is_keyword(nxt, "IMMEDIATE"):
+                add("execute_immediate", i, _statement_end(tokens, i + 1))
+            elif nxt.kind == PUNCT and nxt.value == "(":
+                add("exec_string", i, _statement_end(tokens, i))
+            elif nxt.kind == STRING or is_keyword(nxt, "FORMAT"):
+                # PL/pgSQL: EXECUTE 'SELECT ...' || x  /  EXECUTE format(...)
+                add("exec_string", i, _statement_end(tokens, i))
+            elif nxt.kind == VARIABLE and not (after is not None and after.kind == OPERATOR and after.value == "="):
+                # EXEC @sql (but not EXEC @rc = dbo.Proc, a procedure call)
+                add("exec_variable", i, _statement_end(tokens, i))
+                executed_variables.add(nxt.value.lower())
+
+        elif is_keyword(token, "PREPARE") and nxt is not None and nxt.kind in (NAME, VARIABLE):
+            last = _statement_end(tokens, i)
+            if any(is_keyword(t, "FROM") for t in tokens[i + 2:last + 1]):
+                add("prepare", i, last)
+
+    # Second pass: assignments that build SQL text by concatenation, or that feed an executed
+    # variable or one already holding SQL text (@sql += ' WHERE ...')
+    built_variables = set()
+    for i, token in enumerate(tokens):
+        if token.kind != VARIABLE:
+            continue
+        rhs_start = _assignment_rhs(tokens, i)
+        if rhs_start is None:
+            continue
+        last = _statement_end(tokens, rhs_start - 1)
+        expression = tokens[rhs_start - 1:last + 1]  # includes the assignment operator
+        name = token.value.lower()
+        if _builds_sql_string(expression) or (
+                name in executed_variables | built_variables and any(t.kind == STRING for t in expression)):
+            add("string_concatenation", i, last)
+            built_variables.add(name)
+
+    sites.sort(key=lambda site: (site.start_line, site.end_line))
+    return sites
+
+
+def _assignment_rhs(tokens, index: int):
+    """
+    If tokens[index] is a variable being assigned (SET @x = ..., SELECT @x = ...,
+    @x += ..., DECLARE @x NVARCHAR(MAX) = ...), returns the index of the first token of
+    the assigned expression; otherwise None.
+    """
+    previous = tokens[index - 1] if index > 0 else None
+    following = tokens[index + 1] if index + 1 < len(tokens) else None
+    if following is None:
+        return None
+
+    if following.kind == OPERATOR and following.value in ("+=", ":="):
+        return index + 2
+    if following.kind == OPERATOR and following.value == "=":
+        if previous is not None and (is_keyword(previous, "SET", "SELECT") or (previous.kind == PUNCT and previous.value == ",")):
+            return index + 2
+        return None
+
+    # DECLARE @x <type> = <expression>
+    if previous is not None and (is_keyword(previous, "DECLARE") or (previous.kind == PUNCT and previous.value == ",")):
+        depth = 0
+        for j in range(index + 1, len(tokens)):
+            token = tokens[j]
+            if token.kind == PUNCT and token.value == "(":
+                depth += 1
+            elif token.kind == PUNCT and token.value == ")":
+                depth -= 1
+            elif depth == 0 and token.kind == OPERATOR and token.value == "=":
+                return j + 1
+            elif depth == 0 and (token.kind == PUNCT and token.value in (",", ";") or token.kind not in (NAME, PUNCT, NUMBER)):
+                return None
+    return None
+
+
+def extract_context(sql_code: str, sites, padding: int = 2) -> str:
+    """
+    Returns only the source lines around the given sites (merged when they overlap),
+    prefixed with their original line numbers.
+
+    :param sql_code: SQL source
+    :param sites: Sites returned by scan_dynamic_sql
+    :param padding: Lines of context before and after each site
+    """
+    lines = sql_code.splitlines()
+    ranges = []
+    for site in sites:
+        start = max(1, site.start_line - padding)
+        end = min(len(lines), site.end_line + padding)
+        if ranges and start <= ranges[-1][1] + 1:
+            ranges[-1][1] = max(ranges[-1][1], end)
+        else:
+            ranges.append([start, end])
+
+    chunks = []
+    for start, end in ranges:
+        chunks.append("\n".join(f"{n:>5}: {lines[n - 1]}" for n in range(start, end + 1)))
+    return "\n   ...\n".join(chunks)
+
+
+def format_scan_report(sites) -> str:
+    """
+    Renders a plain-text report of detected sites.
+    """
+    if not sites:
+        return "No dynamic SQL patterns detected."
+    lines = [f"Detected {len(sites)} dynamic SQL site(s):"]
+    for site in sites:
+        span = f"line {site.start_line}" if site.start_line == site.end_line else f"lines {site.start_line}-{site.end_line}"
+        lines.append(f"- {span}: {site.description} [{site.kind}]")
+    return "\n".join(lines)
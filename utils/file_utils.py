@@ -9,6 +9,15 @@ import os
 import shutil
 from datetime import datetime
 
+from core.metrics import run_metrics
+from utils.ignore_rules import IgnoreRules, compile_glob
+
+# Ignore files honored by directory discovery (.genaisqlignore is specific to this tool)
+IGNORE_FILES = (".gitignore", ".genaisqlignore")
+
+# Directories discovery never enters
+SKIP_DIRS = {".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv"}
+
 def read_sql_file(filepath):
     """
     Reads a SQL file and returns its content as a string.
@@ -41,19 +50,66 @@ def backup_sql_file(filepath):
     print(f"[🔒 Backup created]: {backup_path}")
     return backup_path
 
-def get_sql_files_in_directory(directory, recursive=True):
+def iter_sql_files(directory, recursive=True, ignore_files=IGNORE_FILES, include=(), exclude=(), max_size=None):
+    """
+    Yields the .sql files under a directory as they are found (os.scandir, depth-first,
+    sorted by name), so processing can start before the whole tree has been walked.
+
+    VCS and dependency directories (SKIP_DIRS) are never entered. Ignore files found along
+    the way apply to their directory and below, with .gitignore semantics.
+
+    :param directory: Root directory path
+    :param recursive: Whether to search subdirectories
+    :param ignore_files: Names of ignore files to honor (e.g. .gitignore)
+    :param include: Globs a file must match one of (relative to the root); empty for all
+    :param exclude: Globs of files and directories to skip, like ignore-file lines
+    :param max_size: Skip files larger than this many bytes
+    :return: Generator of full file paths
+    """
+    include_patterns = [compile_glob(pattern)[0] for pattern in include]
+    stack = [(directory, "", IgnoreRules().extended(exclude))]
+    while stack:
+        path, relative, rules = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue  # Unreadable directory
+
+        names = {entry.name for entry in entries}
+        for name in ignore_files:
+            if name in names:
+                rules = rules.extended_from_file(os.path.join(path, name), relative)
+
+        subdirectories = []
+        for entry in entries:
+            entry_relative = f"{relative}/{entry.name}" if relative else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if recursive and entry.name not in SKIP_DIRS and not rules.is_ignored(entry_relative, True):
+                    subdirectories.append((entry.path, entry_relative, rules))
+                continue
+            if not entry.name.lower().endswith(".sql") or entry.name.endswith(".bak.sql"):
+                continue
+            if rules.is_ignored(entry_relative, False):
+                continue
+            if include_patterns and not any(pattern.match(entry_relative) for pattern in include_patterns):
+                continue
+            try:
+                if max_size is not None and entry.stat().st_size > max_size:
+                    run_metrics.increment("discovery.skipped_too_large")
+                    continue
+            except OSError:
+                continue  # Broken symlink
+            yield entry.path
+        stack.extend(reversed(subdirectories))
+
+def get_sql_files_in_directory(directory, recursive=True, **options):
     """
     Retrieves all .sql files from a directory (optionally recursively).
 
     :param directory: Root directory path
     :param recursive: Whether to search subdirectories
+    :param options: Ignore files, globs and size limit (see iter_sql_files)
     :return: List of full file paths
     """
-    sql_files = []
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.lower().endswith(".sql") and not file.endswith(".bak.sql"):
-                sql_files.append(os.path.join(root, file))
-        if not recursive:
-            break
-    return sql_files
+    return list(iter_sql_files(directory, recursive, **options))
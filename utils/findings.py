@@ -0,0 +1,155 @@
+"""
+Structured Findings
+
+Small JSON schema for report-style tasks (analyze, audit, validate) run with `--structured`.
+The model answers with a list of findings, each with a rule id, severity, line span, short
+message and fix. Nothing has to be parsed out of prose, and output stays short. The
+findings of every file are merged into one machine-readable corpus report.
+"""
+
+import json
+from collections import Counter, namedtuple
+from datetime import datetime
+
+SEVERITIES = ("critical", "high", "medium", "low", "info")
+
+Finding = namedtuple("Finding", "rule_id severity line_start line_end message fix")
+
+# Strict structured-output schema: every property required, no extras
+FINDINGS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "findings": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "rule_id": {"type": "string"},
+                    "severity": {"type": "string", "enum": list(SEVERITIES)},
+                    "line_start": {"type": "integer"},
+                    "line_end": {"type": "integer"},
+                    "message": {"type": "string"},
+                    "fix": {"type": "string"},
+                },
+                "required": ["rule_id", "severity", "line_start", "line_end", "message", "fix"],
+                "additionalProperties": False,
+            },
+        }
+    },
+    "required": ["findings"],
+    "additionalProperties": False,
+}
+
+# Local validator severities mapped onto the findings scale
+_LOCAL_SEVERITY = {"error": "high", "warning": "low"}
+
+
+def number_lines(sql_code: str) -> str:
+    """
+    Prefixes each line with its number so the model can report line spans.
+    """
+    return "\n".join(f"{number}| {line}" for number, line in enumerate(sql_code.splitlines(), 1))
+
+
+def parse_findings(data: dict) -> list:
+    """
+    Converts a structured response into Finding tuples, tolerating missing fields.
+    """
+    findings = []
+    for item in (data or {}).get("findings", []):
+        if not isinstance(item, dict):
+            continue
+        severity = str(item.get("severity", "info")).lower()
+        line_start = int(item.get("line_start") or 0)
+        findings.append(Finding(
+            rule_id=str(item.get("rule_id", "")).strip() or "unspecified",
+            severity=severity if severity in SEVERITIES else "info",
+            line_start=line_start,
+            line_end=max(line_start, int(item.get("line_end") or line_start)),
+            message=str(item.get("message", "")).strip(),
+            fix=str(item.get("fix", "")).strip(),
+        ))
+    return findings
+
+
+def findings_from_issues(issues) -> list:
+    """
+    Converts local validator issues (ValidationIssue) into findings.
+    """
+    return [
+        Finding(f"local.{issue.severity}", _LOCAL_SEVERITY.get(issue.severity, "info"), issue.line, issue.line, issue.message, "")
+        for issue in issues
+    ]
+
+
+def remap_findings(findings, line_map) -> list:
+    """
+    Maps line spans reported against minified SQL back to original lines.
+    """
+    def original(line):
+        return line_map[line - 1] if 0 < line <= len(line_map) else line
+
+    return [finding._replace(line_start=original(finding.line_start), line_end=original(finding.line_end)) for finding in findings]
+
+
+def format_findings(findings) -> str:
+    """
+    One line per finding, most severe first.
+    """
+    if not findings:
+        return "No findings."
+    ordered = sorted(findings, key=lambda finding: (SEVERITIES.index(finding.severity), finding.line_start))
+    lines = []
+    for finding in ordered:
+        span = f"L{finding.line_start}" if finding.line_end == finding.line_start else f"L{finding.line_start}-{finding.line_end}"
+        line = f"[{finding.severity.upper()}] {span} {finding.rule_id}: {finding.message}"
+        if finding.fix:
+            line += f" Fix: {finding.fix}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def build_findings_report(task: str, entries) -> dict:
+    """
+    Merges per-file findings into one corpus report.
+
+    :param entries: Iterable of (file path, [Finding])
+    """
+    files = []
+    severities = Counter()
+    rules = Counter()
+    for filepath, findings in entries:
+        files.append({"file": filepath, "findings": [finding._asdict() for finding in findings]})
+        severities.update(finding.severity for finding in findings)
+        rules.update(finding.rule_id for finding in findings)
+    return {
+        "task": task,
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "files": len(files),
+        "findings": sum(severities.values()),
+        "by_severity": {severity: severities[severity] for severity in SEVERITIES if severities[severity]},
+        "by_rule": dict(rules.most_common()),
+        "results": files,
+    }
+
+
+def read_findings_report(path: str):
+    """
+    Reads a report written by write_findings_report, e.g. to merge the reports of shards.
+
+    :return: (task, [(file path, [Finding])])
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        report = json.load(f)
+    entries = [
+        (result["file"], [Finding(**finding) for finding in result.get("findings", [])])
+        for result in report.get("results", [])
+    ]
+    return report.get("task"), entries
+
+
+def write_findings_report(path: str, task: str, entries) -> dict:
+    report = build_findings_report(task, entries)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
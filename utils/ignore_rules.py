@@ -0,0 +1,121 @@
+"""
+Ignore Rules
+
+The subset of .gitignore semantics used by directory discovery:
+
+- blank lines and `#` comments are skipped
+- `!pattern` re-includes a path excluded by an earlier pattern (the last match wins)
+- a trailing `/` matches directories only
+- a pattern with a `/` elsewhere is relative to the directory of its ignore file;
+  otherwise it matches a name at any depth below it
+- `*`, `?` and `[...]` stay within one path segment; `**` matches across segments
+
+Paths are relative to the discovery root and always use `/`.
+"""
+
+import re
+from collections import namedtuple
+
+IgnoreRule = namedtuple("IgnoreRule", "regex negate dir_only base")
+
+
+def _translate(pattern: str) -> str:
+    """
+    Glob pattern to a regex body (without anchors).
+    """
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[" and "]" in pattern[i + 2:]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            parts.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+            i = end
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return "".join(parts)
+
+
+def compile_glob(pattern: str):
+    """
+    Compiles a gitignore-style pattern into a regex over relative paths.
+
+    :return: (compiled regex, directories only)
+    """
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    anchored = "/" in pattern
+    body = _translate(pattern.lstrip("/"))
+    return re.compile(("^" if anchored else "^(?:.*/)?") + body + "$"), dir_only
+
+
+def parse_ignore_lines(lines, base: str = "") -> list:
+    """
+    :param lines: Lines of an ignore file (or exclude globs)
+    :param base: Directory of the ignore file, relative to the discovery root
+    :return: [IgnoreRule]
+    """
+    rules = []
+    for line in lines:
+        line = line.rstrip("\n").rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]  # Escaped leading "#" or "!"
+        regex, dir_only = compile_glob(line)
+        rules.append(IgnoreRule(regex, negate, dir_only, base))
+    return rules
+
+
+class IgnoreRules:
+    """
+    Immutable rule set; each directory extends its parent's rules with its own ignore files.
+    """
+
+    def __init__(self, rules=()):
+        self.rules = tuple(rules)
+
+    def extended(self, lines, base: str = "") -> "IgnoreRules":
+        return IgnoreRules(self.rules + tuple(parse_ignore_lines(lines, base)))
+
+    def extended_from_file(self, path: str, base: str = "") -> "IgnoreRules":
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                return self.extended(f.readlines(), base)
+        except OSError:
+            return self
+
+    def is_ignored(self, relative_path: str, is_dir: bool) -> bool:
+        for rule in reversed(self.rules):
+            if rule.dir_only and not is_dir:
+                continue
+            path = relative_path
+            if rule.base:
+                if not relative_path.startswith(rule.base + "/"):
+                    continue
+                path = relative_path[len(rule.base) + 1:]
+            if rule.regex.match(path):
+                return not rule.negate
+        return False
+
+    def __len__(self):
+        return len(self.rules)
@@ -0,0 +1,206 @@
+"""
+Job Journal
+
+Append-only JSONL journal of a directory run, one file per run id under `journals/`. Every
+file's progress is appended as an event, `started` and then `done` or `failed`. Events
+carry the task, the prompt version, the input hash and the output location. A crashed or
+interrupted run can then be resumed (`--resume <run-id>`): completed files are skipped, and
+failed or still-pending ones are processed again. The journals of a sharded run are merged
+into one with `--merge`.
+
+Files are keyed by their path relative to the run root (the same key sharding uses), so the
+journals of runners with different checkout roots line up, and a resumed run resolves them
+against its own `--path`.
+
+Writes are buffered and fsynced in batches, every `FSYNC_EVERY` events or `FSYNC_SECONDS`
+seconds and on close. A crash loses at most the last unsynced batch, and those files are
+simply redone on resume. A torn last line is ignored when the journal is read.
+
+Environment overrides:
+    GENAI_SQL_JOURNAL_DIR    Journal directory (default: journals)
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+from utils.sharding import shard_key
+
+JOURNAL_DIR = os.environ.get("GENAI_SQL_JOURNAL_DIR", "journals")
+FSYNC_EVERY = 32
+FSYNC_SECONDS = 2.0
+
+STARTED = "started"
+DONE = "done"
+FAILED = "failed"
+
+
+def journal_path(run_id: str, directory: str = None) -> str:
+    return os.path.join(directory or JOURNAL_DIR, f"{run_id}.jsonl")
+
+
+def _ends_mid_line(path: str) -> bool:
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return False
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+def read_journal(path: str):
+    """
+    Yields the journal's events, skipping a torn or corrupt line.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def load_journal(path: str):
+    """
+    Replays a journal.
+
+    :return: (first "run" event or None, {file key: latest merged state})
+    """
+    header = None
+    files = {}
+    for event in read_journal(path):
+        if event.get("event") == "run":
+            header = header or event
+        elif "file" in event:
+            files.setdefault(event["file"], {}).update(event)
+    return header, files
+
+
+def is_completed(state: dict, task: str, current_hash: str) -> bool:
+    """
+    A file is complete if the same task finished it and the file is unchanged since,
+    i.e. it still holds either the input or the output that was written.
+    """
+    return (
+        state is not None
+        and state.get("status") == DONE
+        and state.get("task") == task
+        and current_hash in (state.get("input_hash"), state.get("output_hash"))
+    )
+
+
+def merge_journals(paths, run_id: str, task: str = None, directory: str = None):
+    """
+    Combines the journals of a sharded run into one journal under `run_id` holding each
+    file's latest state, so the whole run can be inspected or resumed as one.
+
+    :param task: Expected task; a journal of another task is an error
+    :return: (merged journal path, {status: file count})
+    """
+    headers = []
+    states = {}
+    for path in paths:
+        header, files = load_journal(path)
+        if header:
+            if task and header.get("task") != task:
+                raise ValueError(f"{path} is a '{header.get('task')}' journal, not '{task}'")
+            headers.append(header)
+        for file, state in files.items():
+            if file not in states or state.get("ts", "") >= states[file].get("ts", ""):
+                states[file] = state
+
+    first = headers[0] if headers else {}
+    with JobJournal(run_id, directory) as journal:
+        journal.start_run(
+            task=task or first.get("task"),
+            path=first.get("path"),
+            recursive=first.get("recursive", False),
+            discovery=first.get("discovery"),
+            files=len(states),
+            merged=[header.get("run_id") for header in headers],
+        )
+        for state in states.values():
+            journal.record("file", **{key: value for key, value in state.items() if key not in ("event", "ts", "run_id")})
+
+    statuses = {}
+    for state in states.values():
+        statuses[state.get("status")] = statuses.get(state.get("status"), 0) + 1
+    return journal.path, statuses
+
+
+class JobJournal:
+    """
+    Appends a run's events to `<JOURNAL_DIR>/<run_id>.jsonl`.
+    """
+
+    def __init__(self, run_id: str, directory: str = None, fsync_every: int = FSYNC_EVERY, fsync_seconds: float = FSYNC_SECONDS,
+                 root: str = None):
+        """
+        :param root: Run root that file keys are relative to; absolute paths without one
+        """
+        self.run_id = run_id
+        self.root = root
+        self.path = journal_path(run_id, directory)
+        self.fsync_every = fsync_every
+        self.fsync_seconds = fsync_seconds
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        torn = _ends_mid_line(self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        if torn:
+            # Terminate a line torn by a crash so the next event starts on its own line
+            self._file.write("\n")
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def record(self, event: str, **fields):
+        """
+        Appends one event; the write is made durable with the next batch.
+        """
+        entry = {"event": event, "ts": datetime.now().isoformat(timespec="milliseconds"), "run_id": self.run_id}
+        entry.update(fields)
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_seconds:
+            self.sync()
+
+    def start_run(self, **fields):
+        self.record("run", **fields)
+
+    def key(self, filepath: str) -> str:
+        """
+        The journal key of a file: relative to the run root, or absolute without one.
+        """
+        if self.root:
+            return shard_key(os.path.abspath(filepath), os.path.abspath(self.root))
+        return os.path.abspath(filepath)
+
+    def started(self, filepath: str, task: str, input_hash: str, prompt_version=None):
+        self.record("file", file=self.key(filepath), status=STARTED, task=task, input_hash=input_hash, prompt_version=prompt_version)
+
+    def done(self, filepath: str, output: str = None, output_hash: str = None):
+        self.record("file", file=self.key(filepath), status=DONE, output=output, output_hash=output_hash)
+
+    def failed(self, filepath: str, error: str):
+        self.record("file", file=self.key(filepath), status=FAILED, error=error)
+
+    def sync(self):
+        """
+        Flushes buffered events and fsyncs them to disk.
+        """
+        if self._file.closed:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
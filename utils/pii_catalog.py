@@ -0,0 +1,241 @@
+"""
+PII Column Catalog
+
+Classifies every column of a schema JSON as PII or not, once, in a few batched LLM calls,
+and stores the result next to the schema (`schema/HealthClaimsDemo.pii.json`). Masking and
+detection then look columns up locally instead of asking the LLM about every query.
+
+The catalog is versioned: each update bumps its revision and appends a history entry. It
+is updated incrementally. Rebuilding after a schema change sends only new or changed
+columns to the LLM and drops removed ones. Everything is reclassified when the prompt
+version changes.
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime
+
+from utils.batch_jobs import hash_text
+from utils.prompt_manager import PromptManager
+
+CATALOG_FORMAT = 1
+PROMPT_KEY = "data_masker.classify_columns"
+
+# Columns per LLM call; whole tables are kept together so names have context
+BATCH_COLUMNS = 150
+MAX_CONCURRENT_BATCHES = 4
+
+QUOTES = "[]\"`"
+
+PII_CATEGORIES = (
+    "name", "email", "phone", "address", "ssn", "government_id", "credit_card",
+    "date_of_birth", "medical", "financial", "credential", "other",
+)
+
+# Only PII columns are returned; anything not listed is not PII
+CLASSIFY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "pii_columns": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "column": {"type": "string"},
+                    "category": {"type": "string", "enum": list(PII_CATEGORIES)},
+                },
+                "required": ["column", "category"],
+                "additionalProperties": False,
+            },
+        }
+    },
+    "required": ["pii_columns"],
+    "additionalProperties": False,
+}
+
+
+def catalog_path_for(schema_path: str) -> str:
+    return os.path.splitext(schema_path)[0] + ".pii.json"
+
+
+def schema_columns(schema: dict) -> dict:
+    """
+    :return: {"Table.Column": signature}, where the signature changes with the column's
+             definition in the schema JSON
+    """
+    columns = {}
+    for table in schema.get("Schema", []):
+        for column in table.get("Columns", []):
+            key = f"{table['TableName']}.{column['ColumnName']}"
+            columns[key] = hash_text(json.dumps(column, sort_keys=True))[:16]
+    return columns
+
+
+def plan_update(catalog: dict, columns: dict, prompt_version) -> tuple:
+    """
+    Splits the schema's columns into those that need classifying and those whose
+    catalog entry is still valid.
+
+    :param catalog: Existing catalog data (empty dict for none)
+    :param columns: schema_columns() of the current schema
+    :return: ([columns to classify], {kept column: entry}, [removed columns])
+    """
+    entries = catalog.get("columns", {})
+    if catalog.get("format") != CATALOG_FORMAT or catalog.get("prompt_version") != prompt_version:
+        entries = {}
+    kept = {key: entries[key] for key in columns if key in entries and entries[key].get("signature") == columns[key]}
+    changed = [key for key in columns if key not in kept]
+    removed = [key for key in catalog.get("columns", {}) if key not in columns]
+    return changed, kept, removed
+
+
+def batch_columns(keys, size: int = BATCH_COLUMNS) -> list:
+    """
+    Groups "Table.Column" keys into batches of about `size` columns, keeping a table's
+    columns together unless the table alone exceeds the batch size.
+    """
+    tables = {}
+    for key in keys:
+        tables.setdefault(key.split(".", 1)[0], []).append(key)
+
+    batches = []
+    current = []
+    for table_columns in tables.values():
+        if current and len(current) + len(table_columns) > size:
+            batches.append(current)
+            current = []
+        for start in range(0, len(table_columns), size):
+            chunk = table_columns[start:start + size]
+            if len(chunk) == size:
+                batches.append(chunk)
+            else:
+                current.extend(chunk)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def format_batch(keys) -> str:
+    """
+    One line per table: `Table: ColumnA, ColumnB, ...`.
+    """
+    tables = {}
+    for key in keys:
+        table, column = key.split(".", 1)
+        tables.setdefault(table, []).append(column)
+    return "\n".join(f"{table}: {', '.join(columns)}" for table, columns in tables.items())
+
+
+async def classify_columns(client, keys, batch_size: int = BATCH_COLUMNS) -> dict:
+    """
+    Classifies columns in batched structured calls.
+
+    :return: {"Table.Column": category or None}
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+
+    async def classify(batch):
+        prompt = PromptManager.load_prompt(PROMPT_KEY, columns=format_batch(batch))
+        async with semaphore:
+            data = await client.get_structured_completion(prompt, CLASSIFY_SCHEMA, "pii_columns", temperature=0.0)
+        known = {key.lower(): key for key in batch}
+        result = {key: None for key in batch}
+        for item in (data or {}).get("pii_columns", []):
+            key = known.get(str(item.get("column", "")).strip().lower())
+            if key and item.get("category") in PII_CATEGORIES:
+                result[key] = item["category"]
+        return result
+
+    classified = {}
+    for result in await asyncio.gather(*(classify(batch) for batch in batch_columns(keys, batch_size))):
+        classified.update(result)
+    return classified
+
+
+class PIICatalog:
+    """
+    Local lookup of PII columns, loaded from a catalog file.
+    """
+
+    def __init__(self, data: dict):
+        self.data = data
+        self.revision = data.get("revision", 0)
+        self._by_key = {}
+        self._by_column = {}
+        for key, entry in data.get("columns", {}).items():
+            if entry.get("pii"):
+                self._by_key[key.lower()] = entry["category"]
+                self._by_column.setdefault(key.split(".", 1)[1].lower(), entry["category"])
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        :return: PIICatalog, or None if the file does not exist
+        """
+        if not os.path.isfile(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def category(self, column: str, table: str = None):
+        """
+        PII category of a column, or None. Without a table, a column name that is PII in
+        any table counts as PII.
+        """
+        column = column.strip(QUOTES).lower()
+        if table:
+            table = table.split(".")[-1].strip(QUOTES).lower()
+            return self._by_key.get(f"{table}.{column}")
+        return self._by_column.get(column)
+
+    @property
+    def pii_columns(self) -> dict:
+        return {key: entry["category"] for key, entry in self.data.get("columns", {}).items() if entry.get("pii")}
+
+    def save(self, path: str):
+        temporary = path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+        os.replace(temporary, path)
+
+
+async def build_pii_catalog(schema_path: str, client, catalog_path: str = None, batch_size: int = BATCH_COLUMNS):
+    """
+    Creates or incrementally updates the PII catalog of a schema JSON.
+
+    :param client: AI client with get_structured_completion
+    :return: (PIICatalog, {"classified": n, "kept": n, "removed": n})
+    """
+    catalog_path = catalog_path or catalog_path_for(schema_path)
+    with open(schema_path, "r", encoding="utf-8-sig") as f:
+        schema = json.load(f)
+    columns = schema_columns(schema)
+    prompt_version = PromptManager.get_metadata(PROMPT_KEY).get("version")
+
+    existing = PIICatalog.load(catalog_path)
+    data = existing.data if existing else {}
+    changed, kept, removed = plan_update(data, columns, prompt_version)
+    stats = {"classified": len(changed), "kept": len(kept), "removed": len(removed)}
+    if existing and not changed and not removed:
+        return existing, stats
+
+    classified = await classify_columns(client, changed, batch_size) if changed else {}
+    entries = dict(kept)
+    for key in changed:
+        category = classified.get(key)
+        entries[key] = {"pii": category is not None, "category": category, "signature": columns[key]}
+
+    revision = data.get("revision", 0) + 1
+    updated = datetime.now().isoformat(timespec="seconds")
+    catalog = PIICatalog({
+        "format": CATALOG_FORMAT,
+        "revision": revision,
+        "prompt_version": prompt_version,
+        "schema": os.path.basename(schema_path),
+        "updated": updated,
+        "columns": {key: entries[key] for key in columns},
+        "history": data.get("history", []) + [dict(revision=revision, updated=updated, **stats)],
+    })
+    catalog.save(catalog_path)
+    return catalog, stats
@@ -1,3 +1,17 @@
+"""
+Prompt Manager
+
+Serves the prompts in prompts/index.yaml. An entry is either a single `inline` (or `file`)
+template, or a chat layout for provider-side prefix caching:
+
+    system:  static instructions (never contains per-call values)
+    context: optional per-schema context, e.g. the schema JSON (stable across calls)
+    user:    the per-call values, with the SQL last
+
+Caching only applies to byte-identical prompt prefixes, so the static parts come first as
+system messages and everything that changes per call comes last.
+"""
+
 import os
 import yaml
 
@@ -11,14 +25,47 @@ with open(INDEX_PATH, "r", encoding="utf-8") as f:
     PROMPT_INDEX = yaml.safe_load(f)
 
 
+# Chat layout sections, in message order
+LAYOUT = (("system", "system"), ("context", "system"), ("user", "user"))
+
+
+class ChatPrompt(str):
+    """
+    A rendered prompt: the flattened text (for batch files, token estimates and logging)
+    that also carries its chat-message layout in `messages`.
+    """
+
+    def __new__(cls, messages):
+        prompt = super().__new__(cls, "\n\n".join(message["content"] for message in messages))
+        prompt.messages = messages
+        return prompt
+
+
+def prompt_messages(prompt) -> list:
+    """
+    Chat messages for a prompt: a ChatPrompt's layout, or one user message.
+    """
+    return getattr(prompt, "messages", None) or [{"role": "user", "content": prompt}]
+
+
 class PromptManager:
+    def __init__(self, index_path: str = None):
+        # Prompts are always served from the shared index loaded above; the path is
+        # accepted for callers that pass the index location explicitly.
+        self.index_path = index_path or INDEX_PATH
+
     @staticmethod
     def load_prompt(key: str, **kwargs) -> str:
+        """
+        Renders a prompt. Chat-layout entries return a ChatPrompt.
+        """
         entry = PROMPT_INDEX.get(key)
         if not entry:
             raise ValueError(f"Prompt key '{key}' not found in index.yaml")
 
-        if "inline" in entry:
+        if "system" in entry:
+            template = None
+        elif "inline" in entry:
             template = entry["inline"]
         elif "file" in entry:
             file_path = os.path.join(PROMPT_ROOT, entry["file"])
@@ -35,6 +82,11 @@ class PromptManager:
         if missing:
             raise KeyError(f"Missing prompt inputs: {missing} for prompt '{key}'")
 
+        if template is None:
+            return ChatPrompt([
+                {"role": role, "content": entry[section].format(**kwargs).strip()}
+                for section, role in LAYOUT if entry.get(section)
+            ])
         return template.format(**kwargs)
 
     @staticmethod
@@ -0,0 +1,296 @@
+"""
+Query Log Ingestion
+
+Streams query-log exports and aggregates them by normalized query shape. The supported
+formats are CSV/TSV and JSONL exports from SQL Server Query Store, Extended Events or
+sys.dm_exec_query_stats, and pg_stat_statements-style dumps. Reading is one row at a time,
+and only one aggregate per distinct shape is kept, so multi-GB logs fit in memory.
+
+Columns are matched case-insensitively by their usual names in those tools. Durations and
+CPU times are converted to milliseconds. Per-execution averages (Query Store) are
+multiplied by the execution count.
+
+Normalizing statements (tokenizing) is the expensive part. `aggregate_query_log_parallel`
+reads the log in the main process and sends batches of rows to the CPU pool, where they are
+aggregated; the partial results are then merged in log order.
+"""
+
+import asyncio
+import csv
+import json
+import os
+import sys
+from collections import deque
+from functools import lru_cache
+
+from core import cpu_pool
+from utils.sql_fingerprint import fingerprint_sql
+
+# Column names holding the statement text, in order of preference
+SQL_COLUMNS = ("query_sql_text", "statement", "sql_text", "batch_text", "query_text", "query", "text")
+# Executions per row; rows without one (one XEvents event per row) count once
+COUNT_COLUMNS = ("count_executions", "execution_count", "calls", "executions", "count")
+
+TOTAL = "total"
+AVERAGE = "average"
+
+# (column, TOTAL/AVERAGE, factor to milliseconds)
+DURATION_COLUMNS = (
+    ("total_exec_time", TOTAL, 1.0),          # pg_stat_statements 13+ (ms)
+    ("total_time", TOTAL, 1.0),               # pg_stat_statements < 13 (ms)
+    ("total_elapsed_time", TOTAL, 0.001),     # sys.dm_exec_query_stats (µs)
+    ("avg_duration", AVERAGE, 0.001),         # Query Store (µs)
+    ("duration", TOTAL, 0.001),               # Extended Events (µs)
+    ("duration_ms", TOTAL, 1.0),
+)
+CPU_COLUMNS = (
+    ("total_worker_time", TOTAL, 0.001),      # sys.dm_exec_query_stats (µs)
+    ("avg_cpu_time", AVERAGE, 0.001),         # Query Store (µs)
+    ("cpu_time", TOTAL, 0.001),               # Extended Events (µs)
+    ("cpu_ms", TOTAL, 1.0),
+)
+
+RANK_BY = ("duration", "cpu", "count")
+
+JSONL_EXTENSIONS = (".jsonl", ".ndjson", ".json")
+
+# Rows per CPU-pool task in aggregate_query_log_parallel
+BATCH_ROWS = 5000
+
+# Statement texts repeat heavily in event logs; skip re-tokenizing the same text
+_fingerprint = lru_cache(maxsize=8192)(fingerprint_sql)
+
+
+class QueryShape:
+    """
+    Aggregated executions of one normalized query shape.
+    """
+
+    __slots__ = ("fingerprint", "sample_sql", "count", "total_duration_ms", "total_cpu_ms", "rows")
+
+    def __init__(self, fingerprint: str, sample_sql: str):
+        self.fingerprint = fingerprint
+        self.sample_sql = sample_sql
+        self.count = 0
+        self.total_duration_ms = 0.0
+        self.total_cpu_ms = 0.0
+        self.rows = 0
+
+    def add(self, count: float, duration_ms: float, cpu_ms: float):
+        self.count += count
+        self.total_duration_ms += duration_ms
+        self.total_cpu_ms += cpu_ms
+        self.rows += 1
+
+    def merge(self, other: "QueryShape"):
+        self.count += other.count
+        self.total_duration_ms += other.total_duration_ms
+        self.total_cpu_ms += other.total_cpu_ms
+        self.rows += other.rows
+
+    def cost(self, rank_by: str = "duration") -> float:
+        """
+        Ranking key: total duration, total CPU or execution count.
+        """
+        if rank_by == "cpu":
+            return self.total_cpu_ms
+        if rank_by == "count":
+            return self.count
+        return self.total_duration_ms
+
+    def header(self) -> str:
+        """
+        SQL comment summarizing the shape's runtime cost.
+        """
+        mean = self.total_duration_ms / self.count if self.count else 0.0
+        return (
+            f"-- Query shape {self.fingerprint}: {self.count:,.0f} executions, "
+            f"{self.total_duration_ms:,.1f} ms total duration ({mean:,.3f} ms mean), "
+            f"{self.total_cpu_ms:,.1f} ms total CPU\n"
+        )
+
+
+class ColumnMap:
+    """
+    Resolves the SQL, count, duration and CPU columns of one log's header.
+    """
+
+    def __init__(self, columns):
+        lookup = {column.strip().lower(): column for column in columns}
+        self.sql = next((lookup[name] for name in SQL_COLUMNS if name in lookup), None)
+        self.count = next((lookup[name] for name in COUNT_COLUMNS if name in lookup), None)
+        self.duration = next(((lookup[name], kind, factor) for name, kind, factor in DURATION_COLUMNS if name in lookup), None)
+        self.cpu = next(((lookup[name], kind, factor) for name, kind, factor in CPU_COLUMNS if name in lookup), None)
+
+    def measure(self, record: dict, column, count: float) -> float:
+        if column is None:
+            return 0.0
+        name, kind, factor = column
+        value = _number(record.get(name)) * factor
+        return value * count if kind == AVERAGE else value
+
+
+def _number(value) -> float:
+    if value is None or value == "":
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        try:
+            return float(str(value).replace(",", ""))
+        except ValueError:
+            return 0.0
+
+
+def _csv_records(path: str, delimiter: str):
+    # Statement texts easily exceed the csv module's 128 KB default field limit
+    csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+    with open(path, "r", encoding="utf-8-sig", errors="replace", newline="") as file:
+        reader = csv.DictReader(file, delimiter=delimiter)
+        columns = ColumnMap(reader.fieldnames or [])
+        for record in reader:
+            yield columns, record
+
+
+def _jsonl_records(path: str):
+    columns = None
+    keys = None
+    with open(path, "r", encoding="utf-8-sig", errors="replace") as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            # Exports are uniform, so the column map is only rebuilt when the keys change
+            if record.keys() != keys:
+                keys = record.keys()
+                columns = ColumnMap(keys)
+            yield columns, record
+
+
+def read_query_log(path: str, log_format: str = None):
+    """
+    Streams (sql, count, duration_ms, cpu_ms) from a query-log export.
+
+    :param path: CSV, TSV or JSONL file
+    :param log_format: "csv", "tsv" or "jsonl"; inferred from the extension when omitted
+    """
+    if log_format is None:
+        extension = os.path.splitext(path)[1].lower()
+        log_format = "jsonl" if extension in JSONL_EXTENSIONS else "tsv" if extension == ".tsv" else "csv"
+
+    if log_format == "jsonl":
+        records = _jsonl_records(path)
+    elif log_format in ("csv", "tsv"):
+        records = _csv_records(path, "\t" if log_format == "tsv" else ",")
+    else:
+        raise ValueError(f"Unsupported query log format: {log_format}")
+
+    for columns, record in records:
+        if columns.sql is None:
+            raise ValueError(f"No statement text column in {path} (expected one of: {', '.join(SQL_COLUMNS)})")
+        sql = record.get(columns.sql)
+        if not sql or not isinstance(sql, str):
+            continue
+        count = (_number(record.get(columns.count)) if columns.count else 0.0) or 1.0
+        yield sql, count, columns.measure(record, columns.duration, count), columns.measure(record, columns.cpu, count)
+
+
+def aggregate_records(records) -> dict:
+    """
+    Groups (sql, count, duration_ms, cpu_ms) rows by normalized shape.
+
+    :return: {fingerprint: QueryShape}; the sample SQL is the shape's first statement
+    """
+    shapes = {}
+    for sql, count, duration_ms, cpu_ms in records:
+        fingerprint = _fingerprint(sql)
+        shape = shapes.get(fingerprint)
+        if shape is None:
+            shape = shapes[fingerprint] = QueryShape(fingerprint, sql.strip())
+        shape.add(count, duration_ms, cpu_ms)
+    return shapes
+
+
+def merge_shapes(shapes: dict, partial: dict) -> dict:
+    """
+    Merges `partial` into `shapes`; shapes already present keep their sample SQL.
+    """
+    for fingerprint, shape in partial.items():
+        existing = shapes.get(fingerprint)
+        if existing is None:
+            shapes[fingerprint] = shape
+        else:
+            existing.merge(shape)
+    return shapes
+
+
+def aggregate_query_log(path: str, log_format: str = None) -> dict:
+    """
+    Groups a query log by normalized shape in the current process.
+
+    :return: {fingerprint: QueryShape}
+    """
+    return aggregate_records(read_query_log(path, log_format))
+
+
+async def aggregate_query_log_parallel(path: str, log_format: str = None, batch_rows: int = BATCH_ROWS) -> dict:
+    """
+    Groups a query log by normalized shape, aggregating batches of rows in the CPU pool.
+    Logs up to cpu_pool.INLINE_MAX_CHARS bytes are aggregated inline.
+
+    :return: {fingerprint: QueryShape}, identical to aggregate_query_log
+    """
+    if os.path.getsize(path) <= cpu_pool.INLINE_MAX_CHARS:
+        return aggregate_query_log(path, log_format)
+
+    loop = asyncio.get_running_loop()
+    pool = cpu_pool.get_process_pool()
+    # Bounded so reading can't run ahead of the workers; merged oldest-first to keep log order
+    max_pending = cpu_pool.CPU_WORKERS * 2
+    pending = deque()
+    shapes = {}
+    batch = []
+
+    for record in read_query_log(path, log_format):
+        batch.append(record)
+        if len(batch) >= batch_rows:
+            pending.append(loop.run_in_executor(pool, aggregate_records, batch))
+            batch = []
+            if len(pending) >= max_pending:
+                merge_shapes(shapes, await pending.popleft())
+    if batch:
+        pending.append(loop.run_in_executor(pool, aggregate_records, batch))
+    while pending:
+        merge_shapes(shapes, await pending.popleft())
+    return shapes
+
+
+def top_shapes(shapes: dict, top: int, rank_by: str = "duration") -> list:
+    """
+    Returns the `top` most expensive shapes, costliest first.
+    """
+    if rank_by not in RANK_BY:
+        raise ValueError(f"rank_by must be one of {RANK_BY}")
+    return sorted(shapes.values(), key=lambda shape: shape.cost(rank_by), reverse=True)[:top]
+
+
+def format_shape_table(shapes, total_cost: float, rank_by: str = "duration") -> str:
+    """
+    Text table of ranked shapes with their share of the log's total cost.
+    """
+    lines = [f"{'#':>3}  {'fingerprint':<16}  {'executions':>12}  {'duration ms':>14}  {'cpu ms':>12}  {'share':>6}  statement"]
+    for rank, shape in enumerate(shapes, 1):
+        share = shape.cost(rank_by) / total_cost if total_cost else 0.0
+        statement = " ".join(shape.sample_sql.split())
+        statement = statement if len(statement) <= 60 else statement[:57] + "..."
+        lines.append(
+            f"{rank:>3}  {shape.fingerprint:<16}  {shape.count:>12,.0f}  {shape.total_duration_ms:>14,.1f}  "
+            f"{shape.total_cpu_ms:>12,.1f}  {share:>6.1%}  {statement}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,201 @@
+"""
+Refactor Verifier
+
+Differential check of a refactored query against the original on a local SQLite
+database: both must return the same multiset of rows (per result-producing statement),
+leave the tables they change with the same contents (per data-changing statement), and
+the refactored version must not be slower. A script that neither returns rows nor
+changes a table can't be verified and is never kept.
+
+Results are compared through an order-insensitive multiset hash (the sum of per-row
+SHA-256 digests modulo 2**128, plus the row count), computed while streaming the cursor,
+so large results are never held in memory. Timings are medians over repeated runs,
+each run inside a rolled-back savepoint.
+"""
+
+import hashlib
+import sqlite3
+import statistics
+import time
+from collections import namedtuple
+
+from utils.sqlite_benchmark import connect, split_sql_statements
+
+Verification = namedtuple(
+    "Verification", "equivalent original_seconds refactored_seconds speedup keep reason"
+)
+
+FETCH_SIZE = 5000
+HASH_MODULUS = 2 ** 128
+FLOAT_DIGITS = 9  # Aggregates may differ in the last bits when rows are summed in another order
+WRITE_ACTIONS = {sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE, sqlite3.SQLITE_DELETE}
+
+
+def _normalize(value):
+    if isinstance(value, float):
+        value = round(value, FLOAT_DIGITS)
+        # 1 and 1.0 are the same value (e.g. SUM of integers vs. of reals)
+        if value.is_integer():
+            return int(value)
+    return value
+
+
+def _row_digest(row) -> int:
+    encoded = repr(tuple(_normalize(v) for v in row)).encode("utf-8")
+    return int.from_bytes(hashlib.sha256(encoded).digest()[:16], "big")
+
+
+def _consume(cursor, fingerprint: bool, prefix=()):
+    """
+    Streams a cursor's rows.
+
+    :return: (row_count, multiset_hash); the hash is 0 unless `fingerprint`
+    """
+    count, total = 0, 0
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            break
+        count += len(rows)
+        if fingerprint:
+            for row in rows:
+                total = (total + _row_digest(prefix + tuple(row))) % HASH_MODULUS
+    return count, total
+
+
+def _tables_hash(conn: sqlite3.Connection, tables) -> int:
+    """
+    Multiset hash of the contents of `tables`, each row tagged with its table name.
+    """
+    total = 0
+    for table in tables:
+        quoted = table.replace('"', '""')
+        _, digest = _consume(conn.execute(f'SELECT * FROM "{quoted}"'), True, (table,))
+        total = (total + digest) % HASH_MODULUS
+    return total
+
+
+def _run_statements(conn: sqlite3.Connection, statements, fingerprint: bool):
+    """
+    Runs all statements inside a rolled-back savepoint, streaming every result set.
+
+    :return: List of (row_count, multiset_hash) per result-producing statement and, when
+             `fingerprint`, (changed_rows, hash of the changed tables' contents) per
+             statement that writes to a database table (hash is None unless `fingerprint`)
+    """
+    results = []
+    written = set()
+    tables_of = {}
+
+    def authorize(action, table, _column, database, _source):
+        # Temp tables are scratch space; a refactor may replace them with CTEs
+        if action in WRITE_ACTIONS and database == "main" and not table.startswith("sqlite_"):
+            written.add(table)
+        return sqlite3.SQLITE_OK
+
+    if fingerprint:
+        # Setting an authorizer expires prepared statements, so every statement is authorized again
+        conn.set_authorizer(authorize)
+    conn.execute("SAVEPOINT verify")
+    try:
+        for statement in statements:
+            written.clear()
+            cursor = conn.execute(statement)
+            if cursor.description is not None:
+                count, total = _consume(cursor, fingerprint)
+                results.append((count, total if fingerprint else None))
+                continue
+            # A repeated statement reuses its prepared form and isn't authorized again
+            tables = tables_of.setdefault(statement, sorted(written))
+            if fingerprint and tables:
+                results.append((cursor.rowcount, _tables_hash(conn, tables)))
+    finally:
+        conn.execute("ROLLBACK TO verify")
+        conn.execute("RELEASE verify")
+        if fingerprint:
+            conn.set_authorizer(None)
+    return results
+
+
+def result_fingerprint(conn: sqlite3.Connection, sql_code: str) -> list:
+    """
+    Order-insensitive fingerprints [(row_count, multiset_hash), ...] of a script's result
+    sets and of the tables its data-changing statements leave behind.
+    """
+    return _run_statements(conn, split_sql_statements(sql_code), fingerprint=True)
+
+
+def median_runtime(conn: sqlite3.Connection, sql_code: str, warmup: int = 1, repetitions: int = 5) -> float:
+    """
+    Median wall time (seconds) of running a script and consuming its results.
+    """
+    statements = split_sql_statements(sql_code)
+    for _ in range(warmup):
+        _run_statements(conn, statements, fingerprint=False)
+    timings = []
+    for _ in range(max(1, repetitions)):
+        start = time.perf_counter()
+        _run_statements(conn, statements, fingerprint=False)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def verify_refactor(db_path: str, original_sql: str, refactored_sql: str, warmup: int = 1, repetitions: int = 5,
+                    tolerance: float = 0.05) -> Verification:
+    """
+    Compares a refactored script with the original.
+
+    :param tolerance: Allowed relative slowdown treated as timing noise
+    :return: Verification; `keep` is True only if equivalent and not slower
+    """
+    conn = connect(db_path)
+    try:
+        try:
+            expected = result_fingerprint(conn, original_sql)
+        except sqlite3.Error as e:
+            return Verification(False, None, None, None, False, f"original query failed: {e}")
+        if not expected:
+            return Verification(False, None, None, None, False, "not verifiable (no results and no table changes)")
+        try:
+            actual = result_fingerprint(conn, refactored_sql)
+        except sqlite3.Error as e:
+            return Verification(False, None, None, None, False, f"refactored query failed: {e}")
+
+        if actual != expected:
+            if len(actual) != len(expected):
+                reason = f"result sets differ ({len(expected)} vs {len(actual)})"
+            else:
+                reason = "results differ (" + ", ".join(
+                    f"{e[0]} vs {a[0]} rows" for e, a in zip(expected, actual)
+                ) + ")"
+            return Verification(False, None, None, None, False, reason)
+
+        original_seconds = median_runtime(conn, original_sql, warmup, repetitions)
+        refactored_seconds = median_runtime(conn, refactored_sql, warmup, repetitions)
+        speedup = original_seconds / refactored_seconds if refactored_seconds > 0 else float("inf")
+        if refactored_seconds > original_seconds * (1 + tolerance):
+            return Verification(True, original_seconds, refactored_seconds, speedup, False, "refactored query is slower")
+        return Verification(True, original_seconds, refactored_seconds, speedup, True, "equivalent and not slower")
+    finally:
+        conn.close()
+
+
+def format_speedup_table(entries) -> str:
+    """
+    Renders [(file, Verification), ...] as a fixed-width table.
+    """
+    header = ("File", "Equivalent", "Original ms", "Refactored ms", "Speedup", "Kept")
+    rows = []
+    for path, v in entries:
+        rows.append((
+            path,
+            "yes" if v.equivalent else "no",
+            f"{v.original_seconds * 1000:.2f}" if v.original_seconds is not None else "-",
+            f"{v.refactored_seconds * 1000:.2f}" if v.refactored_seconds is not None else "-",
+            f"{v.speedup:.2f}x" if v.speedup is not None else "-",
+            "yes" if v.keep else f"no ({v.reason})",
+        ))
+    widths = [max(len(str(r[i])) for r in rows + [header]) for i in range(len(header))]
+    lines = ["  ".join(str(c).ljust(w) for c, w in zip(row, widths)).rstrip() for row in [header] + rows]
+    lines.insert(1, "  ".join("-" * w for w in widths))
+    return "\n".join(lines)
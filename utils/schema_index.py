@@ -0,0 +1,110 @@
+"""
+Schema Index
+
+Precomputed, case-insensitive name index over a schema JSON in the `schema/` format
+(as produced by `sql/sp_GenerateSchemaJSON.sql`):
+
+    {"Schema": [{"TableName": ..., "Columns": [{"ColumnName": ...}], "Relationships": [
+        {"RelatedTable": ..., "ForeignKeyColumn": ..., "PrimaryTable": ..., "PrimaryKeyColumn": ...}]}]}
+"""
+
+import json
+import os
+import threading
+
+
+class TableInfo:
+    """
+    A table's original name and its columns (original spelling, in schema order).
+    """
+
+    def __init__(self, name: str, columns):
+        self.name = name
+        self.columns = list(columns)
+        self.column_index = {column.lower(): column for column in self.columns}
+
+    def has_column(self, column: str) -> bool:
+        return column.lower() in self.column_index
+
+
+class SchemaIndex:
+    """
+    Table, column and foreign-key lookups for a schema JSON document.
+    """
+
+    def __init__(self, schema: dict):
+        self.tables = {}
+        self.relationships = []
+        # frozenset({table_a, table_b}) -> {((fk_table, fk_col), (pk_table, pk_col)), ...} (all lowercase)
+        self._fk_pairs = {}
+
+        for entry in schema.get("Schema", []):
+            name = entry["TableName"]
+            self.tables[name.lower()] = TableInfo(name, (c["ColumnName"] for c in entry.get("Columns", [])))
+
+        seen = set()
+        for entry in schema.get("Schema", []):
+            for rel in entry.get("Relationships") or []:
+                key = (rel["RelatedTable"], rel["ForeignKeyColumn"], rel["PrimaryTable"], rel["PrimaryKeyColumn"])
+                if key in seen:
+                    continue
+                seen.add(key)
+                self.relationships.append(key)
+                fk = (key[0].lower(), key[1].lower())
+                pk = (key[2].lower(), key[3].lower())
+                self._fk_pairs.setdefault(frozenset((fk[0], pk[0])), set()).add((fk, pk))
+
+    @classmethod
+    def from_file(cls, path: str) -> "SchemaIndex":
+        with open(path, "r", encoding="utf-8-sig") as f:
+            return cls(json.load(f))
+
+    def table(self, name: str):
+        """
+        Returns TableInfo for a (possibly schema-qualified or bracketed) name, or None.
+        """
+        return self.tables.get(name.strip("[]\"`").split(".")[-1].strip("[]\"`").lower())
+
+    def has_table(self, name: str) -> bool:
+        return self.table(name) is not None
+
+    def are_related(self, table_a: str, table_b: str) -> bool:
+        return frozenset((table_a.lower(), table_b.lower())) in self._fk_pairs
+
+    def fk_pairs(self, table_a: str, table_b: str) -> set:
+        """
+        Foreign-key column pairs linking two tables, in either direction.
+        """
+        return self._fk_pairs.get(frozenset((table_a.lower(), table_b.lower())), set())
+
+    def is_fk_join(self, table_a: str, column_a: str, table_b: str, column_b: str) -> bool:
+        """
+        True if `table_a.column_a = table_b.column_b` follows a declared relationship.
+        """
+        left = (table_a.lower(), column_a.lower())
+        right = (table_b.lower(), column_b.lower())
+        pairs = self.fk_pairs(table_a, table_b)
+        return (left, right) in pairs or (right, left) in pairs
+
+    def __len__(self):
+        return len(self.tables)
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def load_schema_index(path: str) -> SchemaIndex:
+    """
+    Loads a schema index, reusing the cached one while the file is unchanged.
+    """
+    key = os.path.abspath(path)
+    mtime = os.path.getmtime(key)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    index = SchemaIndex.from_file(key)
+    with _cache_lock:
+        _cache[key] = (mtime, index)
+    return index
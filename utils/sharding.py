@@ -0,0 +1,107 @@
+"""
+Run Sharding
+
+Splits the discovered file list of a directory run across CI runners (`--shard i/N`).
+Each file goes to a shard by a stable hash of its path relative to the run root. Every
+runner therefore computes the same disjoint partition from its own checkout, and adding
+files never moves existing ones to another shard.
+
+With `--shard-balance`, shards are filled by estimated token load (file size), largest
+files first. Each file still prefers its hash shard and only moves on to the next one
+when that shard is full, so the partition stays mostly stable as the corpus changes while
+no shard ends up far above the average load.
+"""
+
+import hashlib
+import os
+
+from utils.token_utils import CHARS_PER_TOKEN
+
+# With --shard-balance, a shard may exceed the average estimated load by this fraction
+BALANCE_SLACK = 0.05
+
+
+def parse_shard(spec: str):
+    """
+    :param spec: "i/N" with 1 <= i <= N, e.g. "3/20"
+    :return: (i, N)
+    """
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}'. Expected i/N, e.g. 3/20")
+    if not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{spec}'. Expected 1 <= i <= N")
+    return index, count
+
+
+def shard_key(filepath: str, root: str) -> str:
+    """
+    The file's path relative to the run root, with forward slashes on every platform.
+    """
+    return os.path.relpath(filepath, root).replace(os.sep, "/")
+
+
+def stable_shard(key: str, count: int) -> int:
+    """
+    0-based shard of `key`. Unlike hash(), stable across processes and machines.
+    """
+    digest = hashlib.sha256(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def estimated_tokens(filepath: str) -> int:
+    return max(1, os.path.getsize(filepath) // CHARS_PER_TOKEN)
+
+
+def assign_shards(files, root: str, count: int, balance: bool = False, loads: dict = None) -> dict:
+    """
+    Assigns every file to a shard.
+
+    :param files: Discovered file paths
+    :param root: Run root the shard keys are relative to
+    :param count: Number of shards
+    :param balance: Even out the estimated token load instead of pure hashing
+    :param loads: {file: estimated tokens}, by default from the file sizes
+    :return: {file: 0-based shard}
+    """
+    keys = {file: shard_key(file, root) for file in files}
+    if not balance:
+        return {file: stable_shard(keys[file], count) for file in files}
+
+    if loads is None:
+        loads = {file: estimated_tokens(file) for file in files}
+    capacity = max(sum(loads.values()) / count * (1 + BALANCE_SLACK), max(loads.values(), default=0))
+    totals = [0] * count
+    assignment = {}
+    for file in sorted(files, key=lambda f: (-loads[f], keys[f])):
+        preferred = stable_shard(keys[file], count)
+        ring = [(preferred + step) % count for step in range(count)]
+        shard = next(
+            (s for s in ring if totals[s] + loads[file] <= capacity),
+            min(ring, key=lambda s: totals[s])
+        )
+        assignment[file] = shard
+        totals[shard] += loads[file]
+    return assignment
+
+
+def iter_shard(files, root: str, index: int, count: int):
+    """
+    Lazily keeps the files of hash shard `index` (1-based), so a streaming discovery
+    stays streaming. Balancing needs the whole list; see shard_files.
+    """
+    for file in files:
+        if stable_shard(shard_key(file, root), count) == index - 1:
+            yield file
+
+
+def shard_files(files, root: str, index: int, count: int, balance: bool = False) -> list:
+    """
+    The files of shard `index` (1-based, as in `--shard i/N`), in discovery order.
+    """
+    if not balance:
+        return list(iter_shard(files, root, index, count))
+    files = list(files)
+    assignment = assign_shards(files, root, count, balance)
+    return [file for file in files if assignment[file] == index - 1]
@@ -0,0 +1,94 @@
+"""
+SQL Complexity Scorer
+
+Cheap, local estimate of how hard a SQL input is for the LLM, used to route simple inputs
+to a small, fast deployment and complex ones to the strong model. It counts, on lexer
+tokens so comments and string contents don't count:
+
+- significant tokens (input size)
+- JOIN / APPLY clauses
+- subquery nesting depth
+- CTEs and window functions
+- dynamic SQL sites (from the dynamic SQL scanner)
+"""
+
+from collections import namedtuple
+
+from utils.dynamic_sql_scanner import scan_dynamic_sql
+from utils.sql_lexer import NAME, PUNCT, QUOTED_NAME, is_keyword, significant, tokenize
+
+Complexity = namedtuple("Complexity", "score tokens joins depth ctes windows dynamic")
+
+# Score contribution of each feature; a 3-line SELECT scores well under 1
+TOKENS_PER_POINT = 150
+JOIN_WEIGHT = 1.0
+DEPTH_WEIGHT = 1.5
+CTE_WEIGHT = 1.0
+WINDOW_WEIGHT = 1.0
+DYNAMIC_WEIGHT = 4.0
+
+
+def _is_punct(token, value: str) -> bool:
+    return token is not None and token.kind == PUNCT and token.value == value
+
+
+def score_sql(sql_code: str) -> Complexity:
+    """
+    :param sql_code: SQL source
+    :return: Complexity(score, tokens, joins, depth, ctes, windows, dynamic)
+    """
+    tokens = significant(tokenize(sql_code))
+    joins = depth = ctes = windows = 0
+    subquery_parens = []  # one flag per open parenthesis: does it open a subquery?
+
+    for i, token in enumerate(tokens):
+        following = tokens[i + 1] if i + 1 < len(tokens) else None
+        if _is_punct(token, "("):
+            subquery_parens.append(following is not None and is_keyword(following, "SELECT", "WITH"))
+        elif _is_punct(token, ")"):
+            if subquery_parens:
+                subquery_parens.pop()
+        elif token.kind != NAME:
+            if token.kind == QUOTED_NAME and _starts_cte(tokens, i):
+                ctes += 1
+            continue
+        elif is_keyword(token, "JOIN", "APPLY"):
+            joins += 1
+        elif is_keyword(token, "SELECT"):
+            depth = max(depth, sum(subquery_parens))
+        elif is_keyword(token, "OVER") and following is not None and (_is_punct(following, "(") or following.kind == NAME):
+            windows += 1
+        elif _starts_cte(tokens, i):
+            ctes += 1
+
+    dynamic = len(scan_dynamic_sql(sql_code))
+    score = (
+        len(tokens) / TOKENS_PER_POINT
+        + JOIN_WEIGHT * joins
+        + DEPTH_WEIGHT * depth
+        + CTE_WEIGHT * ctes
+        + WINDOW_WEIGHT * windows
+        + DYNAMIC_WEIGHT * dynamic
+    )
+    return Complexity(round(score, 2), len(tokens), joins, depth, ctes, windows, dynamic)
+
+
+def _starts_cte(tokens, index: int) -> bool:
+    """
+    True for the name in `WITH [RECURSIVE] name [(columns)] AS (` or `, name AS (`
+    inside a WITH list.
+    """
+    previous = tokens[index - 1] if index > 0 else None
+    if previous is None or not (is_keyword(previous, "WITH", "RECURSIVE") or _is_punct(previous, ",")):
+        return False
+    position = index + 1
+    if position < len(tokens) and _is_punct(tokens[position], "("):
+        # Optional column list
+        while position < len(tokens) and not _is_punct(tokens[position], ")"):
+            position += 1
+        position += 1
+    return (
+        position + 1 < len(tokens)
+        and is_keyword(tokens[position], "AS")
+        and _is_punct(tokens[position + 1], "(")
+    )
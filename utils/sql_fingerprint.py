@@ -0,0 +1,88 @@
+"""
+SQL Fingerprinting
+
+Normalizes SQL to its query shape and hashes it, so copies of the same query that
+differ only in literals, whitespace, comments, identifier quoting or case share one
+fingerprint:
+
+    SELECT * FROM [Claims] WHERE PatientID = 42 AND Code IN ('A', 'B')  -- tenant 7
+    select *   from claims where patientid = 7 and code in ('X')
+
+both normalize to `select * from claims where patientid = ? and code in ( ? )`.
+
+Query shapes are for aggregating (query logs). Results that quote values or line numbers
+can only be shared between exact copies, see text_fingerprint.
+"""
+
+import hashlib
+
+from utils.file_utils import read_sql_file
+from utils.sql_lexer import COMMENT, NUMBER, PUNCT, QUOTED_NAME, STRING, WHITESPACE, identifier_name, tokenize
+
+PLACEHOLDER = "?"
+
+
+def normalize_sql(sql_code: str) -> str:
+    """
+    Returns the canonical token stream of a query shape: literals replaced by '?',
+    lists of literals collapsed to one, identifiers unquoted and lowercased.
+    """
+    values = []
+    for token in tokenize(sql_code):
+        if token.kind in (WHITESPACE, COMMENT):
+            continue
+        if token.kind in (STRING, NUMBER):
+            # IN ('a', 'b', 'c') and VALUES (1, 2) collapse to a single placeholder
+            if len(values) >= 2 and values[-1] == "," and values[-2] == PLACEHOLDER:
+                values.pop()
+                continue
+            values.append(PLACEHOLDER)
+        elif token.kind == QUOTED_NAME:
+            values.append(identifier_name(token).lower())
+        elif token.kind == PUNCT and token.value == ";":
+            continue
+        else:
+            values.append(token.value.lower())
+    return " ".join(values)
+
+
+def fingerprint_sql(sql_code: str) -> str:
+    """
+    Stable short hash of the normalized query shape.
+    """
+    return hashlib.sha256(normalize_sql(sql_code).encode("utf-8")).hexdigest()[:16]
+
+
+def text_fingerprint(sql_code: str) -> str:
+    """
+    Stable short hash of the SQL text itself, ignoring only line endings and trailing
+    whitespace, so copies with the same fingerprint have the same literals and line numbers.
+    """
+    lines = [line.rstrip() for line in sql_code.splitlines()]
+    return hashlib.sha256("\n".join(lines).rstrip("\n").encode("utf-8")).hexdigest()[:16]
+
+
+def text_fingerprint_file(path: str) -> str:
+    """
+    Text fingerprint of a SQL file; module-level so it can run in the CPU pool.
+    """
+    return text_fingerprint(read_sql_file(path))
+
+
+def fingerprint_file(path: str) -> str:
+    """
+    Fingerprints a SQL file; module-level so it can run in the CPU pool.
+    """
+    return fingerprint_sql(read_sql_file(path))
+
+
+def group_by_fingerprint(paths, fingerprints) -> dict:
+    """
+    Groups paths by fingerprint, keeping first-seen order.
+
+    :return: {fingerprint: [representative path, duplicate paths...]}
+    """
+    groups = {}
+    for path, fingerprint in zip(paths, fingerprints):
+        groups.setdefault(fingerprint, []).append(path)
+    return groups
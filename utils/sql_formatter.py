@@ -0,0 +1,808 @@
+"""
+Local SQL Formatter
+
+Deterministic, dialect-aware formatting for the mechanical style rules, so the style
+enforcer doesn't need the LLM for them:
+
+- keyword case
+- clause layout and indentation: one clause per line, list items and AND/OR conditions on
+  indented lines, subqueries and CTE bodies indented one level
+- comma placement (trailing or leading)
+- alias style (explicit AS for column and table aliases)
+
+Built on the shared SQL lexer. Only query statements (SELECT, WITH, INSERT, UPDATE,
+DELETE) are re-laid out; other code (DDL, procedural T-SQL, MERGE) keeps its line
+structure and only gets keyword case and trailing-whitespace fixes. Formatting is
+idempotent: formatting formatted SQL changes nothing. A statement whose tokens would not
+survive re-layout unchanged is left as it was.
+"""
+
+import re
+from collections import namedtuple
+
+from utils.sql_lexer import (
+    COMMENT, NAME, NUMBER, OPERATOR, OTHER, QUOTED_NAME, STATEMENT_KEYWORDS, STRING, VARIABLE, WHITESPACE,
+    Token, tokenize
+)
+
+DEFAULT_STYLE = {
+    "keyword_case": "upper",    # upper, lower or preserve
+    "indent": 4,                # spaces per level
+    "commas": "trailing",       # trailing or leading
+    "column_aliases": "as",     # as (insert AS) or preserve
+    "table_aliases": "as",
+}
+
+# Per-dialect defaults on top of DEFAULT_STYLE
+DIALECT_STYLES = {
+    "oracle": {"table_aliases": "preserve"},  # Oracle rejects AS before table aliases
+}
+
+DIALECT_ALIASES = {
+    "t-sql": "tsql", "mssql": "tsql", "sqlserver": "tsql", "sql server": "tsql", "azure sql": "tsql",
+    "postgres": "postgresql", "pg": "postgresql", "pl/pgsql": "postgresql",
+    "pl/sql": "oracle", "mariadb": "mysql",
+}
+
+KEYWORDS = frozenset("""
+ALL ALTER AND ANY AS ASC BEGIN BETWEEN BY CASE CHECK COLLATE COLUMN CONSTRAINT CREATE CROSS
+CURSOR DECLARE DEFAULT DELETE DESC DISTINCT DROP ELSE END ESCAPE EXCEPT EXEC EXECUTE EXISTS
+FETCH FOR FOREIGN FROM FULL FUNCTION GROUP HAVING IF IN INDEX INNER INSERT INTERSECT INTO IS
+JOIN KEY LEFT LIKE NOT NULL OF ON OR ORDER OUTER OVER PARTITION PRIMARY PROCEDURE REFERENCES
+RETURN RETURNS RIGHT SELECT SET TABLE TABLESAMPLE THEN TO TRIGGER TRUNCATE UNION UNIQUE UPDATE USING
+VALUES VIEW WHEN WHERE WHILE WITH
+""".split())
+
+DIALECT_KEYWORDS = {
+    "tsql": frozenset("APPLY GO MERGE MATCHED NOLOCK OPTION OUTPUT PIVOT PRINT PROC RAISERROR TOP TRAN TRANSACTION UNPIVOT".split()),
+    "postgresql": frozenset("CONFLICT DO ILIKE LATERAL LIMIT NOTHING OFFSET RECURSIVE RETURNING".split()),
+    "mysql": frozenset("DUPLICATE LIMIT OFFSET RECURSIVE".split()),
+    "oracle": frozenset("CONNECT MINUS PRIOR START".split()),
+}
+
+# Words that are never an alias and never precede one
+NON_ALIAS_WORDS = KEYWORDS.union(*DIALECT_KEYWORDS.values()) | {
+    "ASC", "DESC", "FIRST", "LAST", "NEXT", "NULLS", "ONLY", "PERCENT", "ROW", "ROWS", "TIES",
+}
+
+# Keywords that are also function names: no space before "("
+CALL_KEYWORDS = {"LEFT", "RIGHT", "IF"}
+
+# Words that end a query statement in T-SQL batches without ';'
+_ENDERS = STATEMENT_KEYWORDS | {
+    "BREAK", "COMMIT", "CONTINUE", "DENY", "GOTO", "GRANT", "REVOKE", "ROLLBACK", "SAVE", "WAITFOR",
+}
+_SET_OPERATORS = {"UNION", "ALL", "EXCEPT", "INTERSECT", "DISTINCT", "MINUS"}
+_QUERY_STARTS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+# A query keyword after one of these is part of something else (GRANT SELECT, ON DELETE, FOR UPDATE, ...)
+_NOT_AFTER = {",", "GRANT", "REVOKE", "DENY", "FOR", "ON", "TO", "OF", "AFTER", "BEFORE", "INSTEAD", "DO", "KEY", "THEN"}
+_LOGIC_CLAUSES = {"WHERE", "HAVING"}
+# Clauses whose comma lists stay on one line
+_INLINE_CLAUSES = {"FOR", "OPTION", "LIMIT", "OFFSET", "FETCH"}
+_TABLE_CLAUSES = {"FROM"}
+_TABLE_SOURCE_END = {"ON", "USING", "WITH", "TABLESAMPLE", "PIVOT", "UNPIVOT", "FOR"}
+
+Paren = namedtuple("Paren", "open inner close")     # inner: list of elements, or a _Query
+Comment = namedtuple("Comment", "token own_line")
+
+_AS = Token(NAME, "AS", 0, 0, -1)
+
+
+def normalize_dialect(dialect: str) -> str:
+    key = (dialect or "generic").strip().lower()
+    return DIALECT_ALIASES.get(key, key.replace("-", ""))
+
+
+def style_for(dialect: str = "generic", overrides: dict = None) -> dict:
+    """
+    The formatting style of a dialect: DEFAULT_STYLE, the dialect's defaults, then
+    `overrides` ({"default": {...}, "<dialect>": {...}}, e.g. from the SQL_STYLE config).
+    """
+    key = normalize_dialect(dialect)
+    style = dict(DEFAULT_STYLE)
+    style.update(DIALECT_STYLES.get(key, {}))
+    for name, settings in (overrides or {}).items():
+        if name == "default":
+            style.update(settings)
+    for name, settings in (overrides or {}).items():
+        if name != "default" and normalize_dialect(name) == key:
+            style.update(settings)
+    return style
+
+
+def keywords_for(dialect: str) -> frozenset:
+    key = normalize_dialect(dialect)
+    if key in DIALECT_KEYWORDS:
+        return KEYWORDS | DIALECT_KEYWORDS[key]
+    return KEYWORDS.union(*DIALECT_KEYWORDS.values())
+
+
+def format_sql(sql_code: str, dialect: str = "generic", style: dict = None) -> str:
+    """
+    Formats SQL by the mechanical style rules of `style` (default: style_for(dialect)).
+
+    :param sql_code: SQL source
+    :param dialect: SQL dialect, e.g. "T-SQL", "PostgreSQL"
+    :return: Formatted SQL; formatting it again returns it unchanged
+    """
+    formatter = _Formatter(sql_code, style or style_for(dialect), keywords_for(dialect))
+    text = formatter.format()
+    return text.rstrip() + "\n" if text.strip() else text
+
+
+def _upper(element):
+    if isinstance(element, Token) and element.kind == NAME:
+        return element.value.upper()
+    return None
+
+
+def _adjacent(previous: Token, token: Token) -> bool:
+    return previous.start >= 0 and token.start == previous.start + len(previous.value)
+
+
+class _Clause:
+    def __init__(self, words, leading):
+        self.words = words          # keyword tokens, e.g. [GROUP, BY]
+        self.leading = leading      # own-line comments before the keyword
+        self.modifiers = []         # DISTINCT / TOP n after SELECT
+        self.body = []
+        self.items = []
+
+    @property
+    def name(self) -> str:
+        return " ".join(word.value.upper() for word in self.words)
+
+
+class _Item:
+    def __init__(self, elements):
+        self.leading = []
+        while elements and isinstance(elements[0], Comment) and elements[0].own_line:
+            self.leading.append(elements.pop(0))
+        self.elements = elements
+        self.trailing = []
+
+
+class _Query:
+    def __init__(self, clauses):
+        self.clauses = clauses
+
+
+class _Writer:
+    """
+    Accumulates formatted text, tracking line starts, spacing and pending line breaks
+    after line comments.
+    """
+
+    def __init__(self, formatter, base: str):
+        self.formatter = formatter
+        self.base = base
+        self.unit = " " * int(formatter.style["indent"])
+        self.parts = []
+        self.at_start = True        # nothing written on the current line yet
+        self.fresh = False          # the last part is a newline + indentation
+        self.line_level = 0
+        self.break_pending = False
+        self.break_level = 0
+        self.previous = None
+        self.unary = False
+
+    def newline(self, level: int):
+        text = "\n" + self.base + self.unit * level
+        if self.fresh:
+            self.parts[-1] = text
+        else:
+            self.parts.append(text)
+        self.fresh = self.at_start = True
+        self.line_level = level
+        self.break_pending = False
+        self.previous = None
+        self.unary = False
+
+    def token(self, token: Token, force_space: bool = False):
+        if self.break_pending:
+            self.newline(self.break_level)
+        if not self.at_start and (force_space or self._space_before(token)):
+            self.parts.append(" ")
+        self.parts.append(self.formatter.word(token))
+        self.unary = token.kind == OPERATOR and token.value in ("-", "+", "~") and self._unary_position()
+        self.previous = token
+        self.fresh = self.at_start = False
+
+    def comment(self, comment: Comment, level: int):
+        if comment.own_line and not self.at_start:
+            self.newline(level)
+        self.token(comment.token)
+        if comment.token.value.startswith("--"):
+            self.break_pending = True
+            self.break_level = level
+
+    def _unary_position(self) -> bool:
+        previous = self.previous
+        return (
+            previous is None
+            or previous.value in ("(", ",")
+            or previous.kind == OPERATOR
+            or (previous.kind == NAME and previous.value.upper() in self.formatter.keywords)
+        )
+
+    @staticmethod
+    def _splits_unary(previous: Token, token: Token) -> bool:
+        """
+        `a*-1` is a binary and a unary operator, laid out `a * -1`; other adjacent operator
+        pairs (`=>`, `->>`, `<->`) may form one operator and stay together.
+        """
+        return token.value in ("-", "+") and previous.value in ("=", "*", "/", "%", "+", "-", "<>", "!=", "<=", ">=")
+
+    def _space_before(self, token: Token) -> bool:
+        previous = self.previous
+        if previous is None:
+            return False
+        value = token.value
+        if _adjacent(previous, token) and (
+            OTHER in (previous.kind, token.kind)
+            or (previous.kind == OPERATOR and token.kind == OPERATOR and not self._splits_unary(previous, token))
+            or (token.kind == QUOTED_NAME and value.startswith("["))
+        ):
+            return False
+        if value in (",", ";", ")", ".", "::") or previous.value in ("(", ".", "::") or self.unary:
+            return False
+        if value == "(":
+            if previous.kind == QUOTED_NAME:
+                return False
+            if previous.kind == NAME:
+                word = previous.value.upper()
+                return word in self.formatter.keywords and word not in CALL_KEYWORDS
+        return True
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+class _Formatter:
+    def __init__(self, sql_code: str, style: dict, keywords):
+        self.sql = sql_code
+        self.style = style
+        self.keywords = keywords
+        self.tokens = tokenize(sql_code)
+        significant = [t for t in self.tokens if t.kind not in (WHITESPACE, COMMENT)]
+        # Parts of qualified names (x.name) keep their case
+        self.qualified = set()
+        for previous, token in zip(significant, significant[1:]):
+            if previous.value == ".":
+                self.qualified.add(token.start)
+            if token.value == ".":
+                self.qualified.add(previous.start)
+
+    def word(self, token: Token) -> str:
+        if token.kind == COMMENT:
+            return token.value.rstrip() if token.value.startswith("--") else token.value
+        case = self.style["keyword_case"]
+        if token.kind != NAME or case == "preserve" or token.start in self.qualified:
+            return token.value
+        if token.value.upper() in self.keywords:
+            return token.value.upper() if case == "upper" else token.value.lower()
+        return token.value
+
+    def format(self) -> str:
+        parts = []
+        position = 0
+        line = ""  # the current output line, for the indentation of continuation lines
+        for start, end in _query_segments(self.tokens):
+            raw = self.raw(position, start)
+            line = (line + raw).rsplit("\n", 1)[-1]
+            text = self.segment(start, end, line[:len(line) - len(line.lstrip())])
+            line = (line + text).rsplit("\n", 1)[-1]
+            parts.extend((raw, text))
+            position = end
+        parts.append(self.raw(position, len(self.tokens)))
+        return "".join(parts)
+
+    def raw(self, start: int, end: int) -> str:
+        """
+        Code outside query statements: keyword case and trailing whitespace only.
+        """
+        parts = []
+        for token in self.tokens[start:end]:
+            if token.kind == WHITESPACE and "\n" in token.value:
+                parts.append(re.sub(r"[ \t]+(?=\r?\n)", "", token.value))
+            else:
+                parts.append(self.word(token))
+        return "".join(parts)
+
+    def segment(self, start: int, end: int, base: str = "") -> str:
+        tokens = self.tokens
+        last = end - 1
+        terminator = tokens[last] if tokens[last].value == ";" else None
+        if terminator is not None:
+            last -= 1
+        try:
+            query = self._parse_query(start, last + 1)
+            writer = _Writer(self, base)
+            self.inserted = 0
+            self._render_query(writer, query, 0, continue_line=True)
+            if terminator is not None:
+                writer.token(terminator)
+            text = writer.text()
+        except ValueError:
+            return self.raw(start, end)
+        if not self._same_tokens(tokens[start:end], text):
+            return self.raw(start, end)
+        return text
+
+    def _same_tokens(self, original, text: str) -> bool:
+        """
+        Re-layout may only change whitespace, keyword case and add AS.
+        """
+        def key(token):
+            return token.value.upper() if token.kind == NAME else token.value.rstrip()
+
+        before = [key(t) for t in original if t.kind != WHITESPACE]
+        after = [key(t) for t in tokenize(text) if t.kind != WHITESPACE]
+        budget = self.inserted
+        i = 0
+        for value in after:
+            if i < len(before) and value == before[i]:
+                i += 1
+            elif value == "AS" and budget:
+                budget -= 1
+            else:
+                return False
+        return i == len(before) and budget == 0
+
+    # -- Parsing -----------------------------------------------------------------------
+
+    def _group(self, start: int, end: int) -> list:
+        """
+        Elements of tokens[start:end]: tokens, comments and parenthesized groups.
+        """
+        tokens = self.tokens
+        elements = []
+        i = start
+        while i < end:
+            token = tokens[i]
+            if token.kind == WHITESPACE:
+                i += 1
+            elif token.kind == COMMENT:
+                own_line = i > 0 and tokens[i - 1].kind == WHITESPACE and "\n" in tokens[i - 1].value
+                elements.append(Comment(token, own_line))
+                i += 1
+            elif token.value == "(":
+                close = self._matching(i, end)
+                first = next((t for t in tokens[i + 1:close] if t.kind not in (WHITESPACE, COMMENT)), None)
+                if first is not None and first.kind == NAME and first.value.upper() in ("SELECT", "WITH"):
+                    inner = self._parse_query(i + 1, close)
+                else:
+                    inner = self._group(i + 1, close)
+                elements.append(Paren(token, inner, tokens[close]))
+                i = close + 1
+            elif token.value == ")":
+                raise ValueError("Unbalanced parenthesis")
+            else:
+                elements.append(token)
+                i += 1
+        return elements
+
+    def _matching(self, open_index: int, end: int) -> int:
+        depth = 0
+        for i in range(open_index, end):
+            value = self.tokens[i].value
+            if value == "(":
+                depth += 1
+            elif value == ")":
+                depth -= 1
+                if depth == 0:
+                    return i
+        raise ValueError("Unbalanced parenthesis")
+
+    def _parse_query(self, start: int, end: int) -> _Query:
+        elements = self._group(start, end)
+        clauses = []
+        pending = []
+        current = None
+        case_depth = 0
+        i = 0
+        while i < len(elements):
+            element = elements[i]
+            if isinstance(element, Comment):
+                j = i
+                while j < len(elements) and isinstance(elements[j], Comment):
+                    j += 1
+                # Own-line comments right before a clause keyword lead that clause
+                split = j
+                while split > i and elements[split - 1].own_line:
+                    split -= 1
+                if not (case_depth == 0 and j < len(elements) and _clause_length(elements, j, clauses, current)):
+                    split = j
+                if current is not None:
+                    current.body.extend(elements[i:split])
+                else:
+                    pending.extend(elements[i:split])
+                pending.extend(elements[split:j])
+                i = j
+                continue
+
+            length = _clause_length(elements, i, clauses, current) if case_depth == 0 else 0
+            if length or current is None:
+                current = _Clause(elements[i:i + length], pending)
+                pending = []
+                clauses.append(current)
+                i += length
+                if length and current.name == "SELECT":
+                    i = _take_select_modifiers(elements, i, current)
+                if length:
+                    continue
+            word = _upper(element)
+            if word == "CASE":
+                case_depth += 1
+            elif word == "END" and case_depth:
+                case_depth -= 1
+            current.body.append(element)
+            i += 1
+
+        if pending and current is not None:
+            current.body.extend(pending)
+        for clause in clauses:
+            clause.items = _split_items(clause.body, self.style["commas"] != "leading")
+        return _Query(clauses)
+
+    # -- Rendering ---------------------------------------------------------------------
+
+    def _render_query(self, writer: _Writer, query: _Query, level: int, continue_line: bool = False):
+        commas = self.style["commas"]
+        for n, clause in enumerate(query.clauses):
+            for comment in clause.leading:
+                if n or not continue_line:
+                    writer.newline(level)
+                writer.comment(comment, level)
+            if clause.words and (n or not continue_line or clause.leading):
+                writer.newline(level)
+            for word in clause.words:
+                writer.token(word)
+            self._render_elements(writer, clause.modifiers, level + 1)
+
+            items = clause.items
+            name = clause.name
+            logic = name in _LOGIC_CLAUSES or name.endswith("JOIN") or name.endswith("APPLY")
+            if name == "WITH" or (len(items) > 1 and clause.words and name not in _INLINE_CLAUSES):
+                item_level = level if name == "WITH" else level + 1
+                for k, item in enumerate(items):
+                    if k or name != "WITH":
+                        writer.newline(item_level)
+                    for comment in item.leading:
+                        writer.comment(comment, item_level)
+                    if commas == "leading" and k:
+                        writer.token(Token(OTHER, ",", 0, 0, -1))
+                    self._render_item(writer, clause, item, item_level + 1)
+                    if commas != "leading" and k < len(items) - 1:
+                        writer.token(Token(OTHER, ",", 0, 0, -1))
+                    for comment in item.trailing:
+                        writer.comment(comment, item_level)
+            else:
+                for k, item in enumerate(items):
+                    if k:
+                        writer.token(Token(OTHER, ",", 0, 0, -1))
+                    for comment in item.leading:
+                        writer.comment(comment, level + 1)
+                    self._render_item(writer, clause, item, level + 1, logic=logic)
+                    for comment in item.trailing:
+                        writer.comment(comment, level + 1)
+
+    def _render_item(self, writer: _Writer, clause: _Clause, item: _Item, level: int, logic: bool = False):
+        alias_at = None
+        name = clause.name
+        if name == "SELECT" and self.style["column_aliases"] == "as":
+            alias_at = _alias_index(item.elements, table=False)
+        elif (name in _TABLE_CLAUSES or name.endswith("JOIN") or name.endswith("APPLY")) and self.style["table_aliases"] == "as":
+            alias_at = _alias_index(item.elements, table=True)
+        if alias_at is not None:
+            self.inserted += 1
+        self._render_elements(
+            writer, item.elements, level, logic=logic, alias_at=alias_at,
+            space_paren=name in ("INSERT", "INSERT INTO"),
+        )
+
+    def _render_elements(self, writer: _Writer, elements, level: int, logic: bool = False, alias_at=None, space_paren=False):
+        case_depth = 0
+        between = False
+        for index, element in enumerate(elements):
+            if index == alias_at:
+                writer.token(_AS)
+            if isinstance(element, Comment):
+                writer.comment(element, level)
+                continue
+            if isinstance(element, Paren):
+                self._render_paren(writer, element, level, space_paren)
+                space_paren = False
+                continue
+            word = _upper(element)
+            if logic and case_depth == 0 and word in ("AND", "OR"):
+                if word == "AND" and between:
+                    between = False
+                else:
+                    writer.newline(level)
+            if word == "BETWEEN":
+                between = True
+            elif word == "CASE":
+                case_depth += 1
+            elif word == "END" and case_depth:
+                case_depth -= 1
+            writer.token(element)
+
+    def _render_paren(self, writer: _Writer, paren: Paren, level: int, force_space: bool = False):
+        writer.token(paren.open, force_space=force_space)
+        if isinstance(paren.inner, _Query):
+            line_level = writer.line_level
+            self._render_query(writer, paren.inner, line_level + 1)
+            writer.newline(line_level)
+        else:
+            self._render_elements(writer, paren.inner, level)
+        writer.token(paren.close)
+
+
+def _clause_length(elements, i: int, clauses, current) -> int:
+    """
+    Number of elements forming a clause keyword at elements[i] (0 if none).
+    """
+    def word(offset):
+        return _upper(elements[i + offset]) if i + offset < len(elements) else None
+
+    def value(offset):
+        element = elements[i + offset] if i + offset < len(elements) else None
+        return element.value if isinstance(element, Token) else ("(" if isinstance(element, Paren) else None)
+
+    first_clause = not clauses and (current is None or not current.words)
+    previous = _upper(elements[i - 1]) if i > 0 else None
+    up = word(0)
+    if up is None:
+        return 0
+    if up == "WITH":
+        return 1 if first_clause else 0
+    if up in ("GROUP", "ORDER"):
+        return 2 if word(1) == "BY" else 0
+    if up == "INSERT":
+        return 2 if word(1) == "INTO" else 1
+    if up == "DELETE":
+        return 2 if word(1) == "FROM" else 1
+    if up in ("UNION", "EXCEPT", "INTERSECT"):
+        return 2 if word(1) in ("ALL", "DISTINCT") else 1
+    if up == "FROM":
+        return 0 if previous == "DISTINCT" else 1
+    if up == "UPDATE":
+        return 1 if first_clause else 0
+    if up == "ON":
+        if word(1) == "CONFLICT":
+            return 2
+        return 4 if (word(1), word(2), word(3)) == ("DUPLICATE", "KEY", "UPDATE") else 0
+    if up == "SET":
+        first = clauses[0].name if clauses else ""
+        return 1 if first == "UPDATE" or previous == "UPDATE" or (current is not None and current.name == "UPDATE") else 0
+    if up == "OPTION":
+        return 1 if value(1) == "(" else 0
+    if up == "FOR":
+        return 1 if word(1) in ("XML", "JSON", "UPDATE", "BROWSE", "SHARE") else 0
+    if up in ("SELECT", "WHERE", "HAVING", "VALUES", "INTO", "OUTPUT", "RETURNING", "LIMIT", "OFFSET", "FETCH"):
+        return 1
+
+    # Joins: [NATURAL] [INNER | CROSS | LEFT/RIGHT/FULL [OUTER]] [hint] JOIN, CROSS/OUTER APPLY
+    if up in ("CROSS", "OUTER") and word(1) == "APPLY":
+        return 2
+    j = 0
+    if word(j) == "NATURAL":
+        j += 1
+    if word(j) in ("LEFT", "RIGHT", "FULL"):
+        j += 1
+        if word(j) == "OUTER":
+            j += 1
+    elif word(j) in ("INNER", "CROSS"):
+        j += 1
+    if j and word(j) in ("LOOP", "HASH", "MERGE", "REMOTE"):
+        j += 1
+    return j + 1 if word(j) == "JOIN" else 0
+
+
+def _take_select_modifiers(elements, i: int, clause: _Clause) -> int:
+    """
+    Moves DISTINCT [ON (...)] / ALL / TOP n [PERCENT] [WITH TIES] onto the SELECT line.
+    """
+    start = i
+    word = _upper(elements[i]) if i < len(elements) else None
+    if word in ("DISTINCT", "ALL"):
+        i += 1
+        if word == "DISTINCT" and i + 1 < len(elements) and _upper(elements[i]) == "ON" and isinstance(elements[i + 1], Paren):
+            i += 2
+    if i < len(elements) and _upper(elements[i]) == "TOP" and i + 1 < len(elements):
+        i += 2
+        if i < len(elements) and _upper(elements[i]) == "PERCENT":
+            i += 1
+        if i + 1 < len(elements) and _upper(elements[i]) == "WITH" and _upper(elements[i + 1]) == "TIES":
+            i += 2
+    clause.modifiers = elements[start:i]
+    return i
+
+
+def _split_items(body, trailing_commas: bool = True) -> list:
+    """
+    Splits a clause body at top-level commas. With trailing commas, a comment on the same
+    line right after a comma stays with the item before it.
+    """
+    items = []
+    current = []
+    for element in body:
+        if isinstance(element, Token) and element.value == ",":
+            items.append(current)
+            current = []
+        else:
+            current.append(element)
+    if current or items:
+        items.append(current)
+
+    result = []
+    for elements in items:
+        while trailing_commas and result and elements and isinstance(elements[0], Comment) and not elements[0].own_line:
+            result[-1].trailing.append(elements.pop(0))
+        result.append(_Item(elements))
+    return [item for item in result if item.elements or item.leading or item.trailing]
+
+
+def _alias_index(elements, table: bool):
+    """
+    Index at which to insert AS before an implicit alias (`expr alias`), or None.
+    """
+    indexed = [(n, e) for n, e in enumerate(elements) if not isinstance(e, Comment)]
+    if table:
+        for position, (_, element) in enumerate(indexed):
+            if _upper(element) in _TABLE_SOURCE_END:
+                indexed = indexed[:position]
+                break
+    elif any(isinstance(e, Token) and e.kind == OPERATOR and e.value == "=" for _, e in indexed):
+        return None  # alias = expression, @variable = expression
+    if len(indexed) < 2:
+        return None
+
+    index, last = indexed[-1]
+    _, previous = indexed[-2]
+    if not isinstance(last, Token) or last.kind not in (NAME, QUOTED_NAME):
+        return None
+    if last.kind == NAME and last.value.upper() in NON_ALIAS_WORDS:
+        return None
+    if isinstance(previous, Token):
+        if _adjacent(previous, last) or previous.value == ".":
+            return None
+        word = _upper(previous)
+        if word is not None and word in NON_ALIAS_WORDS and not (word == "END" and not table):
+            return None
+        if previous.kind not in (NAME, QUOTED_NAME, NUMBER, STRING, VARIABLE):
+            return None
+    return index
+
+
+def _query_segments(tokens) -> list:
+    """
+    Token ranges [start, end) of query statements at paren depth 0.
+    """
+    significant = [(index, token) for index, token in enumerate(tokens) if token.kind not in (WHITESPACE, COMMENT)]
+    segments = []
+    depth = 0
+    k = 0
+    while k < len(significant):
+        index, token = significant[k]
+        word = token.value.upper() if token.kind == NAME else None
+        if token.value == "(":
+            depth += 1
+        elif token.value == ")":
+            depth = max(0, depth - 1)
+        elif depth == 0 and word == "MERGE":
+            # MERGE ... WHEN MATCHED THEN UPDATE/INSERT: left as is, up to its ';'
+            while k + 1 < len(significant) and significant[k + 1][1].value != ";":
+                k += 1
+        elif depth == 0 and _starts_query(significant, k):
+            end = _query_end(significant, k)
+            segments.append((index, significant[end][0] + 1))
+            k = end + 1
+            continue
+        k += 1
+    return segments
+
+
+def _starts_query(significant, k: int) -> bool:
+    token = significant[k][1]
+    if token.kind != NAME:
+        return False
+    word = token.value.upper()
+    previous = significant[k - 1][1] if k else None
+    following = significant[k + 1][1] if k + 1 < len(significant) else None
+    if previous is not None and (previous.value.upper() if previous.kind == NAME else previous.value) in _NOT_AFTER:
+        return False
+    if following is not None and (following.value == "(" or following.value.upper() == "STATISTICS"):
+        return word == "SELECT" and following.value == "("  # UPDATE(col) in triggers, UPDATE STATISTICS
+    if word in _QUERY_STARTS:
+        return True
+    return word == "WITH" and _is_cte(significant, k)
+
+
+def _is_cte(significant, k: int) -> bool:
+    """
+    WITH [RECURSIVE] name [(columns)] AS (
+    """
+    def value(n):
+        return significant[n][1].value.upper() if n < len(significant) else None
+
+    k += 1
+    if value(k) == "RECURSIVE":
+        k += 1
+    if k >= len(significant) or significant[k][1].kind not in (NAME, QUOTED_NAME):
+        return False
+    k += 1
+    if value(k) == "(":
+        while k < len(significant) and value(k) != ")":
+            k += 1
+        k += 1
+    return value(k) == "AS" and value(k + 1) == "("
+
+
+def _query_end(significant, k: int) -> int:
+    """
+    Index (into `significant`) of the last token of the query starting at k; a
+    terminating ';' is included.
+    """
+    first = significant[k][1].value.upper()
+    main = None if first == "WITH" else first
+    seen_select = first == "SELECT"
+    seen_values = seen_set = False
+    depth = case_depth = 0
+    last = k
+    j = k + 1
+    while j < len(significant):
+        token = significant[j][1]
+        value = token.value
+        word = value.upper() if token.kind == NAME else None
+        previous = significant[j - 1][1]
+        previous_word = previous.value.upper() if previous.kind == NAME else previous.value
+        if value == "(":
+            depth += 1
+        elif value == ")":
+            if depth == 0:
+                break
+            depth -= 1
+        elif value == ";" and depth == 0:
+            return j
+        elif word == "CASE":
+            case_depth += 1
+        elif word == "END":
+            if case_depth:
+                case_depth -= 1
+            else:
+                break
+        elif depth == 0 and case_depth == 0 and word == "VALUES":
+            seen_values = True
+        elif depth == 0 and case_depth == 0 and word in _ENDERS:
+            following = significant[j + 1][1] if j + 1 < len(significant) else None
+            if word in _QUERY_STARTS:
+                if word == "SELECT" and previous_word in _SET_OPERATORS:
+                    pass
+                elif word == "UPDATE" and previous_word in ("KEY", "DO"):
+                    pass
+                elif main is None:
+                    main = word
+                    seen_select = word == "SELECT"
+                elif main == "INSERT" and word == "SELECT" and not (seen_values or seen_select):
+                    seen_select = True
+                else:
+                    break
+            elif word == "WITH":
+                if following is None or not (following.value == "(" or following.value.upper() in ("TIES", "ROLLUP", "CUBE", "CHECK", "ORDINALITY")):
+                    break
+            elif word == "SET":
+                if not (previous_word == "UPDATE" or (main == "UPDATE" and not seen_set)):
+                    break
+                seen_set = True
+            elif word == "FETCH":
+                if previous_word not in ("ROWS", "ROW"):
+                    break
+            elif word == "ELSE" and case_depth:
+                pass
+            else:
+                break
+        last = j
+        j += 1
+    return last
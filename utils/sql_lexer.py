@@ -0,0 +1,99 @@
+"""
+Lightweight SQL Lexer
+
+A fast, dialect-tolerant tokenizer shared by the local (non-LLM) analysis stages:
+dynamic SQL scanning, validation, fingerprinting, minification and formatting.
+It understands comments, string literals, quoted identifiers ([x], "x", `x`) and
+variables (@x, @@x), and records the line/column of every token.
+"""
+
+import re
+from collections import namedtuple
+
+Token = namedtuple("Token", "kind value line col start")
+
+# Token kinds
+COMMENT = "comment"
+STRING = "string"
+NUMBER = "number"
+NAME = "name"
+QUOTED_NAME = "quoted_name"
+VARIABLE = "variable"
+OPERATOR = "operator"
+PUNCT = "punct"
+WHITESPACE = "whitespace"
+OTHER = "other"
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>[NnEe]?'(?:[^']|'')*(?:'|\Z))
+  | (?P<quoted_name>\[[^\]]*\]?|"(?:[^"]|"")*"?|`[^`]*`?)
+  | (?P<variable>@@?[A-Za-z_#$][\w#$]*|\$\d+)
+  | (?P<number>0[xX][0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_#][\w$#]*)
+  | (?P<whitespace>\s+)
+  | (?P<operator><>|!=|<=|>=|\|\||::|\+=|-=|\*=|/=|[-+*/%=<>!&|^~])
+  | (?P<punct>[(),;.])
+  | (?P<other>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# Keywords that begin a new statement in T-SQL batches without a terminating ';'
+STATEMENT_KEYWORDS = {
+    "ALTER", "BEGIN", "CLOSE", "CREATE", "DEALLOCATE", "DECLARE", "DELETE", "DROP", "ELSE",
+    "END", "EXEC", "EXECUTE", "FETCH", "GO", "IF", "INSERT", "MERGE", "OPEN", "PREPARE",
+    "PRINT", "RAISERROR", "RETURN", "SELECT", "SET", "THROW", "TRUNCATE", "UPDATE", "USE",
+    "WHILE", "WITH",
+}
+
+
+def tokenize(sql: str) -> list:
+    """
+    Splits SQL text into tokens, including whitespace and comments.
+
+    :param sql: SQL source
+    :return: List of Token(kind, value, line, col, start); line and col are 1-based
+    """
+    tokens = []
+    line = 1
+    line_start = 0
+    for match in _TOKEN_RE.finditer(sql):
+        kind = match.lastgroup
+        value = match.group()
+        start = match.start()
+        tokens.append(Token(kind, value, line, start - line_start + 1, start))
+        newlines = value.count("\n")
+        if newlines:
+            line += newlines
+            line_start = start + value.rindex("\n") + 1
+    return tokens
+
+
+def significant(tokens) -> list:
+    """
+    Drops whitespace and comment tokens.
+    """
+    return [t for t in tokens if t.kind not in (WHITESPACE, COMMENT)]
+
+
+def end_line(token: Token) -> int:
+    """
+    Returns the line on which a (possibly multi-line) token ends.
+    """
+    return token.line + token.value.count("\n")
+
+
+def is_keyword(token: Token, *words) -> bool:
+    return token.kind == NAME and token.value.upper() in words
+
+
+def identifier_name(token: Token) -> str:
+    """
+    Returns an identifier without its quoting ([x], "x" or `x`).
+    """
+    value = token.value
+    if token.kind == QUOTED_NAME and len(value) >= 2:
+        return value[1:-1]
+    return value
@@ -0,0 +1,542 @@
+"""
+Local SQL Validator
+
+Schema-aware validation that runs without the LLM. It checks for unterminated
+literals/comments and unbalanced parentheses, then resolves table and column references
+(including aliases, CTEs and derived tables) against a SchemaIndex, and flags join
+conditions between FK-related tables that don't follow a declared foreign key.
+
+Only errors make a query fail; warnings are reported but don't block further review.
+Resolution is deliberately conservative: whenever a scope contains a source whose
+columns are unknown (temp tables, table variables, derived tables, CTEs, functions),
+unqualified column names are not checked.
+"""
+
+import re
+from collections import namedtuple
+
+from utils.sql_lexer import (
+    NAME, NUMBER, OPERATOR, PUNCT, QUOTED_NAME, STRING, VARIABLE,
+    identifier_name, is_keyword, significant, tokenize,
+)
+
+ValidationIssue = namedtuple("ValidationIssue", "severity line col message")
+
+ERROR = "error"
+WARNING = "warning"
+
+# Reserved words, data types, date parts and built-in names that are never column references
+KEYWORDS = {
+    "ADD", "ALL", "ALTER", "AND", "ANY", "APPLY", "AS", "ASC", "AUTHORIZATION", "BEGIN", "BETWEEN", "BREAK", "BY",
+    "CASCADE", "CASE", "CAST", "CATCH", "CHECK", "CLOSE", "CLUSTERED", "COLLATE", "COLUMN", "COMMIT", "CONSTRAINT",
+    "CONTINUE", "CREATE", "CROSS", "CURRENT", "CURRENT_DATE", "CURRENT_TIME", "CURRENT_TIMESTAMP", "CURRENT_USER",
+    "CURSOR", "DATABASE", "DEALLOCATE", "DECLARE", "DEFAULT", "DELETE", "DESC", "DISTINCT", "DROP", "ELSE", "END",
+    "ESCAPE", "EXCEPT", "EXEC", "EXECUTE", "EXISTS", "FALSE", "FETCH", "FIRST", "FOLLOWING", "FOR", "FOREIGN",
+    "FROM", "FULL", "FUNCTION", "GO", "GOTO", "GRANT", "GROUP", "HAVING", "IDENTITY", "IF", "IN", "INDEX", "INNER",
+    "INSERT", "INTERSECT", "INTO", "IS", "JOIN", "KEY", "LAST", "LEFT", "LIKE", "LIMIT", "MATCHED", "MERGE", "NEXT",
+    "NOCOUNT", "NOLOCK", "NONCLUSTERED", "NOT", "NULL", "NULLS", "OF", "OFF", "OFFSET", "ON", "ONLY", "OPEN",
+    "OPTION", "OR", "ORDER", "OUTER", "OUTPUT", "OVER", "PARTITION", "PERCENT", "PRECEDING", "PRIMARY", "PRINT",
+    "PROC", "PROCEDURE", "RANGE", "RECURSIVE", "REFERENCES", "RETURN", "RETURNS", "RIGHT", "ROLLBACK", "ROW", "ROWS",
+    "SCHEMA", "SELECT", "SET", "SOME", "TABLE", "THEN", "TIES", "TO", "TOP", "TRAN", "TRANSACTION", "TRIGGER",
+    "TRUE", "TRUNCATE", "TRY", "UNBOUNDED", "UNION", "UNIQUE", "UPDATE", "USE", "USING", "VALUES", "VIEW", "WHEN",
+    "WHERE", "WHILE", "WITH", "WITHIN", "READONLY", "NOWAIT", "READPAST", "UPDLOCK", "HOLDLOCK", "ROWLOCK",
+    "TABLOCK", "RECOMPILE", "MAXDOP", "SOURCE", "TARGET", "INCLUDE", "ANSI_NULLS", "QUOTED_IDENTIFIER",
+    # Data types
+    "BIGINT", "BINARY", "BIT", "BOOLEAN", "CHAR", "CHARACTER", "DATE", "DATETIME", "DATETIME2", "DATETIMEOFFSET",
+    "DEC", "DECIMAL", "DOUBLE", "FLOAT", "GEOGRAPHY", "GEOMETRY", "IMAGE", "INT", "INTEGER", "INTERVAL", "MAX",
+    "MONEY", "NCHAR", "NTEXT", "NUMERIC", "NVARCHAR", "PRECISION", "REAL", "SERIAL", "SMALLDATETIME", "SMALLINT",
+    "SMALLMONEY", "SQL_VARIANT", "TEXT", "TIME", "TIMESTAMP", "TINYINT", "UNIQUEIDENTIFIER", "VARBINARY",
+    "VARCHAR", "XML", "JSON", "JSONB", "UUID",
+    # Built-ins usable without parentheses
+    "SYSDATETIME", "SESSION_USER", "SYSTEM_USER", "USER", "LOCALTIME", "LOCALTIMESTAMP", "ROWNUM", "SYSDATE",
+}
+# Date parts (DATEADD(day, ...), DATEPART(yy, ...), EXTRACT(YEAR FROM ...)); short ones double as table aliases
+_DATE_PARTS = {
+    "YEAR", "YY", "YYYY", "QUARTER", "QQ", "Q", "MONTH", "MM", "M", "DAYOFYEAR", "DY", "Y", "DAY", "DD", "D",
+    "WEEK", "WK", "WW", "WEEKDAY", "DW", "HOUR", "HH", "MINUTE", "MI", "N", "SECOND", "SS", "S", "MILLISECOND",
+    "MS", "MICROSECOND", "MCS", "NANOSECOND", "NS", "ISO_WEEK", "ISOWK", "ISOWW",
+}
+KEYWORDS |= _DATE_PARTS
+
+# Keywords introducing a table reference
+_TABLE_INTRODUCERS = {"FROM", "JOIN", "UPDATE", "INTO", "USING", "APPLY"}
+# Keywords that end a FROM list / table factor alias position
+_CLAUSE_KEYWORDS = {
+    "WHERE", "GROUP", "ORDER", "HAVING", "UNION", "EXCEPT", "INTERSECT", "ON", "JOIN", "INNER", "LEFT", "RIGHT",
+    "FULL", "CROSS", "OUTER", "SET", "WITH", "OPTION", "WHEN", "THEN", "LIMIT", "OFFSET", "FETCH", "FOR", "OUTPUT",
+    "SELECT", "VALUES", "USING", "APPLY", "PIVOT", "UNPIVOT", "WINDOW", "RETURNING",
+}
+# Modules whose name follows CREATE/ALTER [OR ALTER | OR REPLACE]
+_MODULE_OBJECTS = {"PROC", "PROCEDURE", "VIEW", "FUNCTION", "TRIGGER"}
+# Trigger pseudo-tables, also usable as OUTPUT qualifiers
+_PSEUDO_TABLES = {"inserted", "deleted"}
+# DDL objects whose statements are not validated against the schema
+_DDL_OBJECTS = {"TABLE", "INDEX", "TYPE", "SCHEMA", "DATABASE", "STATISTICS", "USER", "ROLE", "LOGIN", "SEQUENCE", "SYNONYM"}
+# Clause keywords after which unqualified names are column references
+_COLUMN_CLAUSES = {"SELECT", "WHERE", "ON", "HAVING", "BY", "SET"}
+# Statement keywords after which names are not column references
+_NON_COLUMN_STATEMENTS = {
+    "DECLARE", "EXEC", "EXECUTE", "PRINT", "IF", "WHILE", "RETURN", "USE", "CREATE", "ALTER", "DROP", "GRANT",
+    "VALUES", "INSERT", "OPEN", "FETCH", "CLOSE", "DEALLOCATE", "RAISERROR", "THROW", "TRUNCATE", "GOTO",
+}
+# Clause keywords tracked to tell a select list (CASE ... WHEN/THEN stays in the clause)
+_ALIAS_CLAUSES = (_COLUMN_CLAUSES | _CLAUSE_KEYWORDS | {"FROM"}) - {"WHEN", "THEN"}
+_SYSTEM_SCHEMAS = {"sys", "information_schema", "pg_catalog", "sysibm"}
+
+_STRING_RE = re.compile(r"[NnEe]?'(?:[^']|'')*'", re.DOTALL)
+
+Source = namedtuple("Source", "kind table")  # kind: table | cte | derived | unknown
+
+
+def _is_name(token) -> bool:
+    return token.kind in (NAME, QUOTED_NAME)
+
+
+def _is_punct(token, value) -> bool:
+    return token.kind == PUNCT and token.value == value
+
+
+def _matching_paren(tokens, index: int) -> int:
+    depth = 0
+    for i in range(index, len(tokens)):
+        if _is_punct(tokens[i], "("):
+            depth += 1
+        elif _is_punct(tokens[i], ")"):
+            depth -= 1
+            if depth == 0:
+                return i
+    return len(tokens) - 1
+
+
+def split_statements(tokens) -> list:
+    """
+    Splits significant tokens into statements at ';' (outside parentheses) and GO.
+    """
+    statements, current, depth = [], [], 0
+    for token in tokens:
+        if _is_punct(token, "("):
+            depth += 1
+        elif _is_punct(token, ")"):
+            depth = max(0, depth - 1)
+        if (depth == 0 and _is_punct(token, ";")) or is_keyword(token, "GO"):
+            if current:
+                statements.append(current)
+            current = []
+            continue
+        current.append(token)
+    if current:
+        statements.append(current)
+    return statements
+
+
+def format_issues(issues) -> str:
+    """
+    Renders issues as 'line L, col C: severity: message' lines.
+    """
+    return "\n".join(f"line {i.line}, col {i.col}: {i.severity}: {i.message}" for i in issues)
+
+
+class LocalSQLValidator:
+    """
+    Validates SQL locally, optionally against a SchemaIndex.
+    """
+
+    def __init__(self, schema_index=None):
+        self.schema = schema_index
+
+    def validate(self, sql_code: str) -> list:
+        """
+        :param sql_code: SQL source (one or more statements)
+        :return: List of ValidationIssue sorted by location
+        """
+        tokens = tokenize(sql_code)
+        issues = self._check_lexical(tokens)
+        tokens = significant(tokens)
+        issues += self._check_parentheses(tokens)
+
+        if self.schema is not None and not issues:
+            statements = split_statements(tokens)
+            created = self._created_tables(statements)
+            for statement in statements:
+                issues += self._check_statement(statement, created)
+
+        return sorted(issues, key=lambda issue: (issue.line, issue.col))
+
+    @staticmethod
+    def has_errors(issues) -> bool:
+        return any(issue.severity == ERROR for issue in issues)
+
+    # -- Syntax ----------------------------------------------------------------------
+
+    @staticmethod
+    def _check_lexical(tokens) -> list:
+        issues = []
+        for token in tokens:
+            if token.kind == STRING and not _STRING_RE.fullmatch(token.value):
+                issues.append(ValidationIssue(ERROR, token.line, token.col, "Unterminated string literal"))
+            elif token.kind == "comment" and token.value.startswith("/*") and (len(token.value) < 4 or not token.value.endswith("*/")):
+                issues.append(ValidationIssue(ERROR, token.line, token.col, "Unterminated block comment"))
+            elif token.kind == QUOTED_NAME and (len(token.value) < 2 or token.value[-1] != {"[": "]", '"': '"', "`": "`"}[token.value[0]]):
+                issues.append(ValidationIssue(ERROR, token.line, token.col, "Unterminated quoted identifier"))
+        return issues
+
+    @staticmethod
+    def _check_parentheses(tokens) -> list:
+        issues, stack = [], []
+        for token in tokens:
+            if _is_punct(token, "("):
+                stack.append(token)
+            elif _is_punct(token, ")"):
+                if stack:
+                    stack.pop()
+                else:
+                    issues.append(ValidationIssue(ERROR, token.line, token.col, "Unmatched closing parenthesis"))
+        for token in stack:
+            issues.append(ValidationIssue(ERROR, token.line, token.col, "Unclosed parenthesis"))
+        return issues
+
+    # -- Name resolution -------------------------------------------------------------
+
+    @staticmethod
+    def _created_tables(statements) -> set:
+        """
+        Tables created by the script itself (CREATE TABLE x / SELECT ... INTO x).
+        """
+        created = set()
+        for statement in statements:
+            for i, token in enumerate(statement[:-1]):
+                if (is_keyword(token, "TABLE") and i > 0 and is_keyword(statement[i - 1], "CREATE")) or \
+                        (is_keyword(token, "INTO") and not (i > 0 and is_keyword(statement[i - 1], "INSERT", "MERGE"))):
+                    name = statement[i + 1]
+                    j = i + 1
+                    while j + 2 < len(statement) and _is_punct(statement[j + 1], ".") and _is_name(statement[j + 2]):
+                        j += 2
+                        name = statement[j]
+                    if _is_name(name):
+                        created.add(identifier_name(name).lower())
+        return created
+
+    @staticmethod
+    def _collect_ctes(statement, skip: set) -> dict:
+        """
+        Returns {cte_name_lower: token_index} and marks CTE name/column tokens in `skip`.
+        """
+        ctes = {}
+        n = len(statement)
+        for i, token in enumerate(statement):
+            if not is_keyword(token, "WITH") or i + 1 >= n:
+                continue
+            j = i + 1
+            if is_keyword(statement[j], "RECURSIVE"):
+                j += 1
+            while j < n and _is_name(statement[j]):
+                name_index = j
+                k = j + 1
+                columns = []
+                if k < n and _is_punct(statement[k], "("):
+                    close = _matching_paren(statement, k)
+                    columns = list(range(k + 1, close))
+                    k = close + 1
+                if not (k + 1 < n and is_keyword(statement[k], "AS") and _is_punct(statement[k + 1], "(")):
+                    break
+                ctes[identifier_name(statement[name_index]).lower()] = name_index
+                skip.add(name_index)
+                skip.update(columns)
+                j = _matching_paren(statement, k + 1) + 1
+                if j < n and _is_punct(statement[j], ","):
+                    j += 1
+                else:
+                    break
+        return ctes
+
+    def _parse_alias(self, statement, index: int, skip: set):
+        """
+        Parses an optional `[AS] alias` at `index`. Returns (alias_lower or None, next_index).
+        """
+        n = len(statement)
+        if index < n and is_keyword(statement[index], "AS") and index + 1 < n and _is_name(statement[index + 1]):
+            skip.update((index, index + 1))
+            return identifier_name(statement[index + 1]).lower(), index + 2
+        if index < n and _is_name(statement[index]) and not (
+                statement[index].kind == NAME and statement[index].value.upper() in (KEYWORDS - _DATE_PARTS) | _CLAUSE_KEYWORDS):
+            skip.add(index)
+            return identifier_name(statement[index]).lower(), index + 1
+        return None, index
+
+    def _parse_table_factor(self, statement, index: int, ctes, created, sources, skip, issues, deferred=False) -> int:
+        """
+        Parses one table reference starting at `index`, plus any PIVOT/UNPIVOT applied to it,
+        and registers it in `sources`. Returns the index after the factor (and its alias).
+        """
+        nxt = self._parse_table_source(statement, index, ctes, created, sources, skip, issues, deferred)
+        while nxt + 1 < len(statement) and is_keyword(statement[nxt], "PIVOT", "UNPIVOT") and _is_punct(statement[nxt + 1], "("):
+            # The pivot's columns are defined by its IN list, so its alias has unknown columns
+            close = _matching_paren(statement, nxt + 1)
+            skip.update(range(nxt + 2, close))
+            alias, nxt = self._parse_alias(statement, close + 1, skip)
+            if alias:
+                sources[alias] = Source("derived", None)
+        return nxt
+
+    def _parse_table_source(self, statement, index: int, ctes, created, sources, skip, issues, deferred=False) -> int:
+        n = len(statement)
+        if index >= n:
+            return index
+        token = statement[index]
+
+        if _is_punct(token, "("):
+            close = _matching_paren(statement, index)
+            alias, nxt = self._parse_alias(statement, close + 1, skip)
+            if alias:
+                sources[alias] = Source("derived", None)
+            return nxt
+
+        if token.kind == VARIABLE:
+            alias, nxt = self._parse_alias(statement, index + 1, skip)
+            sources[alias or token.value.lower()] = Source("unknown", None)
+            return nxt
+
+        if not _is_name(token):
+            return index
+
+        parts = [index]
+        j = index
+        while j + 2 < n and _is_punct(statement[j + 1], ".") and _is_name(statement[j + 2]):
+            j += 2
+            parts.append(j)
+        skip.update(range(index, j + 1))
+        names = [identifier_name(statement[p]) for p in parts]
+        name = names[-1]
+        key = name.lower()
+
+        if j + 1 < n and _is_punct(statement[j + 1], "("):
+            # Table-valued function
+            close = _matching_paren(statement, j + 1)
+            alias, nxt = self._parse_alias(statement, close + 1, skip)
+            sources[alias or key] = Source("unknown", None)
+            return nxt
+
+        alias, nxt = self._parse_alias(statement, j + 1, skip)
+
+        if any(part.lower() in _SYSTEM_SCHEMAS for part in names[:-1]) or name.startswith("#") or key in created \
+                or (len(names) == 1 and key in _PSEUDO_TABLES):
+            source = Source("unknown", None)
+        elif key in ctes:
+            source = Source("cte", None)
+        elif self.schema.has_table(name):
+            source = Source("table", self.schema.table(name))
+        elif deferred:
+            # UPDATE/DELETE target may be an alias defined later in the FROM clause
+            return nxt
+        else:
+            issues.append(ValidationIssue(ERROR, statement[parts[-1]].line, statement[parts[-1]].col,
+                                          f"Unknown table '{'.'.join(names)}'"))
+            source = Source("unknown", None)
+
+        sources.setdefault(key, source)
+        if alias:
+            sources[alias] = source
+        return nxt
+
+    def _check_statement(self, statement, created) -> list:
+        issues = []
+        first = statement[0]
+        if is_keyword(first, "CREATE", "ALTER", "DROP") and len(statement) > 1 and statement[1].kind == NAME \
+                and statement[1].value.upper() in _DDL_OBJECTS:
+            return issues
+
+        skip = set()
+        body = self._module_body(statement)
+        skip.update(range(body))
+        ctes = self._collect_ctes(statement, skip)
+        sources = {}
+        deferred_targets = []
+
+        # Pass 1: table references
+        n = len(statement)
+        for i, token in enumerate(statement):
+            if i < body or token.kind != NAME or token.value.upper() not in _TABLE_INTRODUCERS | {"MERGE"} or i + 1 >= n:
+                continue
+            word = token.value.upper()
+            previous = statement[i - 1] if i > 0 else None
+            if word == "MERGE" and is_keyword(statement[i + 1], "INTO"):
+                continue
+            if word == "UPDATE" and is_keyword(statement[i + 1], "SET"):
+                # MERGE ... WHEN MATCHED THEN UPDATE SET
+                continue
+            if word == "INTO" and not (previous is not None and is_keyword(previous, "INSERT", "MERGE")):
+                # SELECT ... INTO creates the table
+                self._parse_alias(statement, i + 1, skip)
+                continue
+            if word == "UPDATE" and is_keyword(statement[i + 1], "STATISTICS"):
+                continue
+            if word == "UPDATE" or (word == "FROM" and previous is not None and is_keyword(previous, "DELETE")):
+                deferred_targets.append(i + 1)
+                self._parse_table_factor(statement, i + 1, ctes, created, sources, skip, issues, deferred=True)
+                continue
+
+            nxt = self._parse_table_factor(statement, i + 1, ctes, created, sources, skip, issues)
+            while word == "FROM" and nxt < n and _is_punct(statement[nxt], ","):
+                nxt = self._parse_table_factor(statement, nxt + 1, ctes, created, sources, skip, issues)
+
+        # Deferred UPDATE/DELETE targets must be a table or a known alias
+        for index in deferred_targets:
+            token = statement[index]
+            if _is_name(token) and identifier_name(token).lower() not in sources and not token.value.startswith("#"):
+                self._parse_table_factor(statement, index, ctes, created, sources, skip, issues)
+
+        if not sources:
+            return issues
+
+        # Pass 2: column references
+        issues += self._check_columns(statement, sources, skip)
+        issues += self._check_fk_joins(statement, sources)
+        return issues
+
+    @staticmethod
+    def _module_body(statement) -> int:
+        """
+        Index where the body of CREATE/ALTER PROC|VIEW|FUNCTION|TRIGGER starts (0 for other
+        statements). The module name is not a table reference; for triggers the header
+        `ON table {AFTER | FOR | INSTEAD OF} INSERT, UPDATE, DELETE AS` is skipped too.
+        """
+        n = len(statement)
+        if not is_keyword(statement[0], "CREATE", "ALTER"):
+            return 0
+        i = 1
+        if i + 1 < n and is_keyword(statement[i], "OR") and is_keyword(statement[i + 1], "ALTER", "REPLACE"):
+            i += 2
+        if i + 1 >= n or not is_keyword(statement[i], *_MODULE_OBJECTS):
+            return 0
+        if is_keyword(statement[i], "TRIGGER"):
+            while i < n and not is_keyword(statement[i], "AS"):
+                i += 1
+            return i + 1
+        i += 1
+        while i + 2 < n and _is_name(statement[i]) and _is_punct(statement[i + 1], ".") and _is_name(statement[i + 2]):
+            i += 2
+        return i + 1
+
+    def _check_columns(self, statement, sources, skip) -> list:
+        issues = []
+        n = len(statement)
+        all_tables = all(source.kind == "table" for source in sources.values())
+        tables = {source.table.name.lower(): source.table for source in sources.values() if source.kind == "table"}
+
+        # Column aliases: `expr AS alias`, bare `expr alias` and T-SQL `alias = expr` in a select list
+        aliases = set()
+        clauses = [None]  # Current clause keyword per parenthesis depth
+        for i, token in enumerate(statement):
+            if _is_punct(token, "("):
+                clauses.append(None)
+            elif _is_punct(token, ")") and len(clauses) > 1:
+                clauses.pop()
+            following = statement[i + 1] if i + 1 < n else None
+            if token.kind == NAME and token.value.upper() in _ALIAS_CLAUSES and not (following is not None and _is_punct(following, "(")):
+                clauses[-1] = token.value.upper()
+            if i in skip or not _is_name(token):
+                continue
+            previous = statement[i - 1] if i > 0 else None
+            if previous is not None and is_keyword(previous, "AS"):
+                aliases.add(identifier_name(token).lower())
+            elif clauses[-1] == "SELECT" and following is not None and following.kind == OPERATOR and following.value == "=" \
+                    and previous is not None and (_is_punct(previous, ",") or is_keyword(previous, "SELECT") or
+                                                  is_keyword(previous, "DISTINCT") or previous.kind == NUMBER):
+                aliases.add(identifier_name(token).lower())
+                skip.add(i)
+            elif previous is not None and (previous.kind in (QUOTED_NAME, NUMBER, STRING) or _is_punct(previous, ")") or
+                                           is_keyword(previous, "END") or
+                                           (previous.kind == NAME and previous.value.upper() not in KEYWORDS | _CLAUSE_KEYWORDS)) \
+                    and not (i + 1 < n and (_is_punct(statement[i + 1], ".") or _is_punct(statement[i + 1], "("))) \
+                    and not (token.kind == NAME and token.value.upper() in KEYWORDS | _CLAUSE_KEYWORDS):
+                aliases.add(identifier_name(token).lower())
+                skip.add(i)
+
+        checking = False  # Whether unqualified names in the current clause are column references
+        i = 0
+        while i < n:
+            token = statement[i]
+            if token.kind == NAME and token.value.upper() in _COLUMN_CLAUSES:
+                checking = True
+            elif token.kind == NAME and token.value.upper() in _NON_COLUMN_STATEMENTS:
+                checking = False
+            elif token.kind == NAME and token.value.upper() in ("FROM", "JOIN", "INTO", "UPDATE", "USING"):
+                checking = False
+
+            if i in skip or not _is_name(token) or (i > 0 and _is_punct(statement[i - 1], ".")):
+                i += 1
+                continue
+
+            # Dotted chain: qualifier.column (or schema.table.column)
+            j = i
+            while j + 2 < n and _is_punct(statement[j + 1], ".") and (_is_name(statement[j + 2]) or statement[j + 2].value == "*"):
+                j += 2
+            if j > i:
+                if not (j + 1 < n and _is_punct(statement[j + 1], "(")):
+                    qualifier = identifier_name(statement[j - 2]).lower()
+                    column = statement[j]
+                    source = sources.get(qualifier)
+                    if source is None and j - 2 == i and qualifier not in _PSEUDO_TABLES:
+                        issues.append(ValidationIssue(ERROR, statement[i].line, statement[i].col,
+                                                      f"Unknown table or alias '{identifier_name(statement[i])}'"))
+                    elif source is not None and source.kind == "table" and column.value != "*" \
+                            and not source.table.has_column(identifier_name(column)):
+                        issues.append(ValidationIssue(ERROR, column.line, column.col,
+                                                      f"Unknown column '{identifier_name(column)}' in table '{source.table.name}'"))
+                i = j + 1
+                continue
+
+            # Unqualified name
+            if checking and all_tables and tables and not (i + 1 < n and _is_punct(statement[i + 1], "(")) \
+                    and not (token.kind == NAME and token.value.upper() in KEYWORDS | _CLAUSE_KEYWORDS):
+                name = identifier_name(token)
+                if name.lower() not in aliases and not any(table.has_column(name) for table in tables.values()):
+                    scope = ", ".join(sorted(table.name for table in tables.values()))
+                    issues.append(ValidationIssue(ERROR, token.line, token.col, f"Unknown column '{name}' (tables in scope: {scope})"))
+            i += 1
+
+        return issues
+
+    def _check_fk_joins(self, statement, sources) -> list:
+        """
+        Warns about `a.x = b.y` join conditions between FK-related tables that don't
+        match any declared relationship.
+        """
+        issues = []
+        n = len(statement)
+        in_on = False
+        for i, token in enumerate(statement):
+            if is_keyword(token, "ON"):
+                in_on = True
+                continue
+            if token.kind == NAME and token.value.upper() in ("JOIN", "WHERE", "GROUP", "ORDER", "HAVING", "UNION", "SELECT", "SET", "WHEN"):
+                in_on = False
+            if not in_on or not (token.kind == OPERATOR and token.value == "=") or i < 3 or i + 3 >= n:
+                continue
+
+            left = statement[i - 3:i]
+            right = statement[i + 1:i + 4]
+            if not (_is_name(left[0]) and _is_punct(left[1], ".") and _is_name(left[2]) and
+                    _is_name(right[0]) and _is_punct(right[1], ".") and _is_name(right[2])):
+                continue
+            left_source = sources.get(identifier_name(left[0]).lower())
+            right_source = sources.get(identifier_name(right[0]).lower())
+            if not (left_source and right_source and left_source.kind == "table" and right_source.kind == "table"):
+                continue
+            left_table, right_table = left_source.table.name, right_source.table.name
+            if left_table.lower() == right_table.lower() or not self.schema.are_related(left_table, right_table):
+                continue
+            left_column, right_column = identifier_name(left[2]), identifier_name(right[2])
+            if not self.schema.is_fk_join(left_table, left_column, right_table, right_column):
+                pair = {left_table.lower(), right_table.lower()}
+                expected = " or ".join(
+                    f"{fk_table}.{fk_column} = {pk_table}.{pk_column}"
+                    for fk_table, fk_column, pk_table, pk_column in self.schema.relationships
+                    if {fk_table.lower(), pk_table.lower()} == pair
+                )
+                issues.append(ValidationIssue(
+                    WARNING, token.line, token.col,
+                    f"Join {left_table}.{left_column} = {right_table}.{right_column} does not follow a declared "
+                    f"foreign key (expected {expected})"
+                ))
+        return issues
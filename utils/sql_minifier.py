@@ -0,0 +1,67 @@
+"""
+SQL Minifier
+
+Shrinks SQL before it is rendered into an LLM prompt: comments are dropped (optimizer
+hints like /*+ ... */ and MySQL /*! ... */ are kept), indentation is removed and runs of
+whitespace collapse to one space. Blank and comment-only lines disappear, so the
+minified text has fewer lines than the original. A line map records the original line
+of every minified line, and `remap_line_references` rewrites "line N" mentions in the
+LLM's answer back to original line numbers.
+"""
+
+import re
+from collections import namedtuple
+
+from utils.sql_lexer import COMMENT, WHITESPACE, end_line, tokenize
+
+# text: minified SQL; line_map[i]: original line number of minified line i + 1
+MinifiedSQL = namedtuple("MinifiedSQL", "text line_map")
+
+_LINE_REFERENCE = re.compile(r"\b(lines?\s+)(\d+)(?:(\s*(?:-|–|to|and)\s*)(\d+))?", re.IGNORECASE)
+
+
+def _is_hint(token) -> bool:
+    return token.kind == COMMENT and token.value.startswith(("/*+", "/*!"))
+
+
+def minify_sql(sql_code: str) -> MinifiedSQL:
+    """
+    :param sql_code: SQL source
+    :return: MinifiedSQL(text, line_map)
+    """
+    pieces = []
+    line_map = []
+    previous = None
+    for token in tokenize(sql_code):
+        if token.kind == WHITESPACE or (token.kind == COMMENT and not _is_hint(token)):
+            continue
+        if previous is None:
+            line_map.append(token.line)
+        elif token.line > end_line(previous):
+            pieces.append("\n")
+            line_map.append(token.line)
+        elif token.start > previous.start + len(previous.value):
+            pieces.append(" ")
+        pieces.append(token.value)
+        # Multi-line string literals keep their line breaks
+        line_map.extend(token.line + k for k in range(1, token.value.count("\n") + 1))
+        previous = token
+    return MinifiedSQL("".join(pieces), line_map)
+
+
+def remap_line_references(text: str, line_map) -> str:
+    """
+    Rewrites "line N" / "lines N-M" in `text` from minified to original line numbers.
+    Numbers outside the minified text are left unchanged.
+    """
+    def original(number: str) -> str:
+        index = int(number) - 1
+        return str(line_map[index]) if 0 <= index < len(line_map) else number
+
+    def replace(match) -> str:
+        result = match.group(1) + original(match.group(2))
+        if match.group(4):
+            result += match.group(3) + original(match.group(4))
+        return result
+
+    return _LINE_REFERENCE.sub(replace, text)
@@ -0,0 +1,162 @@
+"""
+SQL Patches
+
+Patch mode for the file-rewriting tasks (comment, refactor, style_enforce). The model gets
+the SQL with line numbers and returns only unified-diff hunks instead of echoing the whole
+file. Most of a large file's completion tokens, and so its latency, would otherwise go to
+repeating unchanged lines.
+
+Hunks are applied locally with strict validation: every context and removed line must match
+the file. A hunk whose line numbers are off is still applied if its lines occur exactly once
+after the previous hunk. A patch that doesn't apply falls back to a full-text call.
+"""
+
+import re
+import time
+from collections import namedtuple
+
+from core.metrics import run_metrics
+from utils.token_utils import estimate_tokens
+
+NO_CHANGES = "NO CHANGES"
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+FENCE = re.compile(r"^```[\w-]*\s*$")
+
+# start: first old line (1-based) from the header; lines: [(op, text)], op " " (context), "-" or "+"
+Hunk = namedtuple("Hunk", "start lines")
+
+
+class PatchError(ValueError):
+    """
+    The model's patch is malformed or doesn't match the file.
+    """
+
+
+def parse_patch(text: str) -> list:
+    """
+    Parses unified-diff hunks. File headers (---/+++), markdown fences and
+    "\\ No newline at end of file" markers are ignored.
+
+    :return: [Hunk]; empty for "NO CHANGES"
+    """
+    lines = [line for line in text.strip().splitlines() if not FENCE.match(line)]
+    if [line.strip().upper() for line in lines if line.strip()] == [NO_CHANGES]:
+        return []
+
+    hunks = []
+    current = None
+    for line in lines:
+        header = HUNK_HEADER.match(line)
+        if header:
+            old_start = int(header.group(1))
+            # -N,0 inserts after line N
+            start = old_start + 1 if header.group(2) == "0" else old_start
+            current = Hunk(start, [])
+            hunks.append(current)
+        elif current is None:
+            if line.startswith(("---", "+++", "diff ", "index ")) or not line.strip():
+                continue
+            raise PatchError(f"Expected a hunk header, got: {line[:80]!r}")
+        elif line.startswith("\\"):
+            continue
+        elif line.startswith(("-", "+", " ")):
+            current.lines.append((line[0], line[1:]))
+        elif not line:
+            current.lines.append((" ", ""))
+        else:
+            raise PatchError(f"Unexpected line in hunk: {line[:80]!r}")
+    if not hunks:
+        raise PatchError("No hunks in patch")
+    return hunks
+
+
+def apply_patch(original: str, hunks) -> str:
+    """
+    Applies hunks in order. Lines are compared ignoring trailing whitespace; context lines
+    are kept as they are in the file.
+
+    :raises PatchError: A hunk doesn't match, is ambiguous or overlaps the previous one
+    """
+    lines = original.splitlines()
+    output = []
+    position = 0
+    for hunk in hunks:
+        at = _locate(lines, hunk, position)
+        output.extend(lines[position:at])
+        position = at
+        for op, text in hunk.lines:
+            if op == "+":
+                output.append(text)
+                continue
+            if op == " ":
+                output.append(lines[position])
+            position += 1
+    output.extend(lines[position:])
+
+    text = "\n".join(output)
+    if original.endswith("\n") and output:
+        text += "\n"
+    return text
+
+
+def _locate(lines, hunk: Hunk, position: int) -> int:
+    """
+    Index of the file line where the hunk's context and removed lines start.
+    """
+    old = [text for op, text in hunk.lines if op != "+"]
+
+    def matches(at):
+        return at + len(old) <= len(lines) and all(lines[at + n].rstrip() == line.rstrip() for n, line in enumerate(old))
+
+    expected = hunk.start - 1
+    if expected >= position and matches(expected):
+        return expected
+    if not old:
+        raise PatchError(f"Insertion at line {hunk.start} is outside the file")
+    candidates = [at for at in range(position, len(lines) - len(old) + 1) if matches(at)]
+    if len(candidates) != 1:
+        problem = "does not match the file" if not candidates else "matches more than one place"
+        raise PatchError(f"Hunk at line {hunk.start} {problem}")
+    return candidates[0]
+
+
+async def request_rewrite(client, original: str, full_text, patch_prompt=None, temperature: float = 0.3, logger=None) -> str:
+    """
+    Gets a rewritten file from the model: as a patch when a patch prompt is given, with
+    the whole-file call as the fallback, otherwise as full text.
+
+    The file's completion tokens (from the client's `completion_tokens` counter) and wall
+    time are recorded per mode: rewrite.full.*, rewrite.patch.* and, when the patch didn't
+    apply, rewrite.patch_fallback.*.
+
+    :param client: AI client with generate()
+    :param original: The SQL the patch applies to
+    :param full_text: Async callable returning the whole-file result
+    :param patch_prompt: Prompt asking for hunks against the numbered SQL; None for full text
+    :return: The rewritten SQL
+    """
+    started = time.monotonic()
+    tokens = getattr(client, "completion_tokens", 0)
+    result = None
+    mode = "full"
+    if patch_prompt is not None:
+        response = await client.generate(patch_prompt, temperature=temperature)
+        try:
+            result = apply_patch(original, parse_patch(response))
+            mode = "patch"
+            run_metrics.increment("patch.applied")
+            # What echoing the whole file would have cost, for comparison
+            run_metrics.increment("patch.full_text_tokens_estimate", estimate_tokens(result))
+        except PatchError as e:
+            if logger:
+                logger.warning(f"Patch not applied, falling back to full text: {e}")
+            run_metrics.increment("patch.fallbacks")
+            mode = "patch_fallback"
+    if result is None:
+        result = await full_text()
+
+    run_metrics.increment(f"rewrite.{mode}.files")
+    run_metrics.increment(f"rewrite.{mode}.completion_tokens", getattr(client, "completion_tokens", 0) - tokens)
+    run_metrics.observe(f"rewrite.{mode}.wall_time", time.monotonic() - started)
+    return result
@@ -0,0 +1,144 @@
+"""
+SQLite Benchmark
+
+Measures real query execution against a local SQLite database: each statement is run
+with warmup and N timed repetitions, and its wall-time percentiles, row count and
+`EXPLAIN QUERY PLAN` output are recorded. Every execution runs inside a savepoint that
+is rolled back, so data-modifying statements can be benchmarked without changing the
+database.
+"""
+
+import sqlite3
+import statistics
+import time
+from collections import namedtuple
+
+from utils.sql_lexer import significant, tokenize
+from utils.sql_local_validator import split_statements
+
+BenchmarkResult = namedtuple("BenchmarkResult", "statement rows timings plan error")
+
+PERCENTILES = (50, 95, 99)
+
+
+def split_sql_statements(sql_code: str) -> list:
+    """
+    Splits a script into statement texts at ';' and GO (comments are kept inside statements).
+    """
+    statements = []
+    for tokens in split_statements(significant(tokenize(sql_code))):
+        first, last = tokens[0], tokens[-1]
+        statements.append(sql_code[first.start:last.start + len(last.value)].strip())
+    return statements
+
+
+def percentile(ordered, pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """
+    Opens an existing database (never creates one) in autocommit mode, so savepoints
+    control the transactions.
+    """
+    return sqlite3.connect(f"file:{db_path}?mode=rw", uri=True, isolation_level=None)
+
+
+def query_plan(conn: sqlite3.Connection, statement: str) -> str:
+    """
+    Returns `EXPLAIN QUERY PLAN` output as an indented tree.
+    """
+    depths = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {statement}").fetchall():
+        depth = depths.get(parent, -1) + 1
+        depths[node_id] = depth
+        lines.append(f"{'  ' * depth}{detail}")
+    return "\n".join(lines)
+
+
+def _execute_once(conn: sqlite3.Connection, statement: str):
+    """
+    Executes a statement inside a rolled-back savepoint. Returns (seconds, rows).
+    """
+    conn.execute("SAVEPOINT benchmark")
+    try:
+        start = time.perf_counter()
+        cursor = conn.execute(statement)
+        rows = len(cursor.fetchall()) if cursor.description else max(cursor.rowcount, 0)
+        elapsed = time.perf_counter() - start
+    finally:
+        conn.execute("ROLLBACK TO benchmark")
+        conn.execute("RELEASE benchmark")
+    return elapsed, rows
+
+
+def check_sql(conn: sqlite3.Connection, sql_code: str):
+    """
+    Compiles and runs every statement (rolled back). Returns None if all succeed,
+    otherwise the first SQLite error as "Statement N: message".
+    """
+    statements = split_sql_statements(sql_code)
+    if not statements:
+        return "No SQL statement found"
+    for number, statement in enumerate(statements, 1):
+        try:
+            _execute_once(conn, statement)
+        except sqlite3.Error as e:
+            return f"Statement {number}: {e}"
+    return None
+
+
+def benchmark_statement(conn: sqlite3.Connection, statement: str, warmup: int = 1, repetitions: int = 5) -> BenchmarkResult:
+    """
+    Benchmarks one statement. SQLite errors are captured in the result.
+    """
+    try:
+        plan = query_plan(conn, statement)
+        for _ in range(warmup):
+            _execute_once(conn, statement)
+        timings, rows = [], 0
+        for _ in range(max(1, repetitions)):
+            elapsed, rows = _execute_once(conn, statement)
+            timings.append(elapsed)
+        return BenchmarkResult(statement, rows, sorted(timings), plan, None)
+    except sqlite3.Error as e:
+        return BenchmarkResult(statement, None, [], None, str(e))
+
+
+def benchmark_script(db_path: str, sql_code: str, warmup: int = 1, repetitions: int = 5) -> list:
+    """
+    Benchmarks every statement of a script against the database at `db_path`.
+
+    :return: List of BenchmarkResult, one per statement
+    """
+    conn = connect(db_path)
+    try:
+        return [benchmark_statement(conn, statement, warmup, repetitions) for statement in split_sql_statements(sql_code)]
+    finally:
+        conn.close()
+
+
+def format_benchmark_report(results, warmup: int = 1) -> str:
+    """
+    Renders measured results as plain text (also used as LLM input).
+    """
+    lines = []
+    for number, result in enumerate(results, 1):
+        preview = " ".join(result.statement.split())
+        lines.append(f"Statement {number}: {preview[:200]}{'...' if len(preview) > 200 else ''}")
+        if result.error:
+            lines.append(f"  Error: {result.error}")
+            continue
+        ms = [t * 1000 for t in result.timings]
+        stats = ", ".join(f"p{p} {percentile(ms, p):.3f}" for p in PERCENTILES)
+        lines.append(f"  Runs: {len(ms)} (after {warmup} warmup)")
+        lines.append(f"  Wall time (ms): min {ms[0]:.3f}, mean {statistics.mean(ms):.3f}, {stats}, max {ms[-1]:.3f}")
+        lines.append(f"  Rows: {result.rows}")
+        lines.append("  Query plan:")
+        lines.extend(f"    {line}" for line in (result.plan or "(none)").splitlines())
+    return "\n".join(lines)
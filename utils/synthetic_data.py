@@ -0,0 +1,363 @@
+"""
+Synthetic Data Generator
+
+Builds a local SQLite database from a schema JSON in the `schema/` format (as produced
+by `sql/sp_GenerateSchemaJSON.sql`) and fills every table with synthetic rows, so
+queries can be benchmarked and validated locally at realistic volumes.
+
+The schema JSON has no data types, so each column's kind is inferred from its name
+(an optional "DataType" entry takes precedence). Values are generated a whole column at
+a time with NumPy and inserted with batched `executemany`. Primary keys are dense
+(1..N for ID columns, zero-padded codes otherwise), so foreign-key columns are filled
+by sampling the referenced table's key range. Joins along the `Relationships` return
+rows, and tables can be generated in any order.
+
+Usage:
+    python -m utils.synthetic_data --schema schema/HealthClaimsDemo.json --db data/claims.sqlite \\
+        --rows 100000 --table-rows Claims=2000000,ClaimTypes=10
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import time
+
+import numpy as np
+
+DEFAULT_ROWS = 1000
+INSERT_BATCH_SIZE = 50000
+START_DATE = np.datetime64("2015-01-01")
+DATE_RANGE_DAYS = 3650
+DATE_STRINGS = (START_DATE + np.arange(DATE_RANGE_DAYS)).astype(str)
+
+# Column kinds -> SQLite declared type
+KIND_TYPES = {
+    "id": "INTEGER",
+    "code": "TEXT",
+    "integer": "INTEGER",
+    "amount": "REAL",
+    "date": "TEXT",
+    "flag": "INTEGER",
+    "gender": "TEXT",
+    "first_name": "TEXT",
+    "last_name": "TEXT",
+    "email": "TEXT",
+    "guid": "TEXT",
+    "text": "TEXT",
+}
+
+# Name patterns checked in order; first match wins
+_KIND_PATTERNS = [
+    ("guid", re.compile(r"guid$", re.IGNORECASE)),
+    ("id", re.compile(r"(?:id|key)$", re.IGNORECASE)),
+    ("code", re.compile(r"(?:code|number|num|no)$", re.IGNORECASE)),
+    ("date", re.compile(r"^(?:date|dob)|(?:date|time|dob|birthdate|timestamp|created|modified)$", re.IGNORECASE)),
+    ("amount", re.compile(r"(?:amount|amt|price|cost|total|paid|rate|fee|balance|salary|weight|tax|freight|discount)$", re.IGNORECASE)),
+    ("integer", re.compile(r"(?:qty|quantity|count|age|level|days|units|hours|year)$", re.IGNORECASE)),
+    ("flag", re.compile(r"^(?:is|has)[A-Z_]|flag$|active$", re.IGNORECASE)),
+    ("gender", re.compile(r"^(?:gender|sex)$", re.IGNORECASE)),
+    ("email", re.compile(r"e-?mail", re.IGNORECASE)),
+    ("first_name", re.compile(r"first_?name", re.IGNORECASE)),
+    ("last_name", re.compile(r"(?:last_?name|surname)", re.IGNORECASE)),
+]
+
+_SQL_TYPE_KINDS = [
+    ("guid", ("uniqueidentifier",)),
+    ("integer", ("int", "bit")),
+    ("amount", ("decimal", "numeric", "money", "float", "real")),
+    ("date", ("date", "time")),
+]
+
+FIRST_NAMES = np.array(["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+                        "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Carlos", "Maria"])
+LAST_NAMES = np.array(["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+                       "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Lee"])
+
+
+def infer_column_kind(column: dict) -> str:
+    """
+    Infers a column's value kind from its optional "DataType" or its name.
+    """
+    data_type = (column.get("DataType") or "").lower()
+    name = column["ColumnName"]
+    if data_type:
+        for kind, markers in _SQL_TYPE_KINDS:
+            if any(marker in data_type for marker in markers):
+                # Keep name-based keys/flags for integer types (e.g. PatientID INT)
+                if kind == "integer":
+                    named = infer_column_kind({"ColumnName": name})
+                    return named if named in ("id", "flag") else kind
+                return kind
+        return "text"
+    for kind, pattern in _KIND_PATTERNS:
+        if pattern.search(name):
+            return kind
+    return "text"
+
+
+def primary_key_column(table: dict, referenced_keys: dict):
+    """
+    Returns the table's primary key column: the column other tables reference, else
+    `<Table>ID` / `<Singular>ID` / `ID`, else None.
+    """
+    name = table["TableName"]
+    columns = {c["ColumnName"].lower(): c["ColumnName"] for c in table.get("Columns", [])}
+    if name.lower() in referenced_keys:
+        return referenced_keys[name.lower()]
+    candidates = [f"{name}id", f"{name[:-3]}yid" if name.lower().endswith("ies") else None,
+                  f"{name[:-1]}id" if name.lower().endswith("s") else None, "id"]
+    for candidate in candidates:
+        if candidate and candidate.lower() in columns:
+            return columns[candidate.lower()]
+    return None
+
+
+def key_values(kind: str, prefix: str, indexes: np.ndarray) -> np.ndarray:
+    """
+    Key values for 0-based row indexes: 1-based integers for ID columns, zero-padded
+    codes otherwise. Referencing tables use the same function, so FKs always match.
+    """
+    if kind == "id":
+        return indexes + 1
+    return np.char.add(prefix, np.char.zfill((indexes + 1).astype(str), 6))
+
+
+def _code_prefix(column_name: str) -> str:
+    letters = re.sub(r"[^A-Za-z]", "", column_name)
+    return (letters[:3] or "K").upper()
+
+
+class SyntheticDataGenerator:
+    """
+    Generates a SQLite database from a schema JSON.
+    """
+
+    def __init__(self, schema: dict, default_rows: int = DEFAULT_ROWS, table_rows: dict = None, seed: int = 42):
+        """
+        :param schema: Parsed schema JSON ({"Schema": [...]})
+        :param default_rows: Row count for tables not listed in `table_rows`
+        :param table_rows: Per-table row counts, e.g. {"Claims": 2000000}
+        :param seed: Random seed (same seed, same data)
+        """
+        self.tables = schema.get("Schema", [])
+        self.default_rows = default_rows
+        self.table_rows = {name.lower(): rows for name, rows in (table_rows or {}).items()}
+        self.rng = np.random.default_rng(seed)
+        self._key_cache = {}
+
+        # Foreign keys: (table, column) -> (primary table, primary key column)
+        names = {t["TableName"].lower() for t in self.tables}
+        self.foreign_keys = {}
+        referenced_keys = {}
+        for table in self.tables:
+            for rel in table.get("Relationships") or []:
+                if rel["PrimaryTable"].lower() not in names:
+                    continue
+                self.foreign_keys[(rel["RelatedTable"].lower(), rel["ForeignKeyColumn"].lower())] = (
+                    rel["PrimaryTable"].lower(), rel["PrimaryKeyColumn"])
+                referenced_keys.setdefault(rel["PrimaryTable"].lower(), rel["PrimaryKeyColumn"])
+
+        self.primary_keys = {t["TableName"].lower(): primary_key_column(t, referenced_keys) for t in self.tables}
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "SyntheticDataGenerator":
+        with open(path, "r", encoding="utf-8-sig") as f:
+            return cls(json.load(f), **kwargs)
+
+    def row_count(self, table_name: str) -> int:
+        return self.table_rows.get(table_name.lower(), self.default_rows)
+
+    def _key_kind(self, table_key: str) -> str:
+        pk = self.primary_keys.get(table_key)
+        return "id" if pk and infer_column_kind({"ColumnName": pk}) == "id" else "code"
+
+    def _keys(self, kind: str, prefix: str, count: int) -> np.ndarray:
+        """
+        All `count` key values of a key column; code keys are formatted once and then
+        indexed, which is much faster than formatting strings per row.
+        """
+        if kind == "id":
+            return np.arange(1, count + 1)
+        key = (prefix, count)
+        if key not in self._key_cache:
+            self._key_cache[key] = key_values(kind, prefix, np.arange(count))
+        return self._key_cache[key]
+
+    def column_kind(self, table_name: str, column: dict) -> str:
+        """
+        Column kind, with key columns forced to the kind of the key they hold.
+        """
+        table_key = table_name.lower()
+        column_key = column["ColumnName"].lower()
+        pk = self.primary_keys.get(table_key)
+        if pk and pk.lower() == column_key:
+            return self._key_kind(table_key)
+        fk = self.foreign_keys.get((table_key, column_key))
+        if fk:
+            return self._key_kind(fk[0])
+        return infer_column_kind(column)
+
+    def create_table_sql(self, table: dict) -> str:
+        name = table["TableName"]
+        pk = self.primary_keys.get(name.lower())
+        definitions = []
+        for column in table.get("Columns", []):
+            column_name = column["ColumnName"]
+            definition = f'"{column_name}" {KIND_TYPES[self.column_kind(name, column)]}'
+            if pk and column_name.lower() == pk.lower():
+                definition += " PRIMARY KEY"
+            fk = self.foreign_keys.get((name.lower(), column_name.lower()))
+            if fk:
+                primary_table = next(t["TableName"] for t in self.tables if t["TableName"].lower() == fk[0])
+                definition += f' REFERENCES "{primary_table}"("{fk[1]}")'
+            definitions.append(definition)
+        return f'CREATE TABLE "{name}" (\n    ' + ",\n    ".join(definitions) + "\n)"
+
+    def generate_column(self, table_name: str, column: dict, rows: int, start: int = 0) -> np.ndarray:
+        """
+        Generates the values of one column for rows `start` .. `start + rows - 1` at once.
+        """
+        rng = self.rng
+        column_name = column["ColumnName"]
+        table_key = table_name.lower()
+        kind = self.column_kind(table_name, column)
+
+        # A primary key that is also a foreign key (shared-key 1:1 tables) stays dense and unique
+        pk = self.primary_keys.get(table_key)
+        if pk and pk.lower() == column_name.lower():
+            return self._keys(kind, _code_prefix(pk), self.row_count(table_name))[start:start + rows]
+        fk = self.foreign_keys.get((table_key, column_name.lower()))
+        if fk:
+            parent_rows = self.row_count(fk[0])
+            return self._keys(kind, _code_prefix(fk[1]), max(parent_rows, 1))[rng.integers(0, max(parent_rows, 1), rows)]
+
+        sequence = np.arange(start + 1, start + rows + 1)
+        if kind in ("id", "integer"):
+            return rng.integers(1, 1000, rows)
+        if kind == "code":
+            total = max(self.row_count(table_name), 1)
+            return self._keys("code", _code_prefix(column_name), total)[rng.integers(0, total, rows)]
+        if kind == "amount":
+            return np.round(rng.gamma(2.0, 150.0, rows), 2)
+        if kind == "date":
+            return DATE_STRINGS[rng.integers(0, DATE_RANGE_DAYS, rows)]
+        if kind == "flag":
+            return rng.integers(0, 2, rows)
+        if kind == "gender":
+            return rng.choice(np.array(["F", "M"]), rows)
+        if kind == "first_name":
+            return rng.choice(FIRST_NAMES, rows)
+        if kind == "last_name":
+            return rng.choice(LAST_NAMES, rows)
+        if kind == "email":
+            return np.char.add(np.char.add("user", sequence.astype(str)), "@example.com")
+        if kind == "guid":
+            high = rng.integers(0, 2 ** 63, rows, dtype=np.int64)
+            return np.char.add(np.char.zfill(np.char.mod("%x", high), 16), np.char.zfill(np.char.mod("%x", sequence), 16))
+        return np.char.add(f"{column_name} ", sequence.astype(str))
+
+    def create_schema(self, conn: sqlite3.Connection):
+        """
+        Creates every table, without rows, on an open connection (e.g. an in-memory
+        database used to compile generated SQL).
+        """
+        for table in self.tables:
+            if table.get("Columns"):
+                conn.execute(self.create_table_sql(table))
+
+    def build(self, db_path: str, overwrite: bool = False, index_foreign_keys: bool = True) -> dict:
+        """
+        Creates the database and fills every table.
+
+        :param db_path: SQLite file to create
+        :param overwrite: Replace an existing file
+        :param index_foreign_keys: Create an index on every FK column after loading
+        :return: {table name: rows inserted}
+        """
+        if os.path.exists(db_path):
+            if not overwrite:
+                raise FileExistsError(f"Database already exists: {db_path}")
+            os.remove(db_path)
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        conn = sqlite3.connect(db_path)
+        counts = {}
+        try:
+            # Bulk-load settings: no journal or fsync while the (throwaway) file is built
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+
+            self.create_schema(conn)
+            for table in self.tables:
+                counts[table["TableName"]] = self._load_table(conn, table)
+
+            if index_foreign_keys:
+                for table_key, column_key in self.foreign_keys:
+                    table = next(t for t in self.tables if t["TableName"].lower() == table_key)
+                    column = next((c["ColumnName"] for c in table.get("Columns", []) if c["ColumnName"].lower() == column_key), None)
+                    if column:
+                        conn.execute(f'CREATE INDEX "IX_{table["TableName"]}_{column}" ON "{table["TableName"]}" ("{column}")')
+            conn.commit()
+            # Sampled statistics for the query planner (a full ANALYZE scans every index)
+            conn.execute("PRAGMA analysis_limit = 1000")
+            conn.execute("ANALYZE")
+        finally:
+            conn.close()
+        return counts
+
+    def _load_table(self, conn: sqlite3.Connection, table: dict) -> int:
+        name = table["TableName"]
+        columns = table.get("Columns", [])
+        if not columns:
+            return 0
+
+        rows = self.row_count(name)
+        placeholders = ", ".join("?" for _ in columns)
+        column_list = ", ".join(f'"{c["ColumnName"]}"' for c in columns)
+        insert = f'INSERT INTO "{name}" ({column_list}) VALUES ({placeholders})'
+
+        for start in range(0, rows, INSERT_BATCH_SIZE):
+            size = min(INSERT_BATCH_SIZE, rows - start)
+            values = [self.generate_column(name, column, size, start) for column in columns]
+            conn.executemany(insert, zip(*(v.tolist() for v in values)))
+        conn.commit()
+        return rows
+
+
+def _parse_table_rows(value: str) -> dict:
+    table_rows = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        table, _, rows = item.partition("=")
+        table_rows[table.strip()] = int(rows)
+    return table_rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic SQLite database from a schema JSON.")
+    parser.add_argument("--schema", required=True, help="Schema JSON (schema/ format)")
+    parser.add_argument("--db", required=True, help="SQLite database file to create")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="Rows per table")
+    parser.add_argument("--table-rows", help="Per-table overrides, e.g. Claims=2000000,ClaimTypes=10")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--overwrite", action="store_true", help="Replace an existing database file")
+    parser.add_argument("--no-fk-indexes", action="store_true", help="Don't index foreign key columns")
+    args = parser.parse_args(argv)
+
+    generator = SyntheticDataGenerator.from_file(
+        args.schema, default_rows=args.rows, table_rows=_parse_table_rows(args.table_rows), seed=args.seed
+    )
+    started = time.perf_counter()
+    try:
+        counts = generator.build(args.db, overwrite=args.overwrite, index_foreign_keys=not args.no_fk_indexes)
+    except FileExistsError as e:
+        print(f"❌ {e} (use --overwrite)")
+        return
+    for table, rows in counts.items():
+        print(f"  {table}: {rows:,} rows")
+    print(f"✅ Generated {args.db} ({sum(counts.values()):,} rows in {time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Token Estimation Helpers
+
+Cheap, dependency-free token estimates used for prompt budgeting and reporting.
+"""
+
+# Average characters per token for English prose and SQL with GPT-style tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of tokens in `text`.
+
+    :param text: Prompt or completion text
+    :return: Approximate token count (0 for empty text)
+    """
+    if not text:
+        return 0
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+def estimate_message_tokens(messages) -> int:
+    """
+    Estimates the tokens of a chat message list, including per-message overhead.
+    """
+    return sum(estimate_tokens(message.get("content", "")) + 4 for message in messages)